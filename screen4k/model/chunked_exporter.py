@@ -0,0 +1,251 @@
+import os
+import time
+import shutil
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_EXCEPTION
+
+import cv2
+from loguru import logger
+
+from model.encoder import default_encoder
+from model.exporter import Exporter
+from model.video_reader import open_video, load_index
+
+
+# Chunks per process, so that processes done early pick up the remaining work
+CHUNKS_PER_PROCESS = 4
+# Chunks are not made shorter than this, shorter videos use fewer processes
+MIN_CHUNK_FRAMES = 120
+# Seconds between progress reports
+PROGRESS_INTERVAL = 0.25
+
+
+STAGES = ('decode', 'render', 'encode')
+
+
+# Shared with the parent process, set up by _init_process
+_progress = None
+_reused = None
+_stage_times = None
+_cancelled = None
+
+
+def _init_process(progress, reused, stage_times, cancelled):
+    global _progress, _reused, _stage_times, _cancelled
+    _progress, _reused, _stage_times, _cancelled = progress, reused, stage_times, cancelled
+
+    # The processes already keep every core busy
+    cv2.setNumThreads(1)
+
+
+def _export_chunk(chunk_index, input_path, index, transform, start, end, segment_path, fps, encoder, profile_window=None):
+    """Renders frames [start, end) into a segment.
+
+    Returns the number of frames written, or None if cancelled, and a
+    StageProfiler snapshot when `profile_window` is set. The process renders
+    on a single thread, so the profile includes allocations.
+    """
+    profiler = transform.enable_profiling(window=profile_window) if profile_window is not None else None
+    reader = open_video(input_path, index=index)
+    writer = None
+    num_frames = 0
+    # Seconds per stage, at _stage_times[chunk_index * 3:] in STAGES order
+    times = chunk_index * len(STAGES)
+
+    try:
+        for frame_index in range(start, end):
+            if _cancelled.is_set():
+                num_frames = None
+                break
+
+            t0 = time.perf_counter()
+            frame = reader.read(frame_index)
+            t1 = time.perf_counter()
+            if frame is None:
+                break
+
+            output = transform.render(frame, frame_index).input
+            t2 = time.perf_counter()
+            if writer is None:
+                height, width = output.shape[:2]
+                writer = encoder.open(segment_path, fps, width, height)
+
+            writer.write(output)
+            t3 = time.perf_counter()
+
+            _stage_times[times] += t1 - t0
+            _stage_times[times + 1] += t2 - t1
+            _stage_times[times + 2] += t3 - t2
+            num_frames += 1
+            _progress[chunk_index] = num_frames
+            _reused[chunk_index] = transform.reused_frames
+    finally:
+        reader.release()
+        if writer is not None:
+            writer.release()
+        if profiler is not None:
+            transform.disable_profiling()
+
+    return num_frames, profiler.snapshot() if profiler is not None else None
+
+
+class ChunkedExporter:
+    """Renders a video in chunks on a pool of processes and joins the segments.
+
+    Each process decodes with a VideoCapture of its own and renders with an
+    unpickled copy of the Compose, so unlike the threads of Exporter, the
+    Python parts of the transforms run in parallel too. Chunks start on
+    keyframes and are encoded into separate segments, which ffmpeg then
+    concatenates without re-encoding.
+
+    Without ffmpeg, with a single process or for videos too short to split,
+    the export runs on the threaded Exporter instead.
+
+    Segments are written with `encoder` (see model.encoder), which must
+    produce segments that can be joined by stream copy.
+    """
+    def __init__(self, input_path, transform, output_path, fps, num_processes=None, index=None, encoder=None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.fps = fps
+        self.encoder = encoder if encoder is not None else default_encoder()
+        self.num_processes = num_processes if num_processes is not None else (os.cpu_count() or 1)
+        self.index = index if index is not None else load_index(input_path)
+
+        # Taken now, so later setting changes do not affect the export. The
+        # profiles of the chunks are merged into the one of the transform.
+        self._profiler = transform.profiler
+        self._transform = transform.fork()
+
+        self._context = multiprocessing.get_context('spawn')
+        self._cancelled = self._context.Event()
+        self._frames_done = None
+        self._reused = None
+        self._stage_times = None
+        self._exporter = None
+
+    @property
+    def num_frames(self):
+        return self.index.num_frames
+
+    @property
+    def chunked(self):
+        """Whether the export runs on processes, see the class docstring."""
+        return self.num_processes > 1 and len(self.chunks()) > 1 and shutil.which('ffmpeg') is not None
+
+    def chunks(self):
+        """Returns the (start, end) frame ranges of the chunks."""
+        num_chunks = min(self.num_processes * CHUNKS_PER_PROCESS, self.num_frames // MIN_CHUNK_FRAMES)
+
+        starts = {0}
+        for i in range(1, num_chunks):
+            starts.add(self.index.keyframe_before(i * self.num_frames // num_chunks))
+
+        starts = sorted(starts)
+        return list(zip(starts, starts[1:] + [self.num_frames]))
+
+    def cancel(self):
+        """Stops the export from another thread, after which `run` returns None."""
+        self._cancelled.set()
+        if self._exporter is not None:
+            self._exporter.cancel()
+
+    def stage_times(self):
+        """Returns the seconds spent so far decoding, rendering and encoding, summed over the processes."""
+        if self._exporter is not None:
+            return self._exporter.stage_times()
+        if self._stage_times is None:
+            return dict.fromkeys(STAGES, 0)
+        return {stage: sum(self._stage_times[i::len(STAGES)]) for i, stage in enumerate(STAGES)}
+
+    def reuse_stats(self):
+        """Returns the frames rendered and the frames that reused a previous output, see Compose.render."""
+        if self._exporter is not None:
+            return self._exporter.reuse_stats()
+        if self._reused is None:
+            return {'rendered': 0, 'reused': 0}
+        reused = sum(self._reused)
+        return {'rendered': sum(self._frames_done) - reused, 'reused': reused}
+
+    def run(self, progress=None):
+        """Exports the video and returns the number of frames written, or None if cancelled.
+
+        `progress(frames_done, num_frames)` is called from time to time, on
+        the calling thread.
+        """
+        if not self.chunked:
+            logger.info('Exporting on threads, ffmpeg is needed to export in chunks')
+            self._exporter = Exporter(self.input_path, self._transform, self.output_path, self.fps, index=self.index, encoder=self.encoder)
+            if self._cancelled.is_set():
+                return None
+            try:
+                return self._exporter.run(progress)
+            finally:
+                if self._profiler is not None:
+                    self._profiler.merge(self._transform.profiler.snapshot())
+
+        chunks = self.chunks()
+        frames_done = self._frames_done = self._context.Array('q', len(chunks), lock=False)
+        self._reused = self._context.Array('q', len(chunks), lock=False)
+        self._stage_times = self._context.Array('d', len(chunks) * len(STAGES), lock=False)
+
+        # Segments go next to the output, on the same file system
+        output_dir = os.path.dirname(os.path.abspath(self.output_path))
+        segment_dir = tempfile.mkdtemp(prefix='.screen4k-segments-', dir=output_dir)
+        segment_paths = [os.path.join(segment_dir, f'segment-{i:04d}.mp4') for i in range(len(chunks))]
+
+        try:
+            pool = ProcessPoolExecutor(
+                max_workers=min(self.num_processes, len(chunks)),
+                mp_context=self._context,
+                initializer=_init_process,
+                initargs=(frames_done, self._reused, self._stage_times, self._cancelled)
+            )
+            with pool:
+                profile_window = self._profiler.window if self._profiler is not None else None
+                futures = [
+                    pool.submit(
+                        _export_chunk, i, self.input_path, self.index, self._transform, start, end,
+                        segment_paths[i], self.fps, self.encoder, profile_window
+                    )
+                    for i, (start, end) in enumerate(chunks)
+                ]
+
+                try:
+                    pending = futures
+                    while pending:
+                        done, pending = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_EXCEPTION)
+                        for future in done:
+                            _, profile = future.result()
+                            if profile is not None:
+                                self._profiler.merge(profile)
+
+                        if progress is not None:
+                            progress(sum(frames_done), self.num_frames)
+                except BaseException:
+                    # Stop the other chunks before waiting for them
+                    self._cancelled.set()
+                    raise
+
+            if self._cancelled.is_set():
+                return None
+
+            self._concat([path for path in segment_paths if os.path.exists(path)], segment_dir)
+            return sum(future.result()[0] for future in futures)
+        finally:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+
+    def _concat(self, segment_paths, segment_dir):
+        list_path = os.path.join(segment_dir, 'segments.txt')
+        with open(list_path, 'w') as f:
+            for path in segment_paths:
+                escaped = path.replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+
+        command = [
+            'ffmpeg', '-y', '-v', 'error', '-f', 'concat', '-safe', '0',
+            '-i', list_path, '-c', 'copy', self.output_path
+        ]
+        subprocess.run(command, capture_output=True, check=True)
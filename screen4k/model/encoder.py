@@ -0,0 +1,134 @@
+import os
+import shutil
+import tempfile
+import subprocess
+
+import cv2
+import numpy as np
+
+
+class OpenCVEncoder:
+    """Encodes with cv2.VideoWriter, which needs nothing besides OpenCV."""
+    def __init__(self, fourcc='mp4v'):
+        self.fourcc = fourcc
+
+    def open(self, output_path, fps, width, height):
+        """Returns a writer with write(frame) and release() for BGR frames of the given size."""
+        writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*self.fourcc), fps, (width, height))
+        if not writer.isOpened():
+            raise RuntimeError(f'Could not open {output_path} with fourcc {self.fourcc}')
+        return writer
+
+    def __repr__(self):
+        return f'OpenCVEncoder(fourcc={self.fourcc!r})'
+
+
+class FFmpegEncoder:
+    """Encodes by streaming raw BGR frames to an ffmpeg process over a pipe.
+
+    `preset` and `crf` are passed as they are, so they must suit the codec
+    (the defaults suit libx264 and libx265), and either can be None to leave
+    it out. `threads` 0 lets ffmpeg decide. A positive `nice` runs ffmpeg at
+    a lower priority, e.g. for encodes in the background.
+    """
+    def __init__(self, codec='libx264', preset='veryfast', crf=23, pixel_format='yuv420p', threads=0, ffmpeg='ffmpeg',
+                 nice=0):
+        self.codec = codec
+        self.preset = preset
+        self.crf = crf
+        self.pixel_format = pixel_format
+        self.threads = threads
+        self.ffmpeg = ffmpeg
+        self.nice = nice
+
+    def available(self):
+        return shutil.which(self.ffmpeg) is not None
+
+    def command(self, output_path, fps, width, height):
+        command = [
+            self.ffmpeg, '-y', '-v', 'error', '-nostdin',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', f'{fps}', '-i', '-',
+            '-an', '-c:v', self.codec
+        ]
+        if self.preset is not None:
+            command += ['-preset', self.preset]
+        if self.crf is not None:
+            command += ['-crf', str(self.crf)]
+        if self.pixel_format is not None:
+            command += ['-pix_fmt', self.pixel_format]
+            if self.pixel_format.startswith(('yuv420', 'nv12')) and (width % 2 or height % 2):
+                # Chroma subsampling needs even sizes
+                command += ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+        command += ['-threads', str(self.threads), output_path]
+        return command
+
+    def open(self, output_path, fps, width, height):
+        """Returns a writer with write(frame) and release() for BGR frames of the given size."""
+        return FFmpegWriter(self.command(output_path, fps, width, height), width, height, nice=self.nice)
+
+    def __repr__(self):
+        return (
+            f'FFmpegEncoder(codec={self.codec!r}, preset={self.preset!r}, crf={self.crf!r}, '
+            f'pixel_format={self.pixel_format!r}, threads={self.threads!r}, nice={self.nice!r})'
+        )
+
+
+class FFmpegWriter:
+    """A running ffmpeg process, see FFmpegEncoder."""
+    def __init__(self, command, width, height, nice=0):
+        self._shape = (height, width, 3)
+
+        # Set before ffmpeg starts, so that its threads inherit the priority.
+        # preexec_fn is not safe while other threads run, so POSIX systems
+        # start ffmpeg through nice(1), if there is one.
+        options = {}
+        if nice > 0 and os.name == 'nt':
+            options['creationflags'] = subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        elif nice > 0 and shutil.which('nice') is not None:
+            command = ['nice', '-n', str(nice)] + command
+
+        # Read only when ffmpeg fails, a file cannot fill up and block it like a pipe
+        self._log = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._log, **options
+        )
+        self._failed = False
+
+    def write(self, frame):
+        if frame.shape != self._shape or frame.dtype != np.uint8:
+            raise ValueError(f'Expected a {self._shape} uint8 frame, got {frame.shape} {frame.dtype}')
+
+        # The pipe reads straight from the frame memory, only views (like crops) are copied
+        frame = np.ascontiguousarray(frame)
+        try:
+            self._process.stdin.write(memoryview(frame).cast('B'))
+        except BrokenPipeError:
+            self._failed = True
+            self._process.wait()
+            raise RuntimeError(f'ffmpeg stopped: {self._error_message()}') from None
+
+    def release(self):
+        if self._process.stdin.closed:
+            return
+
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass
+
+        return_code = self._process.wait()
+        message = self._error_message()
+        self._log.close()
+
+        if return_code != 0 and not self._failed:
+            raise RuntimeError(f'ffmpeg exited with code {return_code}: {message}')
+
+    def _error_message(self):
+        self._log.seek(0)
+        return self._log.read().decode(errors='replace').strip()
+
+
+def default_encoder(**options):
+    """Returns an FFmpegEncoder with the given options if ffmpeg is installed, an OpenCVEncoder otherwise."""
+    encoder = FFmpegEncoder(**options)
+    return encoder if encoder.available() else OpenCVEncoder()
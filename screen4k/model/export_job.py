@@ -0,0 +1,172 @@
+import os
+import time
+import uuid
+import threading
+from collections import deque
+
+from loguru import logger
+
+from model.exporter import Exporter
+from model.chunked_exporter import ChunkedExporter
+from model.transcoder import Transcoder
+from model.encoder import default_encoder
+from model.video_reader import load_index
+
+
+# Seconds of progress reports the current fps is measured over
+FPS_WINDOW = 3.0
+
+
+class ExportJob:
+    """An export running on a background thread, which can be watched and cancelled.
+
+    The video is written to a hidden file next to `output_path` and moved
+    there once complete, so a cancelled or failed export leaves no partial
+    file behind (and keeps a previous export at that path).
+
+    `on_progress(stats)` is called from time to time with the `stats()` of
+    the job and `on_finished(job)` once it is done, cancelled or failed,
+    both on the job thread, so views must hand them over to the GUI thread
+    themselves (e.g. by emitting a signal).
+
+    With no `transform`, the frames are encoded as they are (see
+    Transcoder), e.g. to turn a raw recording into its final format.
+    """
+    def __init__(self, input_path, transform, output_path, fps, encoder=None, mode='pipeline', num_workers=None,
+                 index=None, on_progress=None, on_finished=None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.fps = fps
+        self.encoder = encoder if encoder is not None else default_encoder()
+        self.mode = mode
+        self.index = index if index is not None else load_index(input_path)
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+
+        directory, name = os.path.split(os.path.abspath(output_path))
+        stem, extension = os.path.splitext(name)
+        self._partial_path = os.path.join(directory, f'.{stem}.{uuid.uuid4().hex[:8]}.partial{extension}')
+
+        # Created now, so later setting changes do not affect the export
+        if transform is None:
+            self._exporter = Transcoder(
+                input_path, self._partial_path, fps, index=self.index, encoder=self.encoder
+            )
+        elif mode == 'chunked':
+            self._exporter = ChunkedExporter(
+                input_path, transform, self._partial_path, fps,
+                num_processes=num_workers, index=self.index, encoder=self.encoder
+            )
+        else:
+            self._exporter = Exporter(
+                input_path, transform, self._partial_path, fps,
+                num_workers=num_workers, index=self.index, encoder=self.encoder
+            )
+
+        self._thread = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._started_at = None
+        self._finished_at = None
+        self._frames_done = 0
+        self._reports = deque()
+
+        self.state = 'pending'  # 'running', 'done', 'cancelled' or 'failed'
+        self.error = None
+
+    @property
+    def num_frames(self):
+        return self.index.num_frames
+
+    @property
+    def running(self):
+        return self.state == 'running'
+
+    def start(self):
+        if self._thread is not None:
+            raise RuntimeError('Export job already started')
+
+        self.state = 'running'
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='export-job', daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Asks the export to stop, which it does once the encoder is closed, see `wait`."""
+        self._cancelled.set()
+        self._exporter.cancel()
+
+    def wait(self, timeout=None):
+        """Waits for the job to finish, returns whether it did."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.state not in ('pending', 'running')
+
+    def stats(self):
+        """Returns the frames done, elapsed seconds, fps, ETA in seconds, seconds spent per stage and
+        the frames that reused the output of a previous one.
+
+        `fps` is measured over the last few seconds and `average_fps` over
+        the whole export. `eta` is None until there is an fps to go by.
+        """
+        with self._lock:
+            frames_done = self._frames_done
+            reports = list(self._reports)
+
+        now = self._finished_at if self._finished_at is not None else time.perf_counter()
+        elapsed = now - self._started_at if self._started_at is not None else 0
+
+        if len(reports) > 1 and reports[-1][0] > reports[0][0]:
+            (t0, frames0), (t1, frames1) = reports[0], reports[-1]
+            fps = (frames1 - frames0) / (t1 - t0)
+        else:
+            fps = frames_done / elapsed if elapsed > 0 else 0
+
+        eta = (self.num_frames - frames_done) / fps if fps > 0 else None
+        if self.state == 'done':
+            eta = 0
+
+        return {
+            'state': self.state,
+            'frames_done': frames_done,
+            'num_frames': self.num_frames,
+            'elapsed': elapsed,
+            'fps': fps,
+            'average_fps': frames_done / elapsed if elapsed > 0 else 0,
+            'eta': eta,
+            'stage_times': self._exporter.stage_times(),
+            'reused_frames': self._exporter.reuse_stats()['reused'],
+        }
+
+    def _report(self, frames_done, num_frames=None):
+        now = time.perf_counter()
+        with self._lock:
+            self._frames_done = frames_done
+            self._reports.append((now, frames_done))
+            while len(self._reports) > 2 and now - self._reports[0][0] > FPS_WINDOW:
+                self._reports.popleft()
+
+        if self.on_progress is not None:
+            self.on_progress(self.stats())
+
+    def _run(self):
+        try:
+            num_frames = self._exporter.run(self._report)
+            if num_frames is None or self._cancelled.is_set():
+                self.state = 'cancelled'
+            else:
+                os.replace(self._partial_path, self.output_path)
+                self._report(num_frames)
+                self.state = 'done'
+        except Exception as e:
+            logger.exception(f'Export of {self.output_path} failed')
+            self.error = e
+            self.state = 'failed'
+        finally:
+            self._finished_at = time.perf_counter()
+            if os.path.exists(self._partial_path):
+                os.remove(self._partial_path)
+
+        if self.on_finished is not None:
+            self.on_finished(self)
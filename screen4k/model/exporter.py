@@ -0,0 +1,227 @@
+import os
+import time
+import threading
+from queue import Queue, Empty, Full
+
+from model.encoder import default_encoder
+from model.video_reader import open_video
+
+
+# Seconds between checks of the stop flag while a stage waits on a queue
+POLL_INTERVAL = 0.1
+# Seconds between progress reports
+PROGRESS_INTERVAL = 0.25
+
+
+def default_num_workers():
+    return max(1, min(8, (os.cpu_count() or 1) - 1))
+
+
+class Exporter:
+    """Renders a video through a decode -> render -> encode pipeline.
+
+    A decode thread reads the source frames in order, `num_workers` render
+    threads run their own fork of the Compose on them (OpenCV releases the
+    GIL, so they render in parallel), and the calling thread writes the
+    results in frame order. The stages are joined by bounded queues, and at
+    most `window` frames are in flight between decoding and writing, which
+    bounds memory and lets each render thread draw into a FramePool of
+    `window` + 1 frames. The output is the same as rendering every frame in
+    order on a single thread.
+
+    Frames are written with `encoder` (see model.encoder), ffmpeg when it is
+    installed by default.
+    """
+    def __init__(self, input_path, transform, output_path, fps, num_workers=None, window=None, index=None, encoder=None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.fps = fps
+        self.encoder = encoder if encoder is not None else default_encoder()
+        self.num_workers = num_workers if num_workers is not None else default_num_workers()
+        self.window = window if window is not None else 2 * self.num_workers + 2
+        self.index = index
+
+        # Forks are taken now, so later setting changes do not affect the export.
+        # Their profiles are merged into the one of the transform when it is done.
+        self._profiler = transform.profiler
+        self._transforms = [transform.fork(pool_size=self.window + 1) for _ in range(self.num_workers)]
+
+        self._decoded = Queue(maxsize=self.num_workers)
+        self._rendered = Queue(maxsize=self.num_workers)
+        self._in_flight = threading.Semaphore(self.window)
+        self._stopped = threading.Event()
+        self._cancelled = threading.Event()
+        self._error = None
+
+        # Seconds spent in each stage, written by the stage's own threads only
+        self._decode_time = 0
+        self._render_times = [0] * self.num_workers
+        self._encode_time = 0
+
+        self.num_frames = 0
+
+    def cancel(self):
+        """Stops the export from another thread, after which `run` returns None."""
+        self._cancelled.set()
+        self._stopped.set()
+
+    def stage_times(self):
+        """Returns the seconds spent so far decoding, rendering (summed over the threads) and encoding."""
+        return {'decode': self._decode_time, 'render': sum(self._render_times), 'encode': self._encode_time}
+
+    def reuse_stats(self):
+        """Returns the frames rendered and the frames that reused a previous output, see Compose.render."""
+        rendered = sum(t.rendered_frames for t in self._transforms)
+        reused = sum(t.reused_frames for t in self._transforms)
+        return {'rendered': rendered, 'reused': reused}
+
+    def run(self, progress=None):
+        """Exports the whole video and returns the number of frames written, or None if cancelled.
+
+        `progress(frames_done, num_frames)` is called from time to time, on
+        the calling thread. `num_frames` is None without an index.
+        """
+        threads = [threading.Thread(target=self._decode, name='export-decode', daemon=True)]
+        for i, transform in enumerate(self._transforms):
+            threads.append(threading.Thread(target=self._render, args=(i, transform), name=f'export-render-{i}', daemon=True))
+
+        for t in threads:
+            t.start()
+
+        try:
+            self._encode(progress)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._stopped.set()
+            for t in threads:
+                t.join()
+
+            if self._profiler is not None:
+                for transform in self._transforms:
+                    self._profiler.merge(transform.profiler.snapshot())
+
+        if self._error is not None:
+            raise self._error
+
+        if self._cancelled.is_set():
+            return None
+
+        return self.num_frames
+
+    def _decode(self):
+        reader = open_video(self.input_path, index=self.index)
+        try:
+            frame_index = 0
+            while not self._stopped.is_set():
+                if not self._in_flight.acquire(timeout=POLL_INTERVAL):
+                    continue
+
+                t0 = time.perf_counter()
+                frame = reader.read()
+                self._decode_time += time.perf_counter() - t0
+                if frame is None:
+                    break
+
+                if not self._put(self._decoded, (frame_index, frame)):
+                    return
+                frame_index += 1
+        except Exception as e:
+            self._fail(e)
+        finally:
+            reader.release()
+
+        # One end marker per render thread
+        for _ in self._transforms:
+            self._put(self._decoded, None)
+
+    def _render(self, worker_index, transform):
+        try:
+            while True:
+                item = self._get(self._decoded)
+                if item is None:
+                    break
+
+                frame_index, frame = item
+                t0 = time.perf_counter()
+                output = transform.render(frame, frame_index).input
+                self._render_times[worker_index] += time.perf_counter() - t0
+                if not self._put(self._rendered, (frame_index, output)):
+                    return
+        except Exception as e:
+            self._fail(e)
+
+        self._put(self._rendered, None)
+
+    def _encode(self, progress):
+        writer = None
+        pending = {}
+        next_index = 0
+        num_running = len(self._transforms)
+        total = self.index.num_frames if self.index is not None else None
+        last_report = time.perf_counter()
+
+        try:
+            while num_running > 0:
+                item = self._get(self._rendered)
+                if item is None:
+                    num_running -= 1
+                    continue
+
+                frame_index, frame = item
+                pending[frame_index] = frame
+
+                # Frames come out of the render threads in any order
+                t0 = time.perf_counter()
+                while next_index in pending:
+                    frame = pending.pop(next_index)
+                    if writer is None:
+                        height, width = frame.shape[:2]
+                        writer = self.encoder.open(self.output_path, self.fps, width, height)
+
+                    writer.write(frame)
+                    self._in_flight.release()
+                    next_index += 1
+                t1 = time.perf_counter()
+                self._encode_time += t1 - t0
+
+                if progress is not None and t1 - last_report >= PROGRESS_INTERVAL:
+                    progress(next_index, total)
+                    last_report = t1
+        finally:
+            if writer is not None:
+                t0 = time.perf_counter()
+                writer.release()
+                self._encode_time += time.perf_counter() - t0
+
+        if progress is not None and not self._stopped.is_set():
+            progress(next_index, total)
+
+        if self._error is None and not self._cancelled.is_set() and len(pending) > 0:
+            raise RuntimeError(f'Export stopped with frames missing after frame {next_index}')
+
+        self.num_frames = next_index
+
+    def _put(self, queue, item):
+        """Puts an item unless the pipeline stops first, returns whether it did."""
+        while not self._stopped.is_set():
+            try:
+                queue.put(item, timeout=POLL_INTERVAL)
+                return True
+            except Full:
+                pass
+        return False
+
+    def _get(self, queue):
+        """Returns the next item, or None (like an end marker) if the pipeline stops first."""
+        while not self._stopped.is_set():
+            try:
+                return queue.get(timeout=POLL_INTERVAL)
+            except Empty:
+                pass
+        return None
+
+    def _fail(self, error):
+        if self._error is None:
+            self._error = error
+        self._stopped.set()
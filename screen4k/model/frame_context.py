@@ -0,0 +1,128 @@
+CORNERS = ('top_left', 'top_right', 'bottom_right', 'bottom_left')
+
+# Bit flags of the rounded corners, in the order of CORNERS
+TOP_LEFT, TOP_RIGHT, BOTTOM_RIGHT, BOTTOM_LEFT = (1 << i for i in range(len(CORNERS)))
+ALL_CORNERS = (1 << len(CORNERS)) - 1
+
+
+def corners_to_flags(corners):
+    """Packs a rounded corners dict into a bit mask."""
+    flags = 0
+    for i, name in enumerate(CORNERS):
+        if corners[name]:
+            flags |= 1 << i
+    return flags
+
+
+def flags_to_corners(flags):
+    """Unpacks a bit mask into a rounded corners dict."""
+    return dict(_CORNERS_BY_FLAGS[flags])
+
+
+_CORNERS_BY_FLAGS = [
+    tuple((name, bool(flags >> i & 1)) for i, name in enumerate(CORNERS))
+    for flags in range(ALL_CORNERS + 1)
+]
+
+
+class FrameContext:
+    """State of a frame travelling through the transforms of a Compose.
+
+    Transforms read and update the context in place through `apply`, so a
+    frame costs no keyword dict rebuilds or string lookups per stage, and
+    Compose reuses the same context from one frame to the next. Fields that
+    no transform has set yet are None, except `scale`: the size of the frame
+    relative to the source resolution, which transforms apply to the sizes
+    they are set up with in source pixels (1 unless rendering a proxy).
+
+    The rounded corners of the frame are kept as a bit mask of the flags
+    above in `rounded_corners`. For code written against the former kwargs
+    pipeline, the context also reads like a dict of its set fields
+    (`ctx['input']`, `'mask' in ctx`, `**ctx`) and exposes the corners as
+    the `mask_rounded_corners` dict.
+    """
+    __slots__ = (
+        'input', 'frame_index', 'scale',
+        'video_width', 'video_height',
+        'frame_width', 'frame_height',
+        'x_offset', 'y_offset',
+        'zoom_factor', 'rounded_corners',
+        'mask', 'shadow_mask',
+        'frame_plan', 'source', 'source_patches',
+    )
+
+    def __init__(self, input=None, frame_index=None, scale=1):
+        self.reset(input, frame_index, scale)
+
+    def reset(self, input=None, frame_index=None, scale=1):
+        """Clears every field, to start over with a new frame."""
+        self.input = input
+        self.frame_index = frame_index
+        self.scale = scale
+        self.video_width = None
+        self.video_height = None
+        self.frame_width = None
+        self.frame_height = None
+        self.x_offset = None
+        self.y_offset = None
+        self.zoom_factor = None
+        self.rounded_corners = None
+        self.mask = None
+        self.shadow_mask = None
+        self.frame_plan = None
+        # The frame the render started from when it has to be put back as it
+        # was (see Compose.render), and (x, y, pixels) of it that transforms
+        # drew over
+        self.source = None
+        self.source_patches = None
+        return self
+
+    @classmethod
+    def from_kwargs(cls, kwargs):
+        return cls().update(kwargs)
+
+    def update(self, kwargs):
+        """Sets fields from a kwargs dict of the former pipeline."""
+        for key, value in kwargs.items():
+            self[key] = value
+        return self
+
+    @property
+    def mask_rounded_corners(self):
+        if self.rounded_corners is None:
+            return None
+        return flags_to_corners(self.rounded_corners)
+
+    @mask_rounded_corners.setter
+    def mask_rounded_corners(self, corners):
+        self.rounded_corners = None if corners is None else corners_to_flags(corners)
+
+    def keys(self):
+        keys = [key for key in self.__slots__ if key != 'rounded_corners' and getattr(self, key) is not None]
+        if self.rounded_corners is not None:
+            keys.append('mask_rounded_corners')
+        return keys
+
+    def to_dict(self):
+        return {key: self[key] for key in self.keys()}
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in _FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key, default=None):
+        value = getattr(self, key) if key in _FIELDS else None
+        return default if value is None else value
+
+
+_FIELDS = frozenset(FrameContext.__slots__) | {'mask_rounded_corners'}
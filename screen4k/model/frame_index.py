@@ -0,0 +1,117 @@
+import os
+import shutil
+import subprocess
+
+import cv2
+import numpy as np
+from loguru import logger
+
+
+class FrameIndex:
+    """Keyframe positions and per-frame timestamps of a video.
+
+    The index is built once, from ffprobe when it is installed or else from
+    a packet scan with OpenCV (which reads the compressed stream without
+    decoding it), and saved in a sidecar next to the video. The sidecar is
+    rebuilt when the video changes.
+    """
+    def __init__(self, keyframes, timestamps):
+        self.keyframes = np.asarray(keyframes, dtype=np.int64)
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+
+    @property
+    def num_frames(self):
+        return len(self.timestamps)
+
+    def keyframe_before(self, frame_index):
+        """Returns the last keyframe at or before frame_index."""
+        i = np.searchsorted(self.keyframes, frame_index, side='right') - 1
+        return int(self.keyframes[i]) if i >= 0 else 0
+
+    @staticmethod
+    def sidecar_path(video_path):
+        return f'{video_path}.index.npz'
+
+    @classmethod
+    def load(cls, video_path):
+        """Returns the index of a video, from its sidecar or built (and saved) on the first use, empty if it cannot be read."""
+        sidecar_path = cls.sidecar_path(video_path)
+        try:
+            stat = os.stat(video_path)
+        except OSError as e:
+            # Like a VideoCapture that could not open the video, which then has no frames
+            logger.warning(f'Cannot index {video_path}: {e}')
+            return cls([0], [])
+
+        if os.path.exists(sidecar_path):
+            try:
+                with np.load(sidecar_path) as data:
+                    if data['source_size'] == stat.st_size and data['source_mtime'] == stat.st_mtime:
+                        return cls(data['keyframes'], data['timestamps'])
+            except (OSError, KeyError, ValueError) as e:
+                logger.warning(f'Ignoring unreadable frame index {sidecar_path}: {e}')
+
+        index = cls.build(video_path)
+        try:
+            index.save(sidecar_path, stat)
+        except OSError as e:
+            logger.warning(f'Could not save frame index {sidecar_path}: {e}')
+
+        return index
+
+    @classmethod
+    def build(cls, video_path):
+        if shutil.which('ffprobe') is not None:
+            try:
+                return cls._build_with_ffprobe(video_path)
+            except (OSError, subprocess.CalledProcessError, ValueError) as e:
+                logger.warning(f'ffprobe failed on {video_path}, scanning with OpenCV: {e}')
+
+        return cls._build_with_opencv(video_path)
+
+    @classmethod
+    def _build_with_ffprobe(cls, video_path):
+        command = [
+            'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+            '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', video_path
+        ]
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+
+        packets = []
+        for line in output.splitlines():
+            pts_time, _, flags = line.partition(',')
+            if pts_time and pts_time != 'N/A':
+                packets.append((float(pts_time), 'K' in flags))
+
+        # Packets are in decoding order, frames are numbered in presentation order
+        packets.sort()
+        timestamps = [pts_time for pts_time, _ in packets]
+        keyframes = [i for i, (_, is_keyframe) in enumerate(packets) if is_keyframe]
+        return cls(keyframes or [0], timestamps)
+
+    @classmethod
+    def _build_with_opencv(cls, video_path):
+        capture = cv2.VideoCapture(video_path)
+
+        # Raw mode returns the compressed packets, which is enough to read
+        # their flags and timestamps
+        capture.set(cv2.CAP_PROP_FORMAT, -1)
+
+        keyframes, timestamps = [], []
+        while capture.grab():
+            if capture.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(len(timestamps))
+            timestamps.append(capture.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+
+        capture.release()
+        return cls(keyframes or [0], timestamps)
+
+    def save(self, path, source_stat):
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                keyframes=self.keyframes,
+                timestamps=self.timestamps,
+                source_size=source_stat.st_size,
+                source_mtime=source_stat.st_mtime,
+            )
@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+
+
+class FrameTimestamps:
+    """Capture times of the frames of a recording, in seconds since it started.
+
+    ScreenRecorder writes one frame per 1/fps slot, repeating the previous
+    frame for slots it could not capture in time, and saves the time each
+    frame was actually captured at (the same time for repeats) in a sidecar
+    next to the video. Mouse events carry times of the same clock, which
+    the timestamps turn into frames.
+    """
+    def __init__(self, times, fps):
+        self.times = np.asarray(times, dtype=np.float64)
+        self.fps = fps
+
+    @staticmethod
+    def path_for(video_path):
+        return os.path.splitext(video_path)[0] + '.timestamps.npy'
+
+    @classmethod
+    def load(cls, video_path, fps):
+        """Returns the timestamps saved for a video, or None if it has none."""
+        path = cls.path_for(video_path)
+        if not os.path.exists(path):
+            return None
+        return cls(np.load(path), fps)
+
+    def save(self, video_path):
+        np.save(self.path_for(video_path), self.times)
+
+    def __len__(self):
+        return len(self.times)
+
+    def frame_at(self, t):
+        """Returns the first frame captured at or after time t, the first frame that can show an event at t."""
+        index = int(np.searchsorted(self.times, t, side='left'))
+        return min(index, len(self.times) - 1)
+
+    def jitter(self):
+        """Returns stats of how far the captured frames are from their slot times, in seconds.
+
+        Repeated frames are counted apart, since they show an earlier slot.
+        """
+        slot_times = np.arange(len(self.times)) / self.fps
+        captured = np.ones(len(self.times), dtype=bool)
+        captured[1:] = self.times[1:] != self.times[:-1]
+
+        offsets = np.abs(self.times[captured] - slot_times[captured])
+        if len(offsets) == 0:
+            offsets = np.zeros(1)
+
+        return {
+            'frames': len(self.times),
+            'repeated': int(len(self.times) - captured.sum()),
+            'jitter_mean': float(offsets.mean()),
+            'jitter_p95': float(np.percentile(offsets, 95)),
+            'jitter_max': float(offsets.max()),
+        }
@@ -1,14 +1,45 @@
+import os
+import math
 import time
-import cv2
 
 import threading
 from model.recorder import ScreenRecorder
+from model.video_reader import open_video
+from model.read_ahead import ReadAhead
+from model.playback_clock import PlaybackClock
+from model.render_worker import RenderWorker
+from model.export_job import ExportJob
+from model.encoder import OpenCVEncoder, default_encoder
+from model.raw_video import RawVideoEncoder, RAW_EXTENSION, is_raw_video
+from model.frame_timestamps import FrameTimestamps
+from model.mouse_moves import MouseMoves
 from model.transforms import (
     Compose, AspectRatio, Padding, Shadow,
     Inset, Roundness, Zoom, Cursor, Background
 )
 from utils.general import generate_video_path
-from utils.image import ImageAssets
+from utils.image import ImageAssets, downscale
+from utils.cache import LRUCache
+from utils.profiler import StageProfiler
+
+
+# Decoded source frames kept for scrubbing and stepping. The budget is counted
+# in frames of the current video, within a byte bound, so that 4K recordings
+# keep fewer frames instead of more memory.
+FRAME_CACHE_MAX_BYTES = 512 * 1024 * 1024
+FRAME_CACHE_MIN_FRAMES = 8
+FRAME_CACHE_MAX_FRAMES = 120
+
+# Frames rendered ahead of the playhead during playback. Output frames come
+# from the FramePools of the background and the inset, which must also hold
+# the frame being rendered, the one waiting for its time and the one being
+# displayed.
+PLAYBACK_QUEUE_DEPTH = 4
+FRAME_POOL_SIZE = PLAYBACK_QUEUE_DEPTH + 3
+
+# The preview renders at the scale that fits its display area, rounded up to
+# steps of this size so that resizing the window rarely re-decodes frames
+PREVIEW_SCALE_STEP = 1 / 8
 
 
 class Model:
@@ -17,7 +48,7 @@ class Model:
         self._output_video_path = None
         self._screen_recorder = None
 
-        self._video_capture = None
+        self._video_reader = None
         self._frame_width = None
         self._frame_height = None
         self._num_frames = None
@@ -25,6 +56,60 @@ class Model:
         self._duration = 0
         self._mouse_events = None
         self._transform = None
+        self._frame_cache = LRUCache(max_bytes=FRAME_CACHE_MAX_BYTES)
+        self._position = 0
+        self._preview_size = None
+        self._preview_scale = 1
+
+        # Decoding and rendering happen on the GUI thread and on the read-ahead one
+        self._render_lock = threading.RLock()
+        self._playback_clock = PlaybackClock()
+        self._read_ahead = ReadAhead(self._render, depth=PLAYBACK_QUEUE_DEPTH, clock=self._playback_clock)
+
+        # Frames requested by the editor are rendered on a worker thread, see
+        # request_frame. The version counts setting changes.
+        self._render_worker = RenderWorker(self._render)
+        self._settings_version = 0
+
+        # Set SCREEN4K_PROFILE to a .json path to get per-stage timings of exports
+        self._profile_path = os.environ.get('SCREEN4K_PROFILE')
+        self._profiler = StageProfiler() if self._profile_path else None
+
+        # Set SCREEN4K_EXPORT_WORKERS to the number of export render threads
+        # (or processes), one per spare core by default, and SCREEN4K_EXPORT_MODE
+        # to 'chunked' to export on processes, see ChunkedExporter
+        export_workers = os.environ.get('SCREEN4K_EXPORT_WORKERS')
+        self._export_workers = int(export_workers) if export_workers else None
+        self._export_mode = os.environ.get('SCREEN4K_EXPORT_MODE', 'pipeline')
+
+        # Set SCREEN4K_ENCODER to 'opencv' to encode with cv2.VideoWriter even
+        # when ffmpeg is installed
+        if os.environ.get('SCREEN4K_ENCODER') == 'opencv':
+            self._export_encoder = OpenCVEncoder()
+            self._record_encoder = OpenCVEncoder()
+            self._transcode_encoder = OpenCVEncoder()
+        else:
+            self._export_encoder = default_encoder()
+            self._record_encoder = default_encoder(preset='ultrafast', crf=18)
+            self._transcode_encoder = default_encoder(crf=18, nice=10)
+
+        # Set SCREEN4K_RECORD_MODE to 'intermediate' to record raw frames,
+        # which leaves the most CPU to the recorded applications, and
+        # transcode them at a low priority once the recording stops (the
+        # studio opens the raw video meanwhile). 'direct' encodes while recording.
+        self._record_mode = os.environ.get('SCREEN4K_RECORD_MODE', 'direct')
+        self._recording_path = None
+        self._transcode_job = None
+
+        # Set SCREEN4K_RECORD_REGION to 'x,y,width,height' in screen pixels to
+        # record only that part of the screen (e.g. one window), see set_record_region
+        record_region = os.environ.get('SCREEN4K_RECORD_REGION')
+        self._record_region = tuple(int(v) for v in record_region.split(',')) if record_region else None
+
+        # Set SCREEN4K_RECORD_QUEUE to what the recorder does with captured
+        # frames when the encoder falls behind: 'drop_oldest', 'block' or
+        # 'spill' (to disk), see FrameQueue
+        self._record_queue_policy = os.environ.get('SCREEN4K_RECORD_QUEUE', 'drop_oldest')
 
         self._input_video_path = '/home/tamnv/Downloads/test.mp4'
         # self._video_capture = cv2.VideoCapture(self._input_video_path)
@@ -53,13 +138,15 @@ class Model:
         #     'background': Background(background=background)
         # })
 
-        # Initialize video capture
-        self._video_capture = cv2.VideoCapture(self._input_video_path)
-        self._fps = int(self._video_capture.get(cv2.CAP_PROP_FPS))
-        self._frame_width = int(self._video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
-        self._frame_height = int(self._video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        self._num_frames = int(self._video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        # Initialize video reader
+        self._video_reader = open_video(self._input_video_path)
+        self._fps = self._video_reader.fps
+        self._frame_width = self._video_reader.frame_width
+        self._frame_height = self._video_reader.frame_height
+        self._num_frames = self._video_reader.num_frames
         self._duration = self._num_frames / self._fps if self._fps > 0 else 0
+        self._timestamps = FrameTimestamps.load(self._input_video_path, self._fps)
+        self._reset_frame_cache()
 
         # Mouse events
         self._mouse_events = {
@@ -71,73 +158,278 @@ class Model:
             ]
         }
 
+        # Moves recorded with the video, see MouseMoves
+        moves = MouseMoves.load(self._input_video_path)
+        if moves is not None:
+            self._mouse_events['move'] = moves
+
         background = {'type': 'wallpaper','value': 1}
         self._transform = Compose({
             'aspect_ratio': AspectRatio('Auto'),
-            'cursor': Cursor(move_data=self._mouse_events['move']),
+            'cursor': Cursor(move_data=self._mouse_events['move'], timestamps=self._timestamps),
             'padding': Padding(padding=100),
             # 'inset': Inset(inset=0),
-            'zoom': Zoom(click_data=self._mouse_events['click'], fps=self._fps),
+            'zoom': Zoom(click_data=self._mouse_events['click'], fps=self._fps, timestamps=self._timestamps),
             'roundness': Roundness(radius=20),
             'shadow': Shadow(),
-            'background': Background(background=background),
-        })
-
-    def _get(self, frame_index=None):
-        if self._video_capture is None:
-            print('Video capture is None')
+            'background': Background(background=background, pool_size=FRAME_POOL_SIZE),
+        }, num_frames=self._num_frames, profiler=self._profiler)
+
+    def _reset_frame_cache(self):
+        """Empties the frame cache and sizes its budget for the current video."""
+        self._position = 0
+        self._size_frame_cache()
+
+    def _size_frame_cache(self):
+        self._frame_cache.clear()
+
+        width, height = self._scaled_size(self._preview_scale)
+        frame_bytes = max(1, width * height * 3)
+        num_frames = FRAME_CACHE_MAX_BYTES // frame_bytes
+        num_frames = min(max(num_frames, FRAME_CACHE_MIN_FRAMES), FRAME_CACHE_MAX_FRAMES)
+        self._frame_cache.resize(num_frames * frame_bytes)
+
+    def _scaled_size(self, scale):
+        if scale == 1:
+            return self._frame_width, self._frame_height
+        return max(1, round(self._frame_width * scale)), max(1, round(self._frame_height * scale))
+
+    def set_preview_size(self, width, height):
+        """Renders the preview at the resolution it is displayed at in a width x height area.
+
+        Source frames are downscaled once when decoded and the transforms
+        render at that scale, so previewing a 4K video costs about as much as
+        a smaller one. Pass None to preview at full resolution, which exports
+        always render at.
+        """
+        self._preview_size = None if width is None or height is None else (width, height)
+        self._update_preview_scale()
+
+    def _update_preview_scale(self):
+        scale = 1
+        if self._preview_size is not None and self._frame_width and self._transform is not None:
+            canvas_width, canvas_height = self._frame_width, self._frame_height
+            aspect_ratio = self._transform['aspect_ratio']
+            if aspect_ratio is not None:
+                canvas_width, canvas_height = aspect_ratio.canvas_size(canvas_width, canvas_height)
+
+            preview_width, preview_height = self._preview_size
+            scale = min(preview_width / canvas_width, preview_height / canvas_height)
+            scale = min(1, max(1, math.ceil(scale / PREVIEW_SCALE_STEP)) * PREVIEW_SCALE_STEP)
+
+        if scale == self._preview_scale:
             return
 
-        self._frame_index = int(self._video_capture.get(cv2.CAP_PROP_POS_FRAMES))
+        with self._render_lock:
+            self._preview_scale = scale
+            self._size_frame_cache()
+            self._settings_version += 1
+
+        # Frames rendered ahead are at the former scale
+        self._read_ahead.seek(self._position)
+
+    @property
+    def preview_scale(self):
+        return self._preview_scale
+
+    def _read(self, frame_index, cache=True, scale=None):
+        """Returns the decoded (read-only) source frame at frame_index, or None past the end.
+
+        Frames are downscaled to `scale` (the preview scale by default). They
+        come from the cache when possible, else from the video reader, which
+        seeks through the keyframe index of the video. The cache only holds
+        frames at the preview scale. With `cache` off, newly decoded frames
+        are not added, e.g. when exporting.
+        """
+        if scale is None:
+            scale = self._preview_scale
+
+        cacheable = scale == self._preview_scale
+        if cacheable:
+            frame = self._frame_cache.get(frame_index)
+            if frame is not None:
+                return frame
+
+        frame = self._video_reader.read(frame_index)
+        if frame is None:
+            return None
+
+        if scale != 1:
+            frame = downscale(frame, self._scaled_size(scale))
+
+        frame.setflags(write=False)
+        if cache and cacheable:
+            self._frame_cache.put(frame_index, frame)
+
+        return frame
+
+    def _render(self, frame_index, cache=True, scale=None):
+        """Returns the rendered frame at frame_index, or None past the end."""
+        with self._render_lock:
+            if scale is None:
+                scale = self._preview_scale
+
+            frame = self._read(frame_index, cache=cache, scale=scale)
+            if frame is None:
+                return None
 
-        if frame_index is not None:
-            self._video_capture.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+            if self._transform is not None:
+                frame = self._transform.render(frame, frame_index, scale).input
 
-        ret, frame = self._video_capture.read()
-        if not ret:
+            return frame
+
+    def _get(self, frame_index=None, cache=True, scale=None):
+        if self._video_reader is None:
+            print('Video reader is None')
+            return
+
+        if frame_index is None:
+            frame_index = self._position
+
+        frame = self._render(frame_index, cache=cache, scale=scale)
+        if frame is None:
             print('empty frame')
             return
 
-        if self._transform is not None:
-            result = self._transform(input=frame, frame_index=self._frame_index)
-            frame = result['input']
+        self._frame_index = frame_index
+        self._position = frame_index + 1
 
         return frame
 
     def start_recording(self):
-        if self._screen_recorder is None:
-            self._input_video_path = generate_video_path()
-            self._screen_recorder = ScreenRecorder(self._input_video_path)
+        if self._transcode_job is not None and self._transcode_job.running:
+            # The new recording overwrites the video being transcoded
+            self._transcode_job.cancel()
+            self._transcode_job.wait()
 
-        print('start recording', self._input_video_path)
+        if self._screen_recorder is None:
+            self._recording_path = generate_video_path()
+            encoder = self._record_encoder
+            if self._record_mode == 'intermediate':
+                # Next to the final video, which keeps its stem for the timestamps sidecar
+                self._recording_path = os.path.splitext(self._recording_path)[0] + RAW_EXTENSION
+                encoder = RawVideoEncoder()
+
+            self._screen_recorder = ScreenRecorder(
+                self._recording_path, encoder=encoder, queue_policy=self._record_queue_policy,
+                region=self._record_region
+            )
+
+        print('start recording', self._recording_path)
         self._screen_recorder.start_recording()
 
-    def stop_recording(self):
+    def set_record_region(self, region):
+        """Records only `region` (x, y, width, height) of the screen from the next recording on, None for all of it."""
+        self._record_region = tuple(region) if region is not None else None
+        if self._screen_recorder is not None and not self._screen_recorder.recording:
+            # The capture area is set when the recorder starts its stream
+            self._screen_recorder.close()
+            self._screen_recorder = None
+
+    def stop_recording(self, on_transcode_progress=None, on_transcoded=None):
+        """Stops the recording and opens it in the studio.
+
+        An intermediate recording opens right away and is transcoded in the
+        background, see transcode_job, with the callbacks of ExportJob.
+        """
         print('stop recording')
         if self._screen_recorder is not None:
             self._screen_recorder.stop_recording()
-
-            # Initialize video capture
-            self._video_capture = cv2.VideoCapture(self._input_video_path)
-            self._fps = int(self._video_capture.get(cv2.CAP_PROP_FPS))
-            self._frame_width = int(self._video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
-            self._frame_height = int(self._video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            self._num_frames = int(self._video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.stop_playback()
+            self._input_video_path = self._recording_path
+
+            # Initialize video reader
+            if self._video_reader is not None:
+                self._video_reader.release()
+
+            self._video_reader = open_video(self._input_video_path)
+            self._fps = self._video_reader.fps
+            self._frame_width = self._video_reader.frame_width
+            self._frame_height = self._video_reader.frame_height
+            self._num_frames = self._video_reader.num_frames
             self._duration = self._num_frames / self._fps if self._fps > 0 else 0
+            self._reset_frame_cache()
+
+            # Frame capture times, which mouse events are matched with
+            self._timestamps = FrameTimestamps.load(self._input_video_path, self._fps)
+            if self._timestamps is not None:
+                jitter = self._timestamps.jitter()
+                print(
+                    f"Recorded {jitter['frames']} frames, {jitter['repeated']} repeated, capture jitter "
+                    f"{jitter['jitter_mean'] * 1000:.1f} ms mean, {jitter['jitter_max'] * 1000:.1f} ms max"
+                )
 
             # Mouse events
             self._mouse_events = self._screen_recorder.mouse_events
+            zoom = Zoom(click_data=self._mouse_events['click'], fps=self._fps, timestamps=self._timestamps)
+
+            # The timeline shows clicks at their frame index
+            for click, frame_index in zip(self._mouse_events['click'], zoom.clicked_indices):
+                click[2] = frame_index
 
             background = {'type': 'wallpaper','value': 1}
             self._transform = Compose({
                 'aspect_ratio': AspectRatio('Auto'),
-                'background': Background(background=background),
-                'cursor': Cursor(move_data=self._mouse_events['move']),
                 'padding': Padding(padding=100),
                 # 'inset': Inset(inset=0),
-                'zoom': Zoom(click_data=self._mouse_events['click'], fps=self._fps),
+                'zoom': zoom,
+                'cursor': Cursor(move_data=self._mouse_events['move'], timestamps=self._timestamps),
                 # 'roundness': Roundness(radius=20),
-            })
+                'background': Background(background=background, pool_size=FRAME_POOL_SIZE),
+            }, num_frames=self._num_frames, profiler=self._profiler)
+            self._update_preview_scale()
+
+            if is_raw_video(self._input_video_path):
+                self._start_transcode(on_transcode_progress, on_transcoded)
+
+    @property
+    def transcode_job(self):
+        """The ExportJob turning the last intermediate recording into its final video, or None."""
+        return self._transcode_job
+
+    def _start_transcode(self, on_progress=None, on_finished=None):
+        def _finished(job):
+            stats = job.stats()
+            if job.state == 'done':
+                self._open_transcoded(job.input_path, job.output_path)
+                print(
+                    f"Transcoded {stats['frames_done']} frames as {job.output_path} in {stats['elapsed']:.1f}s "
+                    f"({stats['average_fps']:.1f} fps)"
+                )
+            else:
+                print(f"Transcode of {job.input_path} {job.state}, the studio keeps the raw video")
+
+            if on_finished is not None:
+                on_finished(job)
+
+        output_path = os.path.splitext(self._input_video_path)[0] + '.mp4'
+        self._transcode_job = ExportJob(
+            self._input_video_path, None, output_path, self._fps,
+            encoder=self._transcode_encoder, index=self._video_reader.index,
+            on_progress=on_progress, on_finished=_finished
+        )
+        print(f'transcoding with {self._transcode_encoder}...')
+        self._transcode_job.start()
+
+    def _open_transcoded(self, raw_path, output_path):
+        """Swaps the raw video for its transcode, on the job thread."""
+        reader = open_video(output_path)
+        with self._render_lock:
+            if self._input_video_path != raw_path:
+                reader.release()
+                return
+
+            self._video_reader.release()
+            self._video_reader = reader
+            self._input_video_path = output_path
+            # Same frames up to the lossy encoding, the playhead stays
+            self._frame_cache.clear()
+            self._settings_version += 1
+
+        try:
+            os.remove(raw_path)
+        except OSError as e:
+            print(f'Could not remove {raw_path}: {e}')
 
     def cancel_recording(self):
         print('cancel recording')
@@ -148,6 +440,7 @@ class Model:
 
     @property
     def current_frame(self):
+        """Re-renders the last frame, e.g. after a setting changed, from the frame cache."""
         frame_index = self.current_frame_index
         frame = self._get(self._frame_index)
         self.current_frame_index = frame_index
@@ -155,11 +448,68 @@ class Model:
 
     @property
     def current_frame_index(self):
-        return int(self._video_capture.get(cv2.CAP_PROP_POS_FRAMES))
+        """Index of the frame next_frame returns."""
+        return self._position
 
     @current_frame_index.setter
     def current_frame_index(self, value):
-        self._video_capture.set(cv2.CAP_PROP_POS_FRAMES, value)
+        if value != self._position:
+            self._position = value
+            self._seek_playback(value)
+
+    def _seek_playback(self, frame_index):
+        if self._playback_clock.running:
+            self._playback_clock.start(frame_index, self._fps)
+        self._read_ahead.seek(frame_index)
+
+    def start_playback(self):
+        """Starts rendering frames ahead of the playhead, see poll_playback_frame."""
+        self._playback_clock.reset_stats()
+        self._playback_clock.start(self._position, self._fps)
+        self._read_ahead.start(self._position)
+
+    def stop_playback(self):
+        self._read_ahead.stop()
+        self._playback_clock.stop()
+
+    def poll_playback_frame(self):
+        """Returns the frame to display now, or None if it is still the previous one.
+
+        Frames follow the playback clock, at the fps of the video in real
+        time: frames that are not ready by the time the next one is due are
+        dropped (see playback_stats). Poll more often than the frame rate to
+        display each frame close to its time. Playback is over once
+        `playback_finished` is True.
+        """
+        item = self._read_ahead.get()
+        if item is None:
+            return None
+
+        frame_index, frame = item
+        self._frame_index = frame_index
+        self._position = frame_index + 1
+        self._playback_clock.presented += 1
+        return frame
+
+    @property
+    def playback_finished(self):
+        return self._read_ahead.exhausted
+
+    @property
+    def playback_stats(self):
+        """Counts of the frames presented, dropped and late since playback started."""
+        return self._playback_clock.stats()
+
+    @property
+    def frame_cache_stats(self):
+        return self._frame_cache.stats()
+
+    @property
+    def render_stats(self):
+        """Counts of the preview frames rendered and of those that reused the previous output."""
+        if self._transform is None:
+            return {'rendered': 0, 'reused': 0, 'reuse_rate': 0}
+        return self._transform.reuse_stats()
 
     @property
     def fps(self):
@@ -181,57 +531,135 @@ class Model:
         return self._get()
 
     def get_frame(self, frame_index):
-        return self._get(frame_index)
+        frame = self._get(frame_index)
+        self._seek_playback(self._position)
+        return frame
+
+    def request_frame(self, frame_index, callback):
+        """Moves to frame_index and renders it on the render worker, see RenderWorker.
+
+        `callback(frame_index, frame)` gets the frame on the worker thread.
+        A request replaces the previous one if it has not started rendering
+        yet, so that only the latest of many requests is rendered.
+        """
+        frame_index = min(max(frame_index, 0), max(self._num_frames - 1, 0))
+        self._frame_index = frame_index
+        self.current_frame_index = frame_index + 1
+        self._render_worker.request(frame_index, self._settings_version, callback)
+
+    def request_current_frame(self, callback):
+        """Re-renders the last frame on the render worker, e.g. after a setting changed."""
+        self._render_worker.request(self._frame_index, self._settings_version, callback)
+
+    def _set_transform(self, key, transform):
+        with self._render_lock:
+            self._transform[key] = transform
+            self._settings_version += 1
+
+        # Frames rendered ahead used the former settings
+        self._read_ahead.seek(self._position)
 
     def set_background(self, background):
-        self._transform['background'] = Background(background=background)
+        self._set_transform('background', Background(background=background, pool_size=FRAME_POOL_SIZE))
+
+    def prefetch_background(self, background):
+        """Loads a background at the current canvas size off the GUI thread.
+
+        Returns a Future, or None before the first frame has been rendered.
+        """
+        current = self._transform['background']
+        if current is None or current.background_image is None:
+            return None
+
+        height, width = current.background_image.shape[:2]
+        return Background.prefetch(background, width, height)
 
     def set_padding(self, padding):
-        self._transform['padding'] = Padding(padding=padding)
+        self._set_transform('padding', Padding(padding=padding))
 
     def set_inset(self, inset):
-        self._transform['inset'] = Inset(inset=inset)
+        self._set_transform('inset', Inset(inset=inset, pool_size=FRAME_POOL_SIZE))
 
     def set_roundness(self, radius):
-        self._transform['roundness'] = Roundness(radius=radius)
+        self._set_transform('roundness', Roundness(radius=radius))
 
     def set_aspect_ratio(self, aspect_ratio):
-        self._transform['aspect_ratio'] = AspectRatio(aspect_ratio=aspect_ratio)
+        self._set_transform('aspect_ratio', AspectRatio(aspect_ratio=aspect_ratio))
+        self._update_preview_scale()
 
     def update_click_event(self, index, event):
         # TODO: validate the input event
-        pass
+        if index < len(self._mouse_events['click']):
+            # Edited clicks keep their frame index, not the time they were recorded at
+            self._mouse_events['click'][index] = list(event[:4])
+            self._update_click_events()
 
     def delete_click_event(self, index):
         if index < len(self._mouse_events['click']):
             del self._mouse_events['click'][index]
+            self._update_click_events()
 
-    def export_video(self):
-        def _export_video():
-            print('exporting...')
-            current_frame_index = self.current_frame_index
-            self.current_frame_index = 0
-
-            output_path = '/home/tamnv/Downloads/output.mp4'
-            writer = None
+    def _update_click_events(self):
+        with self._render_lock:
+            zoom = self._transform['zoom']
+            if zoom is not None:
+                zoom.update_clicks()
 
-            while True:
-                frame = self._get()
-                if frame is None:
-                    break
+            self._transform.invalidate()
+            self._settings_version += 1
 
-                if writer is None:
-                    frame_height, frame_width = frame.shape[:2]
-                    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), self._fps, (frame_width, frame_height))
+        self._read_ahead.seek(self._position)
 
-                if writer is not None:
-                    writer.write(frame)
-
-            if writer is not None:
-                writer.release()
-
-            self._video_capture.set(cv2.CAP_PROP_POS_FRAMES, current_frame_index)
-            print(f'Exported output as {output_path}')
+    def dump_profile(self, path):
+        """Writes the per-stage percentiles to `path` and a Chrome trace next to it."""
+        profiler = self._transform.profiler if self._transform is not None else None
+        if profiler is None:
+            return
 
-        t = threading.Thread(target=_export_video)
-        t.start()
\ No newline at end of file
+        profiler.dump_json(path)
+        profiler.dump_chrome_trace(os.path.splitext(path)[0] + '.trace.json')
+        print(f'Saved render profile as {path}')
+
+    def export_video(self, output_path, encoder=None, num_workers=None, mode=None, on_progress=None, on_finished=None):
+        """Starts exporting the video with the current settings, returns the ExportJob.
+
+        `mode` is 'pipeline' to render on threads (see Exporter) or 'chunked'
+        to render chunks on processes (see ChunkedExporter). `encoder` is an
+        OpenCVEncoder or FFmpegEncoder, see model.encoder. The callbacks are
+        those of ExportJob.
+        """
+        if num_workers is None:
+            num_workers = self._export_workers
+        if mode is None:
+            mode = self._export_mode
+        if encoder is None:
+            encoder = self._export_encoder
+
+        def _finished(job):
+            stats = job.stats()
+            if job.state == 'done':
+                stage_times = ', '.join(f'{stage} {seconds:.1f}s' for stage, seconds in stats['stage_times'].items())
+                print(
+                    f"Exported {stats['frames_done']} frames as {job.output_path} in {stats['elapsed']:.1f}s "
+                    f"({stats['average_fps']:.1f} fps, {stats['reused_frames']} frames reused; {stage_times})"
+                )
+            else:
+                print(f"Export of {job.output_path} {job.state} after {stats['frames_done']} frames")
+
+            if self._profiler is not None:
+                self.dump_profile(self._profile_path)
+
+            if on_finished is not None:
+                on_finished(job)
+
+        # Exports render at full resolution on their own reader and copies of
+        # the transforms, so the preview keeps working meanwhile
+        with self._render_lock:
+            job = ExportJob(
+                self._input_video_path, self._transform, output_path, self._fps,
+                encoder=encoder, mode=mode, num_workers=num_workers, index=self._video_reader.index,
+                on_progress=on_progress, on_finished=_finished
+            )
+
+        print(f'exporting with {encoder}...')
+        return job.start()
\ No newline at end of file
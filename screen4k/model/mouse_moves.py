@@ -0,0 +1,67 @@
+import os
+from array import array
+
+import numpy as np
+
+
+# Layout of the sidecar, 16 bytes per move
+MOVE_DTYPE = np.dtype([('time', '<f8'), ('x', '<f4'), ('y', '<f4')])
+
+
+class MouseMoves:
+    """Mouse positions with the time they moved to, on the clock of FrameTimestamps.
+
+    Moves are appended to array.array columns, 16 bytes each rather than a
+    list of floats per move, by one thread at a time (the mouse listener)
+    without a lock: appends are atomic, and the time is appended last, so
+    readers take the moves up to the length of the time column.
+
+    The recorder appends screen positions and saves the moves in fractions
+    of the recorded area (see normalized) in a sidecar next to the video.
+    """
+    def __init__(self, times=(), xs=(), ys=()):
+        self._xs = array('f', xs)
+        self._ys = array('f', ys)
+        self._times = array('d', times)
+
+    @staticmethod
+    def path_for(video_path):
+        return os.path.splitext(video_path)[0] + '.mouse.npy'
+
+    @classmethod
+    def load(cls, video_path):
+        """Returns the moves saved for a video, or None if it has none."""
+        path = cls.path_for(video_path)
+        if not os.path.exists(path):
+            return None
+        moves = np.load(path)
+        return cls(moves['time'], moves['x'], moves['y'])
+
+    def save(self, video_path):
+        times, positions = self.arrays()
+        moves = np.empty(len(times), dtype=MOVE_DTYPE)
+        moves['time'], moves['x'], moves['y'] = times, positions[:, 0], positions[:, 1]
+        np.save(self.path_for(video_path), moves)
+
+    def __len__(self):
+        return len(self._times)
+
+    def append(self, t, x, y):
+        self._xs.append(x)
+        self._ys.append(y)
+        self._times.append(t)
+
+    def arrays(self):
+        """Returns copies of the move times and of the positions as an (n, 2) array."""
+        n = len(self._times)
+        # Slices are copies, the listener can keep growing the columns meanwhile
+        times = np.frombuffer(self._times[:n], dtype=np.float64)
+        positions = np.empty((n, 2), dtype=np.float64)
+        positions[:, 0] = np.frombuffer(self._xs[:n], dtype=np.float32)
+        positions[:, 1] = np.frombuffer(self._ys[:n], dtype=np.float32)
+        return times, positions
+
+    def normalized(self, x, y, width, height):
+        """Returns the moves in fractions of the area (x, y, width, height), in the units of the positions."""
+        times, positions = self.arrays()
+        return MouseMoves(times, (positions[:, 0] - x) / width, (positions[:, 1] - y) / height)
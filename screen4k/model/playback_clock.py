@@ -0,0 +1,56 @@
+import math
+import time
+
+
+class PlaybackClock:
+    """Maps the monotonic clock to the frame that should be on screen.
+
+    Playback starts at `frame_index` when `start` is called and then
+    advances at `fps` in real time, whatever time decoding and rendering
+    take. Frames that cannot be ready in time are dropped instead of
+    slowing playback down, and the counters below tell how often it
+    happens:
+
+    - skipped: frames the renderer did not render because it was behind;
+    - discarded: rendered frames replaced by a later one before display;
+    - late: frames displayed while a later frame was already due.
+    """
+    def __init__(self):
+        self.fps = 0
+        self.running = False
+        self._origin = 0.0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.presented = 0
+        self.skipped = 0
+        self.discarded = 0
+        self.late = 0
+
+    def start(self, frame_index, fps):
+        self.fps = fps
+        self._origin = time.monotonic() - frame_index / fps if fps > 0 else time.monotonic()
+        self.running = fps > 0
+
+    def stop(self):
+        self.running = False
+
+    def frame_at(self, t):
+        """Returns the frame due at monotonic time t."""
+        return math.floor((t - self._origin) * self.fps)
+
+    def due_frame(self):
+        return self.frame_at(time.monotonic())
+
+    @property
+    def dropped(self):
+        return self.skipped + self.discarded
+
+    def stats(self):
+        return {
+            'presented': self.presented,
+            'dropped': self.dropped,
+            'skipped': self.skipped,
+            'discarded': self.discarded,
+            'late': self.late,
+        }
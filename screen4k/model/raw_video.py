@@ -0,0 +1,117 @@
+import os
+import struct
+
+import numpy as np
+
+from model.frame_index import FrameIndex
+
+
+RAW_EXTENSION = '.s4kraw'
+
+# Magic, width, height and fps, padded to keep the frames aligned
+_HEADER = struct.Struct('<8sIId')
+_HEADER_SIZE = 64
+_MAGIC = b'S4KRAW1\0'
+
+
+def is_raw_video(path):
+    return os.path.splitext(path)[1].lower() == RAW_EXTENSION
+
+
+class RawVideoEncoder:
+    """Writes BGR frames as they are, after a small header, without compressing them.
+
+    Writing a frame costs little more than copying it to the disk, so the
+    recorder can use it to leave the CPU to the application being recorded,
+    at the cost of width * height * 3 bytes per frame (about 150 MB/s for
+    1080p at 25 fps). Read the result back with RawVideoReader.
+    """
+    def open(self, output_path, fps, width, height):
+        """Returns a writer with write(frame) and release() for BGR frames of the given size."""
+        return RawVideoWriter(output_path, fps, width, height)
+
+    def __repr__(self):
+        return 'RawVideoEncoder()'
+
+
+class RawVideoWriter:
+    def __init__(self, output_path, fps, width, height):
+        self._shape = (height, width, 3)
+        self._file = open(output_path, 'wb')
+        self._file.write(_HEADER.pack(_MAGIC, width, height, fps).ljust(_HEADER_SIZE, b'\0'))
+
+    def write(self, frame):
+        if frame.shape != self._shape or frame.dtype != np.uint8:
+            raise ValueError(f'Expected a {self._shape} uint8 frame, got {frame.shape} {frame.dtype}')
+        self._file.write(memoryview(np.ascontiguousarray(frame)).cast('B'))
+
+    def release(self):
+        self._file.close()
+
+
+class RawVideoReader:
+    """Random access frame reader over a RawVideoEncoder file, with the interface of VideoReader.
+
+    Frames are read straight from their offset in the file, so seeking
+    costs nothing. An incomplete last frame (e.g. after a crash) is left out.
+    """
+    def __init__(self, path, index=None):
+        self.path = path
+        self._file = open(path, 'rb')
+        magic, width, height, fps = _HEADER.unpack(self._file.read(_HEADER.size))
+        if magic != _MAGIC:
+            self._file.close()
+            raise ValueError(f'{path} is not a raw video')
+
+        self._fps = fps
+        self._shape = (height, width, 3)
+        self._frame_size = width * height * 3
+        self._num_frames = (os.path.getsize(path) - _HEADER_SIZE) // self._frame_size
+
+        # Every frame is a keyframe
+        frame_indices = np.arange(self._num_frames)
+        self.index = index if index is not None else FrameIndex(frame_indices, frame_indices / fps)
+
+        # Index of the frame that read() returns next, None past the end
+        self.position = 0
+
+    @property
+    def fps(self):
+        return int(self._fps)
+
+    @property
+    def frame_width(self):
+        return self._shape[1]
+
+    @property
+    def frame_height(self):
+        return self._shape[0]
+
+    @property
+    def num_frames(self):
+        return self._num_frames
+
+    def read(self, frame_index=None):
+        """Returns the frame at frame_index (the next one by default), None past the end."""
+        if frame_index is None:
+            frame_index = self.position
+            if frame_index is None:
+                return None
+
+        if not 0 <= frame_index < self.num_frames:
+            self.position = None
+            return None
+
+        # Read into the frame rather than mapped, a file that shrinks (e.g.
+        # overwritten by a new recording) then gives a short read, not a crash
+        frame = np.empty(self._shape, dtype=np.uint8)
+        self._file.seek(_HEADER_SIZE + frame_index * self._frame_size)
+        if self._file.readinto(memoryview(frame).cast('B')) != self._frame_size:
+            self.position = None
+            return None
+
+        self.position = frame_index + 1
+        return frame
+
+    def release(self):
+        self._file.close()
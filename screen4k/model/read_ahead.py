@@ -0,0 +1,182 @@
+import time
+import threading
+from queue import Queue, Empty, Full
+
+from loguru import logger
+
+
+class ReadAhead:
+    """Renders frames ahead of the playhead on a background thread.
+
+    `render(frame_index)` is called for consecutive frames from the position
+    given to `start` or `seek`, and returns the rendered frame or None past
+    the end of the video. Up to `depth` frames wait in a queue for `get`,
+    which never blocks. Every seek starts a new generation: queued frames of
+    the previous ones are dropped, and a render that was in flight is thrown
+    away once it completes.
+
+    With a running PlaybackClock, the renderer skips the frames that would
+    be done after they are due, and `get` only returns the latest frame that
+    is due, dropping the ones before it and keeping later ones for later.
+
+    Rendered frames are handed over as they are, so if they come from a
+    FramePool, the pool must hold more than `depth` + 2 frames.
+
+    A render that raises is logged and ends rendering like the end of the
+    video: the reader becomes `exhausted` and `error` holds the exception,
+    until the next seek.
+    """
+    def __init__(self, render, depth=4, clock=None):
+        self.depth = depth
+        self.clock = clock
+        self._render = render
+        self._queue = Queue(maxsize=depth)
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+        self._generation = 0
+        self._next_index = 0
+        self._finished = False
+        self.error = None
+
+        # Frame taken from the queue that is not due yet
+        self._pending = None
+        # Moving average of the render time, to aim at the frame due when it is done
+        self._render_time = 0.0
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def exhausted(self):
+        """Whether the end of the video was reached and every frame was taken."""
+        return self._finished and self._pending is None and self._queue.empty()
+
+    def start(self, frame_index):
+        self.seek(frame_index)
+
+        with self._condition:
+            self._running = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='read-ahead', daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._generation += 1
+            self._drain()
+            self._condition.notify_all()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def seek(self, frame_index):
+        """Restarts rendering from frame_index, dropping the frames rendered so far."""
+        with self._condition:
+            self._generation += 1
+            self._next_index = frame_index
+            self._finished = False
+            self.error = None
+            self._drain()
+            self._condition.notify_all()
+
+    def get(self):
+        """Returns the next (frame_index, frame), or None if it is not rendered (or due) yet."""
+        clock = self.clock
+        due = clock.due_frame() if clock is not None and clock.running else None
+
+        item = None
+        while True:
+            next_item = self._take()
+            if next_item is None:
+                break
+
+            if due is not None and next_item[0] > due:
+                self._pending = next_item
+                break
+
+            if item is not None:
+                clock.discarded += 1
+            item = next_item
+
+            if due is None:
+                break
+
+        if item is not None and due is not None and item[0] < due:
+            clock.late += 1
+        return item
+
+    def _take(self):
+        if self._pending is not None:
+            item, self._pending = self._pending, None
+            return item
+
+        while True:
+            try:
+                generation, frame_index, frame = self._queue.get_nowait()
+            except Empty:
+                return None
+
+            if generation == self._generation:
+                return frame_index, frame
+
+    def _drain(self):
+        self._pending = None
+        while True:
+            try:
+                self._queue.get_nowait()
+            except Empty:
+                return
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and self._finished:
+                    self._condition.wait()
+
+                if not self._running:
+                    return
+
+                generation, frame_index = self._generation, self._next_index
+
+            clock = self.clock
+            if clock is not None and clock.running:
+                target = clock.frame_at(time.monotonic() + self._render_time)
+                if frame_index < target:
+                    clock.skipped += target - frame_index
+                    frame_index = target
+
+            t0 = time.monotonic()
+            try:
+                frame = self._render(frame_index)
+            except Exception as e:
+                logger.exception(f'Rendering frame {frame_index} ahead failed')
+                with self._condition:
+                    if generation == self._generation:
+                        self.error = e
+                        self._finished = True
+                continue
+            self._render_time = 0.8 * self._render_time + 0.2 * (time.monotonic() - t0)
+
+            with self._condition:
+                if generation != self._generation:
+                    continue
+
+                if frame is None:
+                    self._finished = True
+                    continue
+
+                self._next_index = frame_index + 1
+
+            # Wait for room in the queue, unless a seek makes the frame stale
+            while generation == self._generation:
+                try:
+                    self._queue.put((generation, frame_index, frame), timeout=0.05)
+                    break
+                except Full:
+                    pass
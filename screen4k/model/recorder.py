@@ -1,17 +1,53 @@
 import os
 import time
+from collections import deque
 from threading import Thread, Event
-import cv2
+
+import numpy as np
 from vidgear.gears import ScreenGear
 from pynput.mouse import Listener, Controller
 from loguru import logger
 
+from model.encoder import default_encoder
+from model.frame_timestamps import FrameTimestamps
+from model.mouse_moves import MouseMoves
+from utils.frame_queue import FrameQueue
+
+
+# Memory for frames waiting to be encoded, about 2 seconds of 1080p at 25 fps
+RECORD_QUEUE_MAX_BYTES = 320 * 1024 ** 2
+# Frames the encode latency and capture jitter are measured over
+STATS_WINDOW = 250
+
 
 class ScreenRecorder:
-    def __init__(self, output_path: str = None, start_delay: float = 0.5):
+    """Records the screen, or the `region` (x, y, width, height) of it in screen pixels, with the mouse events.
+
+    Only the pixels of the region are captured, encoded and later rendered.
+    Mouse positions are relative to the recorded area, and clicks outside
+    of it are left out. Moves are recorded as the mouse listener reports
+    them, see MouseMoves, and saved next to the video.
+    """
+    def __init__(self, output_path: str = None, start_delay: float = 0.5, encoder=None,
+                 queue_policy: str = 'drop_oldest', queue_max_bytes: int = RECORD_QUEUE_MAX_BYTES, region=None):
         self._output_path = output_path
         self._start_delay = start_delay
+        # Encoding has to keep up with the capture, so favour speed over size
+        self._encoder = encoder if encoder is not None else default_encoder(preset='ultrafast', crf=18)
         self._writer = None
+
+        # Captured frames wait in a queue for the encode thread, see FrameQueue
+        # for the policies when the encoder falls behind
+        self._queue_policy = queue_policy
+        self._queue_max_bytes = queue_max_bytes
+        self._queue = None
+        self._latencies = deque(maxlen=STATS_WINDOW)
+        self._jitter = deque(maxlen=STATS_WINDOW)
+        self._frames_captured = 0
+        self._slots_skipped = 0
+        self._frames_written = 0
+        self._frames_repeated = 0
+        self._start_ns = time.monotonic_ns()
         self._frame_index = 0
         self._frame_width = None
         self._frame_height = None
@@ -19,10 +55,11 @@ class ScreenRecorder:
         self._maximum_fps = 200
         self._default_duration = 3
 
-        self._stream = ScreenGear().start()  # Initialize the screen capture stream
+        self._region = tuple(region) if region is not None else None
+        self._stream = ScreenGear(**self._capture_options()).start()  # Initialize the screen capture stream
         self._record_thread = None
         self._mouse_track_thread = None
-        self._moues_events = {'move': [], 'click': []}
+        self._moues_events = {'move': MouseMoves(), 'click': []}
 
         self._mouse_controller = Controller()
 
@@ -38,6 +75,10 @@ class ScreenRecorder:
         if not self._output_path:
             raise ValueError("Output path is not specified")
 
+        # The first frame is captured once the start delay is over
+        self._start_ns = time.monotonic_ns() + round(self._start_delay * 1e9)
+        self._moues_events = {'move': MouseMoves(), 'click': []}
+
         self._is_stopped.clear()
         self._record_thread = Thread(target=self._recording)
         self._record_thread.start()
@@ -53,6 +94,12 @@ class ScreenRecorder:
 
         if self._mouse_track_thread is not None:
             self._mouse_track_thread.join()
+            self._mouse_track_thread = None
+
+            # Moves are in screen positions until the size of the frames is known
+            if self._frame_width is not None:
+                self._moues_events['move'] = self._moues_events['move'].normalized(*self._capture_area())
+                self._moues_events['move'].save(self._output_path)
 
     def cancel_recording(self):
         """Stops the recording and removes the output file if it exists."""
@@ -61,65 +108,214 @@ class ScreenRecorder:
             os.remove(self._output_path)
             logger.info(f"Cancelled recording and removed file: {self._output_path}")
 
+        if self._output_path:
+            for sidecar_path in (FrameTimestamps.path_for(self._output_path), MouseMoves.path_for(self._output_path)):
+                if os.path.exists(sidecar_path):
+                    os.remove(sidecar_path)
+
+    def close(self):
+        """Stops the capture stream of a recorder that is not recording."""
+        self._stream.stop()
+
+    @property
+    def recording(self):
+        return not self._is_stopped.is_set()
+
+    @property
+    def region(self):
+        return self._region
+
+    def _capture_options(self):
+        """Returns the ScreenGear options that limit the capture to the region."""
+        if self._region is None:
+            return {}
+        x, y, width, height = self._region
+        return {'left': x, 'top': y, 'width': width, 'height': height}
+
+    def _capture_area(self):
+        """Returns the recorded (x, y, width, height) in the units of the mouse."""
+        if self._region is not None:
+            # Scaled displays capture more pixels than the region spans
+            return self._region
+        return 0, 0, self._frame_width, self._frame_height
+
+    def _relative(self, x, y):
+        """Turns a mouse position into a fraction of the recorded area."""
+        area_x, area_y, area_width, area_height = self._capture_area()
+        return (x - area_x) / area_width, (y - area_y) / area_height
+
     @property
     def mouse_events(self):
         """Returns the mouse events data."""
         return self._moues_events
 
+    def stats(self):
+        """Returns the capture queue stats (see FrameQueue), the encode latency and the capture jitter.
+
+        The latency of a frame is the time from its capture to the end of
+        its write, and the jitter how late it was captured for its slot,
+        both in seconds over the last STATS_WINDOW frames. `skipped` counts
+        the slots that were not captured because the capture ran late.
+        """
+        stats = self._queue.stats() if self._queue is not None else {}
+        latencies = np.array(self._latencies) if len(self._latencies) > 0 else np.zeros(1)
+        jitter = np.array(self._jitter) if len(self._jitter) > 0 else np.zeros(1)
+        stats.update(
+            captured=self._frames_captured,
+            skipped=self._slots_skipped,
+            written=self._frames_written,
+            repeated=self._frames_repeated,
+            latency_mean=float(latencies.mean()),
+            latency_p95=float(np.percentile(latencies, 95)),
+            latency_max=float(latencies.max()),
+            jitter_mean=float(jitter.mean()),
+            jitter_p95=float(np.percentile(jitter, 95)),
+            jitter_max=float(jitter.max()),
+        )
+        return stats
+
+    def _time(self):
+        """Seconds since the recording started, on the clock of the frame timestamps and mouse events."""
+        return (time.monotonic_ns() - self._start_ns) / 1e9
+
     def _recording(self):
-        """Handles the recording of the screen."""
+        """Captures the screen at the frame rate and queues the frames for _encoding.
+
+        Frame i belongs to the slot starting i / fps seconds after the start,
+        on the monotonic clock. A capture that runs late skips the slots
+        whose time has passed, which the encoder fills by repeating the last
+        frame, so the video keeps the pace of the wall clock.
+        """
+        encode_thread = None
         try:
-            time.sleep(self._start_delay)  # Delay before starting the recording
+            self._queue = FrameQueue(self._queue_max_bytes, policy=self._queue_policy)
+            self._latencies.clear()
+            self._jitter.clear()
+            self._frames_captured = 0
+            self._slots_skipped = 0
+            self._frames_written = 0
+            self._frames_repeated = 0
+            encode_thread = Thread(target=self._encoding, name='recorder-encode')
+            encode_thread.start()
 
-            interval = 1 / self._fps
-            self._frame_index = 0
-            while not self._is_stopped.is_set():
-                t0 = time.time()
+            interval_ns = round(1e9 / self._fps)
+            slot = 0
+            while True:
+                due_ns = self._start_ns + slot * interval_ns
+                wait_ns = due_ns - time.monotonic_ns()
+                # Waiting on the event keeps stopping responsive
+                if self._is_stopped.wait(max(wait_ns, 0) / 1e9):
+                    break
+
+                captured_ns = time.monotonic_ns()
                 frame = self._stream.read()
                 if frame is None:
                     break
 
                 frame_height, frame_width = frame.shape[:2]
-                if self._writer is None:
-                    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                    self._writer = cv2.VideoWriter(self._output_path, fourcc, self._fps, (frame_width, frame_height))
+                if self._frame_width is None:
                     self._frame_width = frame_width
                     self._frame_height = frame_height
 
-                mouse_x, mouse_y = self._mouse_controller.position
-                relative_x, relative_y = mouse_x / frame_width, mouse_y / frame_height
-                self.mouse_events['move'].append([relative_x, relative_y, self._frame_index])
+                self._frame_index = slot
+                if not self._queue.put(frame, (slot, captured_ns)):
+                    break
+                self._frames_captured += 1
+                self._jitter.append((captured_ns - due_ns) / 1e9)
 
-                self._frame_index += 1
-                self._writer.write(frame)
-                t1 = time.time()
+                # A slot can still be captured up to half an interval late
+                elapsed_ns = time.monotonic_ns() - self._start_ns
+                next_slot = max(slot + 1, (elapsed_ns + interval_ns // 2) // interval_ns)
+                self._slots_skipped += next_slot - slot - 1
+                slot = next_slot
+        except Exception as e:
+            logger.error(f"An error occurred during recording: {e}")
+        finally:
+            if self._queue is not None:
+                self._queue.close()
+            if encode_thread is not None:
+                # The encoder writes the frames still queued before stopping
+                encode_thread.join()
+            self._stream.stop()
+
+            stats = self.stats()
+            logger.info(
+                f"Recording stopped: {stats['captured']} frames captured, {stats['written']} written "
+                f"({stats['repeated']} repeats for {stats['skipped']} late slots and {stats['dropped']} dropped frames, "
+                f"{stats['spilled']} spilled to disk), max queue depth {stats['max_depth']}, "
+                f"encode latency {stats['latency_mean'] * 1000:.0f} ms mean, {stats['latency_max'] * 1000:.0f} ms max, "
+                f"capture jitter {stats['jitter_mean'] * 1000:.1f} ms mean, {stats['jitter_max'] * 1000:.1f} ms max"
+            )
 
-                read_time = t1 - t0
-                sleep_duration = max(0, interval - read_time)
-                time.sleep(sleep_duration)
+    def _encoding(self):
+        """Writes the frames queued by _recording, and their capture times next to the video.
+
+        Slots without a frame, skipped by the capture or dropped from the
+        queue, get a repeat of the frame written before them, so that the
+        video keeps one frame per slot.
+        """
+        previous = None
+        times = []
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+
+                frame, (slot, captured_ns) = item
+                if self._writer is None:
+                    frame_height, frame_width = frame.shape[:2]
+                    self._writer = self._encoder.open(self._output_path, self._fps, frame_width, frame_height)
+
+                while previous is not None and self._frames_written < slot:
+                    self._writer.write(previous)
+                    times.append(times[-1])
+                    self._frames_written += 1
+                    self._frames_repeated += 1
+
+                self._writer.write(frame)
+                times.append((captured_ns - self._start_ns) / 1e9)
+                self._frames_written += 1
+                self._latencies.append((time.monotonic_ns() - captured_ns) / 1e9)
+                previous = frame
 
             logger.info(f"Recording saved as {self._output_path}")
         except Exception as e:
-            logger.error(f"An error occurred during recording: {e}")
+            logger.error(f"An error occurred while encoding the recording: {e}")
+            # Stops the capture too, and lets it finish
+            self._is_stopped.set()
+            self._queue.close()
         finally:
             if self._writer is not None:
                 self._writer.release()
                 self._writer = None
-            self._stream.stop()
-            logger.info("Recording stopped")
+                FrameTimestamps(times, self._fps).save(self._output_path)
+            self._queue.clear()
 
     def _mouse_track(self):
         """Tracks mouse movements and clicks."""
+        moves = self._moues_events['move']
+
+        def on_move(x, y):
+            # Called for every move, only appends (see MouseMoves)
+            moves.append(self._time(), x, y)
+
         def on_click(x, y, button, pressed):
             """Handles mouse click events."""
             if pressed and self._frame_width is not None and self._frame_height is not None:
-                relative_x = x / self._frame_width
-                relative_y = y / self._frame_height
+                relative_x, relative_y = self._relative(x, y)
+                if not (0 <= relative_x < 1 and 0 <= relative_y < 1):
+                    return
+
                 logger.debug(f'Mouse click: ({relative_x},{relative_y},{self._frame_index})')
 
-                self._moues_events['click'].append([relative_x, relative_y, self._frame_index, self._default_duration])
+                # The frame index is resolved again from the time once the frame timestamps are known
+                self._moues_events['click'].append([relative_x, relative_y, self._frame_index, self._default_duration, self._time()])
+
+        # Where the mouse is until it first moves
+        moves.append(self._time(), *self._mouse_controller.position)
 
-        with Listener(on_click=on_click) as listener:
+        with Listener(on_move=on_move, on_click=on_click) as listener:
             while not self._is_stopped.is_set():
                 self._is_stopped.wait()
             listener.stop()
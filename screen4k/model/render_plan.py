@@ -0,0 +1,91 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from model.frame_context import FrameContext
+
+
+FramePlan = namedtuple('FramePlan', ['zoom_factor', 'geometry', 'corners', 'cursor'])
+
+
+class RenderPlan:
+    """Per-frame render geometry for a whole timeline.
+
+    The plan is built once from the transforms of a Compose and holds, as
+    NumPy arrays, everything that only depends on the settings and the mouse
+    events: canvas sizes, zoom factor, crop and destination rectangles,
+    rounded corner flags and cursor position. Rendering a frame then only has
+    to look its row up instead of recomputing the geometry.
+    """
+    def __init__(self, frame_width, frame_height, num_frames, scale=1):
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.num_frames = num_frames
+        self.scale = scale
+        self.frame_indices = np.arange(num_frames, dtype=np.int64)
+
+        # Static stages only read the frame shape, so a zero-stride placeholder
+        # stands in for the real frame while planning
+        placeholder = np.broadcast_to(np.zeros((1, 1, 3), dtype=np.uint8), (frame_height, frame_width, 3))
+        self.context = FrameContext(placeholder, scale=scale)
+        self.static = None
+
+        self.zoom_factors = None
+        self.geometry = None
+        self.corners = None
+        self.cursor = None
+        self.usable = True
+
+    @classmethod
+    def build(cls, transforms, frame_width, frame_height, num_frames, scale=1):
+        plan = cls(frame_width, frame_height, num_frames, scale)
+        for t in transforms:
+            if t.planned and plan.geometry is not None:
+                # A static stage after the zoom stage would see zoomed sizes,
+                # which the plan does not model
+                plan.usable = False
+                break
+            t.plan(plan)
+
+        context = plan.context
+        plan.static = (context.video_width, context.video_height, context.frame_width, context.frame_height)
+        return plan
+
+    def set_zoom(self, zoom_factors, geometry, corners):
+        # Geometry rows are scaled_width, scaled_height, crop_x, crop_y, x1, y1, x2, y2
+        self.zoom_factors = np.asarray(zoom_factors, dtype=np.float64)
+        self.geometry = np.asarray(geometry, dtype=np.int32)
+        self.corners = np.asarray(corners, dtype=np.uint8)
+
+    def set_cursor(self, cursor):
+        self.cursor = np.asarray(cursor, dtype=np.float64)
+
+    def row(self, frame_index):
+        """Returns the FramePlan of a frame, or None if it is not planned."""
+        if not self.usable or not 0 <= frame_index < self.num_frames:
+            return None
+
+        zoom_factor, geometry, corners = 1, None, None
+        if self.geometry is not None:
+            zoom_factor = self.zoom_factors.item(frame_index)
+            geometry = self.geometry[frame_index].tolist()
+            corners = self.corners.item(frame_index)
+
+        cursor = None
+        if self.cursor is not None:
+            x, y = self.cursor[frame_index].tolist()
+            if not (math.isnan(x) or math.isnan(y)):
+                cursor = (x, y)
+
+        return FramePlan(zoom_factor, geometry, corners, cursor)
+
+    def apply(self, context):
+        """Fills in the planned fields of a frame context, returns False if the frame is not planned."""
+        frame_plan = self.row(context.frame_index)
+        if frame_plan is None:
+            return False
+
+        context.video_width, context.video_height, context.frame_width, context.frame_height = self.static
+        context.frame_plan = frame_plan
+        return True
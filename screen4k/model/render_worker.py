@@ -0,0 +1,68 @@
+import threading
+
+from loguru import logger
+
+
+class RenderWorker:
+    """Renders single frame requests on a background thread, newest first.
+
+    A request is a (frame_index, version) pair, where the version tells the
+    settings it must be rendered with. Only one request waits while a frame
+    renders and a new request replaces it, so a burst of requests (dragging
+    a slider or the playhead) renders the latest one as soon as the worker
+    is free instead of every one in between. Requesting the frame that is
+    being rendered with the same settings only drops the pending request.
+
+    `render(frame_index)` returns the frame or None. Results are passed to
+    the `callback(frame_index, frame)` of their request on the worker
+    thread, so callbacks must hand them over to the GUI thread themselves
+    and be done with the frame when they return. Errors of the render or
+    the callback are logged and the request is dropped.
+    """
+    def __init__(self, render):
+        self._render = render
+        self._condition = threading.Condition()
+        self._thread = None
+
+        self._pending = None
+        self._current = None
+
+    def request(self, frame_index, version, callback):
+        with self._condition:
+            if self._current == (frame_index, version):
+                # Being rendered already, which makes the pending request stale
+                self._pending = None
+                return
+
+            self._pending = (frame_index, version, callback)
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='render-worker', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    @property
+    def busy(self):
+        with self._condition:
+            return self._pending is not None or self._current is not None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+
+                frame_index, version, callback = self._pending
+                self._pending = None
+                self._current = (frame_index, version)
+
+            # A failed request must not stop the worker from serving the next ones
+            try:
+                frame = self._render(frame_index)
+                if frame is not None:
+                    callback(frame_index, frame)
+            except Exception:
+                logger.exception(f'Rendering frame {frame_index} failed')
+            finally:
+                with self._condition:
+                    self._current = None
@@ -0,0 +1,87 @@
+import time
+import threading
+
+from model.encoder import default_encoder
+from model.exporter import PROGRESS_INTERVAL
+from model.video_reader import open_video
+
+
+class Transcoder:
+    """Encodes the frames of a video as they are, e.g. to turn a raw recording into its final format.
+
+    It has the interface of Exporter, so that an ExportJob runs it, and
+    reads and writes on the calling thread: there is nothing to render, and
+    the encoder (ffmpeg by default) encodes on processes of its own.
+    """
+    def __init__(self, input_path, output_path, fps, index=None, encoder=None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.fps = fps
+        self.encoder = encoder if encoder is not None else default_encoder()
+        self.index = index
+
+        self._cancelled = threading.Event()
+        self._decode_time = 0
+        self._encode_time = 0
+
+        self.num_frames = 0
+
+    def cancel(self):
+        """Stops the transcode from another thread, after which `run` returns None."""
+        self._cancelled.set()
+
+    def stage_times(self):
+        """Returns the seconds spent so far reading and encoding."""
+        return {'decode': self._decode_time, 'encode': self._encode_time}
+
+    def reuse_stats(self):
+        return {'rendered': 0, 'reused': 0}
+
+    def run(self, progress=None):
+        """Transcodes the whole video and returns the number of frames written, or None if cancelled.
+
+        `progress(frames_done, num_frames)` is called from time to time, on
+        the calling thread.
+        """
+        reader = open_video(self.input_path, index=self.index)
+        total = reader.num_frames
+        writer = None
+        frames_done = 0
+        last_report = time.perf_counter()
+
+        try:
+            while not self._cancelled.is_set():
+                t0 = time.perf_counter()
+                frame = reader.read()
+                t1 = time.perf_counter()
+                self._decode_time += t1 - t0
+                if frame is None:
+                    break
+
+                if writer is None:
+                    height, width = frame.shape[:2]
+                    writer = self.encoder.open(self.output_path, self.fps, width, height)
+
+                writer.write(frame)
+                frames_done += 1
+                t2 = time.perf_counter()
+                self._encode_time += t2 - t1
+
+                if progress is not None and t2 - last_report >= PROGRESS_INTERVAL:
+                    progress(frames_done, total)
+                    last_report = t2
+        finally:
+            reader.release()
+            if writer is not None:
+                t0 = time.perf_counter()
+                writer.release()
+                self._encode_time += time.perf_counter() - t0
+
+        if self._cancelled.is_set():
+            return None
+
+        if progress is not None:
+            progress(frames_done, total)
+
+        self.num_frames = frames_done
+        return frames_done
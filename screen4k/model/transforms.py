@@ -1,44 +1,310 @@
 import time
 import re
+import copy
+import math
 import platform
+import threading
 from enum import Enum, auto
+from fractions import Fraction
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 import numpy as np
+from utils.image import ImageAssets, same_image
+from utils.general import hex_to_rgb, find_largest_leq_sorted, freeze
+from utils.gradient import create_gradient_image
 from utils.image import ImageAssets
-from utils.general import hex_to_rgb, find_largest_leq_sorted
-from utils.image import ImageAssets
+from utils.cache import LRUCache
+from utils.frame_pool import FramePool
+from utils.profiler import StageProfiler
+from model.render_plan import RenderPlan
+from model.mouse_moves import MouseMoves
+from model.frame_context import FrameContext, ALL_CORNERS, TOP_LEFT, TOP_RIGHT, BOTTOM_RIGHT, BOTTOM_LEFT
+
+
+# Render plans kept by a Compose, one per frame size and scale in use
+MAX_RENDER_PLANS = 4
 
 
 class BaseTransform:
+    # Transforms whose whole output is captured by the render plan are
+    # skipped by Compose when the frame has a plan row
+    planned = False
+
     def __init__(self):
         pass
 
     def __call__(self, **kwargs):
-        raise NotImplementedError('Transform __call__ method must be implemented.')
+        """Runs the transform on kwargs, for callers of the former dict pipeline.
+
+        Returns the resulting FrameContext, which can be read like the dict.
+        """
+        return self.apply(FrameContext.from_kwargs(kwargs))
+
+    def apply(self, context):
+        """Updates the FrameContext in place and returns it."""
+        raise NotImplementedError('Transform apply method must be implemented.')
+
+    def plan(self, render_plan):
+        """Records the per-frame geometry of this transform into the render plan."""
+        if self.planned:
+            self.apply(render_plan.context)
+
+    def fork(self, pool_size=None):
+        """Returns a copy with the same settings that can render on another thread.
+
+        Transforms that hand out frames from a FramePool get a pool of their
+        own, of `pool_size` frames (the current size by default).
+        """
+        return copy.copy(self)
 
 
 class Compose(BaseTransform):
-    def __init__(self, transforms):
+    def __init__(self, transforms, num_frames=None, fuse=True, profiler=None, reuse=True):
         super().__init__()
 
         self.transforms = transforms
+        self.num_frames = num_frames
+        self.fuse = fuse
+        self.profiler = profiler
+        self.reuse = reuse
+        self.render_plan = None
+        self.stages = None
+        self._local = threading.local()
+
+        # Frames rendered and frames whose previous output was reused, see render
+        self.rendered_frames = 0
+        self.reused_frames = 0
+
+        # Plans by (width, height, scale), as previews and exports render at different sizes
+        self._render_plans = {}
 
     def __call__(self, **kwargs):
-        input = kwargs
-        for _, t in self.transforms.items():
-            input = t(**input)
+        # Overwrites the context the next render could reuse
+        self._local.source = None
+        return self.apply(self._context().reset().update(kwargs))
+
+    def render(self, input, frame_index=None, scale=1):
+        """Runs the transforms on a frame and returns its FrameContext.
+
+        `scale` is the size of the frame relative to the source video, below
+        1 for a proxy render of a downscaled frame. The context is reused by
+        the next frame rendered on the same thread.
+
+        With `reuse` on, a frame with the same source pixels and the same
+        render plan row (zoom geometry and cursor) as the previous frame
+        rendered on the thread gets the previous context back as it is, as
+        static stretches of screen recordings render to the same output,
+        unless another thread rendered on the same FramePool since.
+
+        The source is kept to compare the next frame with: transforms that
+        draw over it record the pixels they cover in `source_patches`, which
+        are put back once rendered, and the source is then made read-only.
+        """
+        context = self._context()
+        if self.reuse and self._reusable(context, input, frame_index, scale):
+            context.frame_index = frame_index
+            self.reused_frames += 1
+            return context
+
+        self._local.source = None
+        context.reset(input, frame_index, scale)
+        if self.reuse:
+            context.source = input
+            context.source_patches = []
+
+        self.apply(context)
+        self.rendered_frames += 1
+
+        if not self.reuse or np.may_share_memory(context.input, input):
+            # The output is drawn over the source itself, there is nothing to keep
+            return context
+
+        for x, y, pixels in reversed(context.source_patches):
+            region = input[y:y+pixels.shape[0], x:x+pixels.shape[1]]
+            region[...] = pixels[:region.shape[0], :region.shape[1]]
+        input.setflags(write=False)
+
+        # Only planned frames are reused, the plan row tells all that differs between frames
+        if context.frame_plan is not None:
+            self._local.source = input
+            self._local.render_plan = self.render_plan
+            self._local.output_pool = self._output_pool(context.input)
+
+        return context
+
+    def _reusable(self, context, input, frame_index, scale):
+        """Whether rendering input would give the output of the previous frame rendered on this thread."""
+        source = getattr(self._local, 'source', None)
+        if source is None or frame_index is None or scale != context.scale:
+            return False
 
-        return input
+        height, width = input.shape[:2]
+        render_plan = self._render_plans.get((width, height, scale))
+        if render_plan is None or render_plan is not self._local.render_plan:
+            # The settings changed since
+            return False
+
+        output_pool = self._local.output_pool
+        if output_pool is not None:
+            pool, borrows = output_pool
+            if pool.borrows != borrows:
+                # Another thread rendered on the same pool since, and the
+                # output frame goes back to the ring sooner than a fresh one
+                return False
+
+        return render_plan.row(frame_index) == context.frame_plan and same_image(source, input)
+
+    def _output_pool(self, output):
+        """Returns the FramePool output was borrowed from with its borrow count, None if it is not a pool frame."""
+        for _, t in self.stages:
+            pool = getattr(t, 'pool', None)
+            if pool is not None and pool.holds(output):
+                return pool, pool.borrows
+        return None
+
+    def reuse_stats(self):
+        total = self.rendered_frames + self.reused_frames
+        return {
+            'rendered': self.rendered_frames,
+            'reused': self.reused_frames,
+            'reuse_rate': self.reused_frames / total if total > 0 else 0,
+        }
+
+    def _context(self):
+        context = getattr(self._local, 'context', None)
+        if context is None:
+            context = self._local.context = FrameContext()
+        return context
+
+    def apply(self, context):
+        planned = self._apply_plan(context)
+
+        if self.stages is None:
+            self.stages = self._build_stages()
+
+        if self.profiler is not None:
+            return self._apply_profiled(context, planned)
+
+        for name, t in self.stages:
+            if planned and t.planned:
+                continue
+            t.apply(context)
+
+        return context
+
+    def _apply_profiled(self, context, planned):
+        profiler = self.profiler
+        frame_state = profiler.begin(memory=False)
+
+        for name, t in self.stages:
+            if planned and t.planned:
+                continue
+
+            state = profiler.begin()
+            t.apply(context)
+            profiler.end(name, state, context.input.shape, context.frame_index)
+
+        profiler.end('frame', frame_state, context.input.shape, context.frame_index)
+        return context
+
+    def enable_profiling(self, window=1000, trace_memory=True):
+        """Starts recording per-stage timings, see StageProfiler."""
+        if self.profiler is None:
+            self.profiler = StageProfiler(window=window, trace_memory=trace_memory)
+        return self.profiler
+
+    def disable_profiling(self):
+        if self.profiler is not None:
+            self.profiler.close()
+            self.profiler = None
+
+    def _build_stages(self):
+        """Returns the (name, transform) pairs to run, with the zoom to background run fused into a Compositor."""
+        stages = list(self.transforms.items())
+        if not self.fuse:
+            return stages
+
+        transforms = [t for _, t in stages]
+        for i, t in enumerate(transforms):
+            if not isinstance(t, Zoom):
+                continue
+
+            j = i + 1
+            roundness = None
+            if j < len(transforms) and isinstance(transforms[j], Roundness):
+                roundness = transforms[j]
+                j += 1
+
+            # Shadow does not touch the frame yet, so it can be fused over
+            while j < len(transforms) and isinstance(transforms[j], Shadow):
+                j += 1
+
+            if j < len(transforms) and isinstance(transforms[j], Background):
+                background = transforms[j]
+                compositor = Compositor(zoom=t, background=background, roundness=roundness, pool_size=background.pool.size)
+                return stages[:i] + [('compositor', compositor)] + stages[j + 1:]
+
+        return stages
+
+    def _apply_plan(self, context):
+        """Fills the context from the render plan, returns whether the frame is planned."""
+        if self.num_frames is None or context.frame_index is None:
+            return False
+
+        height, width = context.input.shape[:2]
+        key = (width, height, context.scale)
+        render_plan = self._render_plans.get(key)
+        if render_plan is None:
+            if len(self._render_plans) >= MAX_RENDER_PLANS:
+                self._render_plans.clear()
+
+            render_plan = RenderPlan.build(self.transforms.values(), width, height, self.num_frames, context.scale)
+            self._render_plans[key] = render_plan
+
+        self.render_plan = render_plan
+        return render_plan.apply(context)
+
+    def invalidate(self):
+        """Drops the render plans so that they are rebuilt from the current settings."""
+        self.render_plan = None
+        self._render_plans.clear()
+        self.stages = None
+
+    def fork(self, pool_size=None):
+        """Returns a Compose of forked transforms, for a render thread of its own.
+
+        The settings are those of this Compose at the time of the call. When
+        profiling, the fork has a profiler of its own (see StageProfiler.fork)
+        to merge back once it is done.
+        """
+        transforms = {key: t.fork(pool_size) for key, t in self.transforms.items()}
+        profiler = self.profiler.fork() if self.profiler is not None else None
+        return Compose(transforms, num_frames=self.num_frames, fuse=self.fuse, profiler=profiler, reuse=self.reuse)
+
+    def __getstate__(self):
+        # Pickled for export processes: plans, stages and contexts are rebuilt
+        # there, and profiling stays in this process
+        state = self.__dict__.copy()
+        del state['_local']
+        state.update(render_plan=None, stages=None, profiler=None, _render_plans={})
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
 
     def __getitem__(self, key):
         return self.transforms.get(key)
 
     def __setitem__(self, key, value):
         self.transforms[key] = value
+        self.invalidate()
 
 
 class AspectRatio(BaseTransform):
+    planned = True
+
     def __init__(self, aspect_ratio):
         super().__init__()
 
@@ -62,63 +328,63 @@ class AspectRatio(BaseTransform):
 
         return width, height
 
-    def __call__(self, **kwargs):
-        input = kwargs['input']
-        height, width = input.shape[:2]
+    def canvas_size(self, width, height):
+        """Returns the (width, height) of the canvas around a width x height frame."""
         w_factor, h_factor = self.aspect_ratio
 
         if w_factor is None or h_factor is None:
-            kwargs['video_width'] = width
-            kwargs['video_height'] = height
-            kwargs['frame_width'] = width
-            kwargs['frame_height'] = height
-            return kwargs
+            return width, height
 
         ratio = w_factor / h_factor
 
         if width / ratio >= height:
-            new_width = width
-            new_height = int(width / ratio)
+            return width, int(width / ratio)
         else:
-            new_width = int(height * ratio)
-            new_height = height
+            return int(height * ratio), height
+
+    def apply(self, context):
+        height, width = context.input.shape[:2]
 
-        kwargs['video_width'] = new_width
-        kwargs['video_height'] = new_height
-        kwargs['frame_width'] = width
-        kwargs['frame_height'] = height
+        context.video_width, context.video_height = self.canvas_size(width, height)
+        context.frame_width = width
+        context.frame_height = height
 
-        return kwargs
+        return context
 
 
 class Padding(BaseTransform):
+    planned = True
+
     def __init__(self, padding):
         super().__init__()
 
         self.padding = padding
 
-    def __call__(self, **kwargs):
-        input = kwargs['input']
-        video_width = kwargs['video_width']
-        video_height = kwargs['video_height']
+    def apply(self, context):
+        video_width = context.video_width
+        video_height = context.video_height
 
-        frame_height, frame_width = input.shape[:2]
+        frame_height, frame_width = context.input.shape[:2]
         gap_x, gap_y = max(0, (video_width - frame_width) // 2), max(0, (video_height - frame_height) // 2)
         pad_x, pad_y = 0, 0
 
+        scale = context.scale
+
         if isinstance(self.padding, (list, tuple)):
             if len(self.padding) == 2:
                 pad_x, pad_y = self.padding[0]
+                pad_x, pad_y = int(pad_x * scale), int(pad_y * scale)
             else:
                 raise Exception('Invalid padding format.')
         elif isinstance(self.padding, int):
+            padding = int(self.padding * scale)
             if gap_x > gap_y:
-                pad_y = self.padding
+                pad_y = padding
                 new_height = video_height - 2 * pad_y
                 new_width = int(new_height * frame_width / frame_height)
                 pad_x = max(0, (video_width - new_width) // 2)
             else:
-                pad_x = self.padding
+                pad_x = padding
                 new_width = video_width - 2 * pad_x
                 new_height = int(new_width * frame_height / frame_width)
                 pad_y = max(0, (video_height - new_height) // 2)
@@ -128,23 +394,27 @@ class Padding(BaseTransform):
         new_width = max(1, video_width - 2 * pad_x)
         new_height = max(1, video_height - 2 * pad_y)
 
-        kwargs['frame_width'] = new_width
-        kwargs['frame_height'] = new_height
+        context.frame_width = new_width
+        context.frame_height = new_height
 
-        return kwargs
+        return context
 
 
 class Inset(BaseTransform):
-    def __init__(self, inset, color=(0, 122, 222)):
+    def __init__(self, inset, color=(0, 122, 222), pool_size=3):
         super().__init__()
 
         self.inset = inset
         self.color = color
         self.inset_frame = None
 
-    def __call__(self, **kwargs):
-        if len(kwargs) >= 3:
-            input = kwargs['input']
+        # Output frames are handed out like those of Background, see FramePool
+        self.pool = FramePool(size=pool_size)
+
+    def apply(self, context):
+        # Nothing to inset until the canvas size is known
+        if context.video_width is not None:
+            input = context.input
             height, width = input.shape[:2]
 
             inset_left, inset_top, inset_right, inset_bottom = 0, 0, 0, 0
@@ -164,67 +434,229 @@ class Inset(BaseTransform):
             else:
                 raise Exception()
 
+            scale = context.scale
+            if scale != 1:
+                inset_left, inset_right = int(inset_left * scale), int(inset_right * scale)
+                inset_top, inset_bottom = int(inset_top * scale), int(inset_bottom * scale)
+
             new_width = width - inset_left - inset_right
             new_height = height - inset_top - inset_bottom
 
             if self.inset_frame is None or self.inset_frame.shape[0] != height or self.inset_frame.shape[1] != width:
                 self.inset_frame = np.full_like(input, fill_value=self.color)
+                self.inset_frame.setflags(write=False)
+
+            output = self.pool.borrow(self.inset_frame, (inset_left, inset_top, inset_left + new_width, inset_top + new_height))
 
             resized_frame = cv2.resize(input, (new_width, new_height))
-            self.inset_frame[inset_top:inset_top+new_height, inset_left:inset_left+new_width, :] = resized_frame
+            output[inset_top:inset_top+new_height, inset_left:inset_left+new_width, :] = resized_frame
+
+            context.input = output
+
+        return context
+
+    def fork(self, pool_size=None):
+        forked = copy.copy(self)
+        forked.inset_frame = None
+        forked.pool = FramePool(size=pool_size if pool_size is not None else self.pool.size)
+        return forked
+
+
+def draw_rounded_mask(mask, width, height, r, rounded_corners, x0=0, y0=0):
+    """Draws the rounded rectangle mask of a width x height frame into `mask`.
+
+    `rounded_corners` is a bit mask of the corner flags of frame_context.
+    `mask` may be a window of the full mask whose top-left pixel is (x0, y0),
+    which lets callers rasterize single corners without the whole frame.
+    """
+    def p(x, y):
+        return x - x0, y - y0
+
+    rect_w, rect_h = width - 2 * r, height - 2 * r
+    cv2.rectangle(mask, p(r, 0), p(r + rect_w, height), 255, -1)
+    cv2.rectangle(mask, p(0, r), p(width - 1, r + rect_h), 255, -1)
+
+    # Draw ellipses instead of circles
+    if rounded_corners & TOP_LEFT:
+        cv2.ellipse(mask, p(r, r), (r, r), 180, 0, 90, 255, -1)  # Top-left corner
+    else:
+        cv2.rectangle(mask, p(0, 0), p(r, r), 255, -1)
 
-            kwargs['input'] = self.inset_frame
-            return kwargs
+    if rounded_corners & TOP_RIGHT:
+        cv2.ellipse(mask, p(width - r, r), (r, r), 270, 0, 90, 255, -1)  # Top-right corner
+    else:
+        cv2.rectangle(mask, p(width - r, 0), p(width, r), 255, -1)
+
+    if rounded_corners & BOTTOM_RIGHT:
+        cv2.ellipse(mask, p(width - r, height - r), (r, r), 0, 0, 90, 255, -1)  # Bottom-right corner
+    else:
+        cv2.rectangle(mask, p(width - r, height - r), p(width, height), 255, -1)
+
+    if rounded_corners & BOTTOM_LEFT:
+        cv2.ellipse(mask, p(r, height - r), (r, r), 90, 0, 90, 255, -1)  # Bottom-left corner
+    else:
+        cv2.rectangle(mask, p(0, height - r), p(r, height), 255, -1)
+
+    return mask
 
 
 class Roundness(BaseTransform):
+    # Masks only depend on (width, height, radius, corners), which stay the
+    # same frame after frame, so they are shared by every Roundness instance
+    mask_cache = LRUCache(max_bytes=64 * 1024 * 1024)
+
     def __init__(self, radius=10):
         super().__init__()
         self.radius = radius
 
-    def __call__(self, **kwargs):
-        input = kwargs['input']
-        zoom_factor = kwargs.get('zoom_factor', 1)
-
-        height, width = input.shape[:2]
-        rounded_corners = {'top_left': True, 'top_right': True, 'bottom_right': True, 'bottom_left': True}
+    def zoomed_radius(self, zoom_factor, scale=1):
+        if zoom_factor > 1:
+            return int(zoom_factor * self.radius * scale)
+        return self.radius if scale == 1 else int(self.radius * scale)
 
-        if 'mask_rounded_corners' in kwargs:
-            rounded_corners = kwargs['mask_rounded_corners']
+    def mask(self, width, height, r, rounded_corners):
+        """Returns the (read-only) rounded rectangle mask of a width x height frame."""
+        key = ('mask', width, height, r, rounded_corners)
+        return self.mask_cache.get_or_create(key, lambda: self._create_mask(width, height, r, rounded_corners))
 
-        r = int(zoom_factor * self.radius) if zoom_factor > 1 else self.radius
+    def _create_mask(self, width, height, r, rounded_corners):
         if r > 0:
-            # Create a mask
             mask = np.zeros(shape=(height, width), dtype=np.uint8)
-            rect_w, rect_h = width - 2 * r, height - 2 * r
-            cv2.rectangle(mask, (r, 0), (r + rect_w, height), 255, -1)
-            cv2.rectangle(mask, (0, r), (width - 1, r + rect_h), 255, -1)
+            draw_rounded_mask(mask, width, height, r, rounded_corners)
+        else:
+            mask = np.full(shape=(height, width), fill_value=255, dtype=np.uint8)
 
-            # Draw ellipses instead of circles
-            if rounded_corners['top_left']:
-                cv2.ellipse(mask, (r, r), (r, r), 180, 0, 90, 255, -1)  # Top-left corner
-            else:
-                cv2.rectangle(mask, (0, 0), (r, r), 255, -1)
+        mask.setflags(write=False)
+        return mask
+
+    @staticmethod
+    def corner_windows(width, height, r):
+        """Returns (x, y, w, h) windows that contain every masked out pixel.
+
+        The windows reach past the ellipse centers so that OpenCV rasterizes the
+        corner arcs exactly as it does on the whole frame mask. Corners that
+        would overlap fall back to a single whole-frame window.
+        """
+        size = r + 2
+        if 2 * size > min(width, height):
+            return ((0, 0, width, height),)
+
+        return (
+            (0, 0, size, size),
+            (width - size, 0, size, size),
+            (width - size, height - size, size, size),
+            (0, height - size, size, size),
+        )
+
+    def corner_masks(self, width, height, r, rounded_corners):
+        """Returns (x, y, outside) for each corner window of a width x height frame.
+
+        `outside` is a read-only (h, w, 1) boolean array that is True where the
+        background shows through, ready to be used as a `np.copyto` where mask.
+        """
+        key = ('corners', width, height, r, rounded_corners)
+        return self.mask_cache.get_or_create(key, lambda: self._create_corner_masks(width, height, r, rounded_corners))
+
+    def _create_corner_masks(self, width, height, r, rounded_corners):
+        corner_masks = []
+        for x, y, w, h in self.corner_windows(width, height, r):
+            mask = np.zeros(shape=(h, w), dtype=np.uint8)
+            draw_rounded_mask(mask, width, height, r, rounded_corners, x0=x, y0=y)
+
+            outside = (mask == 0)[..., None]
+            outside.setflags(write=False)
+            corner_masks.append((x, y, outside))
+
+        return tuple(corner_masks)
+
+    def apply(self, context):
+        zoom_factor = context.zoom_factor
+        if zoom_factor is None:
+            zoom_factor = 1
 
-            if rounded_corners['top_right']:
-                cv2.ellipse(mask, (width - r, r), (r, r), 270, 0, 90, 255, -1)  # Top-right corner
-            else:
-                cv2.rectangle(mask, (width - r, 0), (width, r), 255, -1)
+        height, width = context.input.shape[:2]
+        rounded_corners = ALL_CORNERS
 
-            if rounded_corners['bottom_right']:
-                cv2.ellipse(mask, (width - r, height - r), (r, r), 0, 0, 90, 255, -1)  # Bottom-right corner
-            else:
-                cv2.rectangle(mask, (width - r, height - r), (width, height), 255, -1)
+        if context.rounded_corners is not None:
+            rounded_corners = context.rounded_corners
 
-            if rounded_corners['bottom_left']:
-                cv2.ellipse(mask, (r, height - r), (r, r), 90, 0, 90, 255, -1)  # Bottom-left corner
-            else:
-                cv2.rectangle(mask, (0, height - r), (r, height), 255, -1)
-        else:
-            mask = np.full(shape=(height, width), fill_value=255, dtype=np.uint8)
+        r = self.zoomed_radius(zoom_factor, context.scale)
+        context.mask = self.mask(width, height, max(r, 0), rounded_corners)
+        return context
+
+
+# Largest period (in scaled pixels) at which the scale of a resize repeats on
+# the source grid. Crops are widened to such a period so that a plain resize of
+# the source window samples at exactly the positions of the full resize.
+MAX_RESIZE_PERIOD = 256
+
+
+def _resize_window(src_size, scaled_size, crop_start, crop_size):
+    """Finds the source window that a resize crop can be resampled from.
+
+    Returns (src_start, src_end, scaled_start, scaled_end) such that resizing
+    the source window to the scaled window keeps the scale of the full resize,
+    or None when no such window is cheap enough.
+    """
+    if crop_start == 0 and crop_size == scaled_size:
+        return 0, src_size, 0, scaled_size
+
+    scale = Fraction(src_size, scaled_size)
+    p, q = scale.numerator, scale.denominator
+    if q > MAX_RESIZE_PERIOD:
+        return None
+
+    # Keep a margin so that interpolation at the crop border never reads
+    # clamped pixels at the window border
+    margin = math.ceil(scaled_size / (2 * src_size)) + 1
+
+    scaled_start = max(0, (crop_start - margin) // q * q)
+    scaled_end = min(scaled_size, -(-(crop_start + crop_size + margin) // q) * q)
+    src_start = scaled_start * p // q
+    src_end = src_size if scaled_end == scaled_size else scaled_end * p // q
+    return src_start, src_end, scaled_start, scaled_end
+
+
+def resize_crop(input, scaled_size, crop, dst=None):
+    """Returns cv2.resize(input, scaled_size) cropped to `crop`, resampling only the crop.
+
+    `crop` is (x, y, width, height) in the scaled frame. The sample positions
+    are those of the full resize, so the cost depends on the crop size only.
+    Uncropped frames are bit-exact; cropped ones may differ by one intensity
+    level from the full resize because of fixed point rounding, both when a
+    source window is resized and when the crop is warped.
+    """
+    height, width = input.shape[:2]
+    scaled_width, scaled_height = scaled_size
+    crop_x, crop_y, crop_width, crop_height = crop
+
+    if crop_x == 0 and crop_y == 0 and crop_width == scaled_width and crop_height == scaled_height:
+        return cv2.resize(input, scaled_size, dst=dst)
+
+    window_x = _resize_window(width, scaled_width, crop_x, crop_width)
+    window_y = _resize_window(height, scaled_height, crop_y, crop_height)
+
+    if window_x is not None and window_y is not None:
+        src_x1, src_x2, scaled_x1, scaled_x2 = window_x
+        src_y1, src_y2, scaled_y1, scaled_y2 = window_y
+        resized = cv2.resize(input[src_y1:src_y2, src_x1:src_x2], (scaled_x2 - scaled_x1, scaled_y2 - scaled_y1))
+        cropped = resized[crop_y-scaled_y1:crop_y-scaled_y1+crop_height, crop_x-scaled_x1:crop_x-scaled_x1+crop_width]
+        if dst is None:
+            return cropped
 
-        kwargs['mask'] = mask
-        return kwargs
+        dst[...] = cropped
+        return dst
+
+    # Map every pixel of the crop to the same source position as cv2.resize does
+    scale_x, scale_y = width / scaled_width, height / scaled_height
+    M = np.array([
+        [scale_x, 0, (crop_x + 0.5) * scale_x - 0.5],
+        [0, scale_y, (crop_y + 0.5) * scale_y - 0.5],
+    ])
+    return cv2.warpAffine(
+        input, M, (crop_width, crop_height), dst=dst,
+        flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_REPLICATE
+    )
 
 
 class ZoomPosition(Enum):
@@ -246,20 +678,36 @@ class Zoom(BaseTransform):
         fps,
         zoom_in_duration=1.0,
         zoom_out_duration=1.0,
-        zoom_factor=2.0
+        zoom_factor=2.0,
+        timestamps=None
     ):
         super().__init__()
 
         self.click_data = click_data
         self.move_data = None
-        self.clicked_indices = [click[2] for click in click_data]
+        self.timestamps = timestamps
         self.zoom_in_duration = zoom_in_duration
         self.zoom_out_duration = zoom_out_duration
         self.zoom_factor = zoom_factor
         self.fps = fps
+        self.update_clicks()
 
         self.corner_ratio = 0.3
 
+    def update_clicks(self):
+        """Refreshes the click lookup after click_data was edited in place.
+
+        Clicks are [x, y, frame_index, duration], optionally followed by the
+        time of the click. With the FrameTimestamps of the recording, a
+        click with a time starts on the first frame captured after it.
+        """
+        self.clicked_indices = [self._clicked_index(click) for click in self.click_data]
+
+    def _clicked_index(self, click):
+        if self.timestamps is not None and len(click) > 4:
+            return self.timestamps.frame_at(click[4])
+        return click[2]
+
     def ease_in_out_quad(self, t):
         """Easing function for smooth zoom transitions."""
         if t < 0.5:
@@ -293,14 +741,7 @@ class Zoom(BaseTransform):
             else:
                 return ZoomPosition.BOTTOM_RIGHT
 
-    def __call__(self, **kwargs):
-        input = kwargs['input']
-        video_width = kwargs['video_width']
-        video_height = kwargs['video_height']
-        frame_width = kwargs['frame_width']
-        frame_height = kwargs['frame_height']
-        frame_index = kwargs['frame_index']
-
+    def _geometry(self, frame_index, video_width, video_height, frame_width, frame_height):
         shift_x = 0
         shift_y = 0
 
@@ -311,7 +752,8 @@ class Zoom(BaseTransform):
             click = self.click_data[index]
 
             # If the current frame is within the valid range of the click
-            rel_clicked_x, rel_clicked_y, clicked_frame_index, duration = click
+            rel_clicked_x, rel_clicked_y, _, duration = click[:4]
+            clicked_frame_index = self.clicked_indices[index]
             duration_in_frames = int(duration * self.fps)
 
             if clicked_frame_index <= frame_index < clicked_frame_index + duration_in_frames:
@@ -382,8 +824,6 @@ class Zoom(BaseTransform):
             new_frame_height = frame_height
             zoom_factor = 1
 
-        resized_frame = cv2.resize(input, (new_frame_width, new_frame_height))
-
         video_cx, video_cy = video_width // 2, video_height // 2
         frame_x1 = video_cx + shift_x - new_frame_width // 2
         frame_y1 = video_cy + shift_y - new_frame_height // 2
@@ -395,48 +835,179 @@ class Zoom(BaseTransform):
 
         crop_xmin = max(0, new_frame_width // 2 - video_cx - shift_x)
         crop_ymin = max(0, new_frame_height // 2 - video_cy - shift_y)
-        crop_width = x2 - x1
-        crop_height = y2 - y1
-        cropped_frame = resized_frame[crop_ymin:crop_ymin+crop_height, crop_xmin:crop_xmin+crop_width, :]
 
         # Modify the rounded border mask
-        rounded_corners = {'top_left': True, 'top_right': True, 'bottom_right': True, 'bottom_left': True}
+        rounded_corners = ALL_CORNERS
         if frame_x1 < 0:
-            rounded_corners['top_left'] = False
-            rounded_corners['bottom_left'] = False
+            rounded_corners &= ~(TOP_LEFT | BOTTOM_LEFT)
 
         if frame_y1 < 0:
-            rounded_corners['top_left'] = False
-            rounded_corners['top_right'] = False
+            rounded_corners &= ~(TOP_LEFT | TOP_RIGHT)
 
         if frame_x1 + new_frame_width > video_width:
-            rounded_corners['top_right'] = False
-            rounded_corners['bottom_right'] = False
+            rounded_corners &= ~(TOP_RIGHT | BOTTOM_RIGHT)
 
         if frame_y1 + new_frame_height > video_height:
-            rounded_corners['bottom_right'] = False
-            rounded_corners['bottom_left'] = False
+            rounded_corners &= ~(BOTTOM_RIGHT | BOTTOM_LEFT)
+
+        geometry = [new_frame_width, new_frame_height, crop_xmin, crop_ymin, x1, y1, x2, y2]
+        return zoom_factor, geometry, rounded_corners
+
+    def plan(self, render_plan):
+        """Vectorized counterpart of `_geometry` over all frames of the plan."""
+        context = render_plan.context
+        video_width, video_height = context.video_width, context.video_height
+        frame_width, frame_height = context.frame_width, context.frame_height
+        frame_indices = render_plan.frame_indices
+        num_frames = len(frame_indices)
+
+        zoom_factors = np.ones(num_frames, dtype=np.float64)
+        column = np.zeros(num_frames, dtype=np.int64)
+        row = np.zeros(num_frames, dtype=np.int64)
+
+        if len(self.clicked_indices) > 0:
+            clicked_indices = np.asarray(self.clicked_indices)
+            clicks = np.asarray([click[:4] for click in self.click_data], dtype=np.float64).reshape(-1, 4)
+            clicks[:, 2] = clicked_indices
+
+            # Same lookup as find_largest_leq_sorted, for every frame at once
+            index = np.searchsorted(clicked_indices, frame_indices, side='right') - 1
+            valid = index >= 0
+            valid[valid] = clicked_indices[index[valid]] <= frame_indices[valid]
+            index = np.where(valid, index, 0)
+
+            rel_clicked_x, rel_clicked_y = clicks[index, 0], clicks[index, 1]
+            clicked_frame_index, duration = clicks[index, 2], clicks[index, 3]
+            duration_in_frames = (duration * self.fps).astype(np.int64)
+
+            active = valid & (clicked_frame_index <= frame_indices) & (frame_indices < clicked_frame_index + duration_in_frames)
+            elapsed_time = (frame_indices - clicked_frame_index) / self.fps
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                zoom_in = active & (elapsed_time <= self.zoom_in_duration)
+                zoom_out = active & ~zoom_in & (elapsed_time >= duration - self.zoom_out_duration)
+                hold = active & ~zoom_in & ~zoom_out
+
+                progress = elapsed_time / self.zoom_in_duration
+                zoom_factors[zoom_in] = 1 + (self.zoom_factor - 1) * self._ease_in_out_quad(progress[zoom_in])
+
+                progress = (elapsed_time - (duration - self.zoom_out_duration)) / self.zoom_out_duration
+                zoom_factors[zoom_out] = self.zoom_factor - (self.zoom_factor - 1) * self._ease_in_out_quad(progress[zoom_out])
+
+            zoom_factors[hold] = self.zoom_factor
+
+            # -1, 0 and 1 stand for the left/top, center and right/bottom areas
+            corner_ratio = self.corner_ratio
+            column = np.where(rel_clicked_x < corner_ratio, -1, np.where(rel_clicked_x < 1 - corner_ratio, 0, 1))
+            row = np.where(rel_clicked_y < corner_ratio, -1, np.where(rel_clicked_y < 1 - corner_ratio, 0, 1))
+            column = np.where(valid, column, 0)
+            row = np.where(valid, row, 0)
+
+        new_frame_width = (zoom_factors * frame_width).astype(np.int64)
+        new_frame_height = (zoom_factors * frame_height).astype(np.int64)
+
+        left_half_new_frame_width = new_frame_width // 2
+        right_half_new_frame_width = new_frame_width - left_half_new_frame_width
+        top_half_new_frame_height = new_frame_height // 2
+        bottom_half_new_frame_height = new_frame_height - top_half_new_frame_height
+
+        left_half_frame_width = frame_width // 2
+        right_half_frame_width = frame_width - left_half_frame_width
+        top_half_frame_height = frame_height // 2
+        bottom_half_frame_height = frame_height - top_half_frame_height
+
+        shift_x = np.select(
+            [column < 0, column > 0],
+            [left_half_new_frame_width - left_half_frame_width, right_half_frame_width - right_half_new_frame_width],
+            0
+        )
+        shift_y = np.select(
+            [row < 0, row > 0],
+            [top_half_new_frame_height - top_half_frame_height, bottom_half_frame_height - bottom_half_new_frame_height],
+            0
+        )
+
+        video_cx, video_cy = video_width // 2, video_height // 2
+        frame_x1 = video_cx + shift_x - new_frame_width // 2
+        frame_y1 = video_cy + shift_y - new_frame_height // 2
+
+        x1 = np.maximum(0, frame_x1)
+        y1 = np.maximum(0, frame_y1)
+        x2 = np.minimum(video_width, frame_x1 + new_frame_width)
+        y2 = np.minimum(video_height, frame_y1 + new_frame_height)
 
-        kwargs['mask_rounded_corners'] = rounded_corners
+        crop_xmin = np.maximum(0, new_frame_width // 2 - video_cx - shift_x)
+        crop_ymin = np.maximum(0, new_frame_height // 2 - video_cy - shift_y)
 
-        kwargs['input'] = cropped_frame
-        kwargs['frame_width'] = crop_width
-        kwargs['frame_height'] = crop_height
-        kwargs['x_offset'] = x1
-        kwargs['y_offset'] = y1
-        kwargs['zoom_factor'] = zoom_factor
+        corners = np.full(num_frames, ALL_CORNERS, dtype=np.uint8)
+        corners[frame_x1 < 0] &= ~np.uint8(TOP_LEFT | BOTTOM_LEFT)
+        corners[frame_y1 < 0] &= ~np.uint8(TOP_LEFT | TOP_RIGHT)
+        corners[frame_x1 + new_frame_width > video_width] &= ~np.uint8(TOP_RIGHT | BOTTOM_RIGHT)
+        corners[frame_y1 + new_frame_height > video_height] &= ~np.uint8(BOTTOM_RIGHT | BOTTOM_LEFT)
 
-        return kwargs
+        geometry = np.stack([new_frame_width, new_frame_height, crop_xmin, crop_ymin, x1, y1, x2, y2], axis=1)
+        render_plan.set_zoom(zoom_factors, geometry, corners)
+
+    @staticmethod
+    def _ease_in_out_quad(t):
+        return np.where(t < 0.5, 2 * t * t, -1 + (4 - 2 * t) * t)
+
+    def apply(self, context):
+        frame_plan = context.frame_plan
+
+        if frame_plan is not None and frame_plan.geometry is not None:
+            zoom_factor, geometry, rounded_corners = frame_plan.zoom_factor, frame_plan.geometry, frame_plan.corners
+        else:
+            zoom_factor, geometry, rounded_corners = self._geometry(
+                context.frame_index,
+                context.video_width,
+                context.video_height,
+                context.frame_width,
+                context.frame_height
+            )
+
+        new_frame_width, new_frame_height, crop_xmin, crop_ymin, x1, y1, x2, y2 = geometry
+        crop_width = x2 - x1
+        crop_height = y2 - y1
+
+        # Only the part of the zoomed frame that stays visible is resampled
+        cropped_frame = resize_crop(context.input, (new_frame_width, new_frame_height), (crop_xmin, crop_ymin, crop_width, crop_height))
+
+        context.rounded_corners = rounded_corners
+
+        context.input = cropped_frame
+        context.frame_width = crop_width
+        context.frame_height = crop_height
+        context.x_offset = x1
+        context.y_offset = y1
+        context.zoom_factor = zoom_factor
+
+        return context
 
 
 class Cursor(BaseTransform):
-    def __init__(self, move_data, size=64):
+    """Draws the cursor at its recorded position.
+
+    Moves are MouseMoves, or a list of [x, y, frame_index] optionally
+    followed by the time of the move. Without FrameTimestamps, frame i shows
+    move i of a list. With them, and moves with times, a frame shows the
+    last move before it was captured, which with the moves reported by the
+    mouse listener is where the mouse was at that instant.
+    """
+    def __init__(self, move_data, size=64, timestamps=None):
         super().__init__()
 
         self.size = size
         self.move_data = move_data
+        self.timestamps = timestamps
         self.cursors = self._load()
 
+        # Move times and positions as arrays, by the number of moves they were built from
+        self._moves = None
+
+        # Cursor images downscaled for proxy renders, by scale
+        self._scaled_cursors = {}
+
     def _load(self):
         system = platform.system().lower()
 
@@ -465,7 +1036,26 @@ class Cursor(BaseTransform):
 
         return {'arrow': arrow_image, 'pointing_hand': pointing_hand}
 
-    def _blend(self, image, x, y):
+    def _cursor(self, name, scale):
+        image = self.cursors[name]
+        if scale == 1:
+            return image
+
+        scaled = self._scaled_cursors.get((name, scale))
+        if scaled is None:
+            height, width = image.shape[:2]
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            scaled = self._scaled_cursors[(name, scale)] = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+        return scaled
+
+    def _blend(self, image, x, y, scale=1, patches=None):
+        """Draws the cursor at (x, y), in fractions of the image size, and returns the image.
+
+        Read-only images are drawn on a copy. Otherwise, the pixels covered
+        are appended to `patches` as (x, y, pixels) if it is given, which
+        callers pass for the source frame only.
+        """
         if x is None or y is None:
             return image
 
@@ -473,10 +1063,11 @@ class Cursor(BaseTransform):
 
         x, y = int(x * width), int(y * height)
 
-        if x < 0 or y < 0:
+        # Out of the frame, e.g. outside of a recorded region
+        if x < 0 or y < 0 or x >= width or y >= height:
             return image
 
-        arrow_image = self.cursors['arrow']
+        arrow_image = self._cursor('arrow', scale)
         arrow_h, arrow_w = arrow_image.shape[:2]
         arrow_bgr = arrow_image[:, :, :3]
         arrow_mask = arrow_image[:, :, 3]
@@ -499,74 +1090,179 @@ class Cursor(BaseTransform):
 
         blended = cv2.add(masked_arrow, masked_roi)
 
+        # Decoded frames cached by the model are read-only, draw on a copy
+        if not image.flags.writeable:
+            image = image.copy()
+        elif patches is not None:
+            patches.append((x, y, roi.copy()))
+
         # Update the input frame with the blended result
         image[y:y+arrow_h, x:x+arrow_w] = blended
         return image
 
-    def __call__(self, **kwargs):
-        input = kwargs['input']
-        frame_index = kwargs['frame_index']
-
-        if frame_index < len(self.move_data):
-            relative_mouse_x, relative_mouse_y, _ = self.move_data[frame_index]
-            kwargs['input'] = self._blend(input, relative_mouse_x, relative_mouse_y)
-
-        return kwargs
+    def _indexed(self):
+        """Whether the moves are a list indexed by frame."""
+        return not isinstance(self.move_data, MouseMoves)
+
+    def _timed(self):
+        if self.timestamps is None or len(self.move_data) == 0:
+            return False
+        return not self._indexed() or len(self.move_data[0]) > 3
+
+    def _timed_moves(self):
+        """Returns the move times and positions as arrays."""
+        if self._moves is None or self._moves[0] != len(self.move_data):
+            if self._indexed():
+                moves = np.array([move[:4] for move in self.move_data], dtype=np.float64).reshape(-1, 4)
+                times, positions = moves[:, 3], moves[:, :2]
+            else:
+                times, positions = self.move_data.arrays()
+            self._moves = (len(times), times, positions)
+        return self._moves[1:]
+
+    def _timed_positions(self, frame_indices):
+        """Returns the positions at frames, NaN before the first move, looked up by capture time."""
+        times, positions = self._timed_moves()
+        frame_times = self.timestamps.times[np.minimum(frame_indices, len(self.timestamps) - 1)]
+
+        index = np.searchsorted(times, frame_times, side='right') - 1
+        cursor = positions[np.maximum(index, 0)]
+        cursor[index < 0] = np.nan
+        return cursor
+
+    def plan(self, render_plan):
+        num_frames = len(render_plan.frame_indices)
+        cursor = np.full((num_frames, 2), np.nan, dtype=np.float64)
+
+        # Missing positions (None) become NaN, which the plan reports as no cursor
+        if self._timed():
+            cursor = self._timed_positions(render_plan.frame_indices)
+        elif self._indexed():
+            num_moves = min(num_frames, len(self.move_data))
+            if num_moves > 0:
+                moves = np.array([move[:2] for move in self.move_data[:num_moves]], dtype=np.float64)
+                cursor[:num_moves] = moves
+
+        render_plan.set_cursor(cursor)
+
+    def apply(self, context):
+        frame_index = context.frame_index
+        frame_plan = context.frame_plan
+
+        # Only the source is put back after the render, frames made by the
+        # transforms before (e.g. zoomed) are drawn over for good
+        patches = context.source_patches if context.input is context.source else None
+
+        if frame_plan is not None:
+            if frame_plan.cursor is not None:
+                context.input = self._blend(context.input, *frame_plan.cursor, scale=context.scale, patches=patches)
+        elif self._timed():
+            relative_mouse_x, relative_mouse_y = self._timed_positions(np.array([frame_index]))[0].tolist()
+            if not (math.isnan(relative_mouse_x) or math.isnan(relative_mouse_y)):
+                context.input = self._blend(context.input, relative_mouse_x, relative_mouse_y, scale=context.scale, patches=patches)
+        elif self._indexed() and frame_index < len(self.move_data):
+            relative_mouse_x, relative_mouse_y = self.move_data[frame_index][:2]
+            context.input = self._blend(context.input, relative_mouse_x, relative_mouse_y, scale=context.scale, patches=patches)
+
+        return context
 
 
 class Shadow(BaseTransform):
     def __init__(self):
         super().__init__()
 
-    def __call__(self, **kwargs):
-        x1 = kwargs['x_offset']
-        y1 = kwargs['y_offset']
-        x2 = x1 + kwargs['frame_width']
-        y2 = y1 + kwargs['frame_height']
-        return kwargs
+    def apply(self, context):
+        x1 = context.x_offset
+        y1 = context.y_offset
+        x2 = x1 + context.frame_width
+        y2 = y1 + context.frame_height
+        return context
 
 class Background(BaseTransform):
-    def __init__(self, background):
+    # Background images shared by every Background of the process, keyed by
+    # (spec, width, height), so switching back to a wallpaper or aspect ratio
+    # never decodes or resizes it again
+    image_cache = LRUCache(max_bytes=256 * 1024 * 1024)
+    _loader = None
+
+    def __init__(self, background, pool_size=3):
         super().__init__()
 
         self.background = background
         self.background_image = None
+        self.pool = FramePool(size=pool_size)
+
+    @classmethod
+    def load(cls, background, width, height):
+        """Returns the (read-only) background image of a spec at the given size."""
+        key = (freeze(background), width, height)
+        return cls.image_cache.get_or_create(key, lambda: cls._create_background_image(background, width, height))
 
-    def _create_background_image(self, background, width, height):
+    @classmethod
+    def prefetch(cls, background, width, height):
+        """Loads a background image into the cache on a worker thread, returns a Future."""
+        if cls._loader is None:
+            cls._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='background-loader')
+
+        return cls._loader.submit(cls.load, background, width, height)
+
+    @classmethod
+    def _read_wallpaper(cls, index):
+        background_path = ImageAssets.file(f'images/wallpapers/original/gradient-wallpaper-{index:04d}.png')
+        return cls.image_cache.get_or_create(('wallpaper', index), lambda: cv2.imread(background_path))
+
+    @classmethod
+    def _create_background_image(cls, background, width, height):
         if background['type'] == 'wallpaper':
             index = background['value']
-            background_path = ImageAssets.file(f'images/wallpapers/original/gradient-wallpaper-{index:04d}.png')
-            background_image = cv2.imread(background_path)
+            background_image = cls._read_wallpaper(index)
             background_image = cv2.resize(background_image, (width, height))
         elif background['type'] == 'gradient':
-            pass
+            gradient = background['value']
+            background_image = create_gradient_image(
+                width, height, gradient['stops'],
+                angle=gradient.get('angle', 0),
+                kind=gradient.get('kind', 'linear')
+            )
         elif background['type'] == 'color':
             hex_color = background['value']
             r, g, b = hex_to_rgb(hex_color)
             background_image = np.full(shape=(height, width, 3), fill_value=(b, g, r), dtype=np.uint8)
 
+        background_image.setflags(write=False)
         return background_image
 
-    def __call__(self, **kwargs):
-        input = kwargs['input']
-        width = kwargs['video_width']
-        height = kwargs['video_height']
+    def fork(self, pool_size=None):
+        forked = copy.copy(self)
+        forked.background_image = None
+        forked.pool = FramePool(size=pool_size if pool_size is not None else self.pool.size)
+        return forked
 
+    def get_background_image(self, width, height):
         if self.background_image is None or self.background_image.shape[0] != height or self.background_image.shape[1] != width:
-            self.background_image = self._create_background_image(self.background, width, height)
+            self.background_image = self.load(self.background, width, height)
+
+        return self.background_image
+
+    def apply(self, context):
+        input = context.input
+        width = context.video_width
+        height = context.video_height
 
-        output = self.background_image.copy()
+        x1 = context.x_offset
+        y1 = context.y_offset
+        x2 = x1 + context.frame_width
+        y2 = y1 + context.frame_height
 
-        x1 = kwargs['x_offset']
-        y1 = kwargs['y_offset']
-        x2 = x1 + kwargs['frame_width']
-        y2 = y1 + kwargs['frame_height']
+        # Output frames come from a ring of buffers, in which only the area
+        # left behind by the previous content has to be repainted
+        output = self.pool.borrow(self.get_background_image(width, height), (x1, y1, x2, y2))
 
-        if 'mask' in kwargs:
-            mask = kwargs['mask']
+        if context.mask is not None:
+            mask = context.mask
             inv_mask = cv2.bitwise_not(mask)
 
-            cropped_background = self.background_image[y1:y2, x1:x2, :].copy()
+            cropped_background = self.background_image[y1:y2, x1:x2, :]
             cropped_background = cv2.bitwise_and(cropped_background, cropped_background, mask=inv_mask)
 
             rounded_input = cv2.bitwise_and(input, input, mask=mask)
@@ -576,8 +1272,76 @@ class Background(BaseTransform):
         else:
             output[y1:y2, x1:x2, :] = input
 
-        if 'shadow_mask' in kwargs:
+        if context.shadow_mask is not None:
             pass
 
-        kwargs['input'] = output
-        return kwargs
\ No newline at end of file
+        context.input = output
+        return context
+
+class Compositor(BaseTransform):
+    """Fused Zoom -> Roundness -> Background stage.
+
+    The chain it replaces draws a full frame mask and blends the frame and
+    the background through several temporaries. The compositor instead
+    borrows a preallocated output frame from a FramePool, resamples the
+    source into its destination rectangle of that buffer and then only
+    restores the background behind the rounded corners. The output is
+    pixel-identical to the chain, which resamples through resize_crop as
+    well; zoomed frames of both may differ by one intensity level from
+    resizing the full frame.
+    """
+    def __init__(self, zoom, background, roundness=None, pool_size=3):
+        super().__init__()
+
+        self.zoom = zoom
+        self.background = background
+        self.roundness = roundness
+        self.pool = FramePool(size=pool_size)
+
+    def _restore_corners(self, region, background_region, r, rounded_corners):
+        height, width = region.shape[:2]
+
+        for x, y, outside in self.roundness.corner_masks(width, height, r, rounded_corners):
+            h, w = outside.shape[:2]
+            np.copyto(region[y:y+h, x:x+w], background_region[y:y+h, x:x+w], where=outside)
+
+    def apply(self, context):
+        video_width = context.video_width
+        video_height = context.video_height
+        frame_plan = context.frame_plan
+
+        if frame_plan is not None and frame_plan.geometry is not None:
+            zoom_factor, geometry, rounded_corners = frame_plan.zoom_factor, frame_plan.geometry, frame_plan.corners
+        else:
+            zoom_factor, geometry, rounded_corners = self.zoom._geometry(
+                context.frame_index,
+                video_width,
+                video_height,
+                context.frame_width,
+                context.frame_height
+            )
+
+        new_frame_width, new_frame_height, crop_xmin, crop_ymin, x1, y1, x2, y2 = geometry
+        crop_width = x2 - x1
+        crop_height = y2 - y1
+
+        background_image = self.background.get_background_image(video_width, video_height)
+        output = self.pool.borrow(background_image, (x1, y1, x2, y2))
+
+        region = output[y1:y2, x1:x2]
+        resize_crop(context.input, (new_frame_width, new_frame_height), (crop_xmin, crop_ymin, crop_width, crop_height), dst=region)
+
+        if self.roundness is not None:
+            r = self.roundness.zoomed_radius(zoom_factor, context.scale)
+            if r > 0:
+                self._restore_corners(region, background_image[y1:y2, x1:x2], r, rounded_corners)
+
+        context.rounded_corners = rounded_corners
+        context.input = output
+        context.frame_width = crop_width
+        context.frame_height = crop_height
+        context.x_offset = x1
+        context.y_offset = y1
+        context.zoom_factor = zoom_factor
+
+        return context
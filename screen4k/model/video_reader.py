@@ -0,0 +1,118 @@
+import cv2
+
+from model.frame_index import FrameIndex
+from model.raw_video import RawVideoReader, is_raw_video
+
+
+class VideoReader:
+    """Random access frame reader over a cv2.VideoCapture.
+
+    Seeks go through the FrameIndex of the video:
+
+    - when the target is ahead of the current position with no keyframe in
+      between, the decoder keeps going instead of seeking;
+    - otherwise the capture seeks to the target, which makes FFmpeg decode
+      forward from the previous keyframe, and the timestamp of the decoded
+      frame is checked against the index. Should it have landed on another
+      frame, the capture is positioned on the keyframe and decodes forward
+      frame by frame.
+
+    Either way, a seek decodes at most one keyframe interval of frames.
+    """
+    def __init__(self, path, index=None):
+        self.path = path
+        self.capture = cv2.VideoCapture(path)
+        self.index = index if index is not None else FrameIndex.load(path)
+
+        # Index of the frame that the capture decodes next, None if unknown
+        self.position = 0
+
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        self._timestamp_tolerance = 0.5 / fps if fps > 0 else 1e-3
+
+    @property
+    def fps(self):
+        return int(self.capture.get(cv2.CAP_PROP_FPS))
+
+    @property
+    def frame_width(self):
+        return int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+
+    @property
+    def frame_height(self):
+        return int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    @property
+    def num_frames(self):
+        return self.index.num_frames
+
+    def read(self, frame_index=None):
+        """Decodes the frame at frame_index (the next one by default), returns None past the end."""
+        if frame_index is None:
+            frame_index = self.position
+            if frame_index is None:
+                return None
+
+        if frame_index == self.position:
+            return self._read_next(frame_index)
+
+        if not 0 <= frame_index < self.num_frames:
+            return None
+
+        keyframe = self.index.keyframe_before(frame_index)
+        if self.position is not None and keyframe <= self.position < frame_index:
+            # Decoding on from here is at most as long as from the keyframe
+            if not self._skip(frame_index - self.position):
+                return None
+            return self._read_next(frame_index)
+
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        frame = self._read_next(frame_index)
+        if frame is not None and self._landed_on(frame_index):
+            return frame
+
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+        if not self._skip(frame_index - keyframe):
+            return None
+        return self._read_next(frame_index)
+
+    def _read_next(self, frame_index):
+        ret, frame = self.capture.read()
+        if not ret:
+            self.position = None
+            return None
+
+        self.position = frame_index + 1
+        return frame
+
+    def _skip(self, num_frames):
+        for _ in range(num_frames):
+            if not self.capture.grab():
+                self.position = None
+                return False
+        return True
+
+    def _landed_on(self, frame_index):
+        timestamp = self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        return abs(timestamp - self.index.timestamps[frame_index]) <= self._timestamp_tolerance
+
+    def release(self):
+        self.capture.release()
+
+
+def open_video(path, index=None):
+    """Returns a RawVideoReader for raw videos (see RawVideoEncoder), a VideoReader otherwise."""
+    if is_raw_video(path):
+        return RawVideoReader(path, index=index)
+    return VideoReader(path, index=index)
+
+
+def load_index(path):
+    """Returns the FrameIndex of a video, raw (where every frame is a keyframe) or not."""
+    if is_raw_video(path):
+        reader = RawVideoReader(path)
+        try:
+            return reader.index
+        finally:
+            reader.release()
+    return FrameIndex.load(path)
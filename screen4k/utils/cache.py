@@ -0,0 +1,113 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+def nbytes(value):
+    """Returns the memory held by a cached value, looking into tuples and lists."""
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(v) for v in value)
+    return getattr(value, 'nbytes', 0)
+
+
+class LRUCache:
+    """Thread-safe least recently used cache bounded by the size of its values.
+
+    Values are measured with `sizeof` (NumPy arrays by default) and the least
+    recently used entries are evicted once the total exceeds `max_bytes`. A
+    value larger than the whole budget is returned to the caller but not kept.
+    """
+    def __init__(self, max_bytes, sizeof=nbytes):
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key][0]
+
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= self._items.pop(key)[1]
+
+            if size > self.max_bytes:
+                return value
+
+            self._items[key] = (value, size)
+            self.nbytes += size
+            self._evict()
+
+        return value
+
+    def get_or_create(self, key, factory):
+        """Returns the cached value of `key`, creating it with `factory()` on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = self.put(key, factory())
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+
+            value, size = self._items.pop(key)
+            self.nbytes -= size
+            return value
+
+    def resize(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes and self._items:
+            _, (_, size) = self._items.popitem(last=False)
+            self.nbytes -= size
+            self.evictions += 1
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._items),
+                'nbytes': self.nbytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hit_rate,
+            }
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+
+_MISSING = object()
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+def rect_difference(a, b):
+    """Returns the rectangles covering `a` minus `b`, both given as (x1, y1, x2, y2)."""
+    ax1, ay1, ax2, ay2 = a
+    bx1, by1, bx2, by2 = b
+
+    # No overlap, the whole rectangle remains
+    if bx1 >= ax2 or bx2 <= ax1 or by1 >= ay2 or by2 <= ay1:
+        return [a]
+
+    rects = []
+    if by1 > ay1:
+        rects.append((ax1, ay1, ax2, by1))  # top band
+    if by2 < ay2:
+        rects.append((ax1, by2, ax2, ay2))  # bottom band
+
+    y1, y2 = max(ay1, by1), min(ay2, by2)
+    if bx1 > ax1:
+        rects.append((ax1, y1, bx1, y2))  # left part
+    if bx2 < ax2:
+        rects.append((bx2, y1, ax2, y2))  # right part
+
+    return rects
+
+
+class FramePool:
+    """Ring of preallocated output frames drawn over a static background.
+
+    A borrowed frame goes back to the ring implicitly and is handed out again
+    `size` borrows later, so consumers must be done with it (or copy it) by
+    then. Each frame remembers the rectangle its content was drawn into, and
+    only the part of that rectangle which the new content does not cover is
+    repainted from the background. Callers must therefore not draw outside
+    the rectangle they borrow a frame for, or call `invalidate` if they do.
+
+    `borrows` counts the frames handed out so far, so that a holder of the
+    last borrowed frame can tell whether the ring has moved on since.
+    """
+    def __init__(self, size=3):
+        self.size = size
+        self._frames = []
+        self._content_rects = []
+        self._background = None
+        self._index = 0
+        self.borrows = 0
+
+    def borrow(self, background, rect):
+        """Returns a frame showing `background` everywhere outside `rect`.
+
+        The content of the frame inside `rect` is undefined and must be fully
+        overwritten by the caller.
+        """
+        if background is not self._background:
+            self._frames = [np.empty_like(background) for _ in range(self.size)]
+            self._content_rects = [None] * self.size
+            self._background = background
+            self._index = 0
+
+        index = self._index
+        self._index = (index + 1) % self.size
+        self.borrows += 1
+
+        frame = self._frames[index]
+        previous_rect = self._content_rects[index]
+
+        if previous_rect is None:
+            np.copyto(frame, background)
+        else:
+            for x1, y1, x2, y2 in rect_difference(previous_rect, rect):
+                frame[y1:y2, x1:x2] = background[y1:y2, x1:x2]
+
+        self._content_rects[index] = rect
+        return frame
+
+    def holds(self, frame):
+        """Whether `frame` is one of the frames of the ring."""
+        return any(f is frame for f in self._frames)
+
+    def invalidate(self):
+        """Forces the next borrows to repaint the whole background."""
+        self._content_rects = [None] * len(self._frames)
+
+    @property
+    def nbytes(self):
+        return sum(frame.nbytes for frame in self._frames)
@@ -0,0 +1,163 @@
+import os
+import uuid
+import shutil
+import tempfile
+from collections import deque
+from threading import Condition
+
+import numpy as np
+
+
+POLICIES = ('block', 'drop_oldest', 'spill')
+
+
+class FrameQueue:
+    """Thread-safe FIFO of frames bounded by their size, between a producer and a consumer thread.
+
+    `policy` tells what `put` does when the frames held in memory would
+    exceed `max_bytes`:
+
+    - 'block' waits until the consumer makes room, so the producer slows
+      down to the pace of the consumer.
+    - 'drop_oldest' drops the oldest frames to make room, so the producer
+      keeps its pace and the consumer gets the most recent frames.
+    - 'spill' writes the frame to a file in `spill_dir` (a temporary
+      directory by default), which `get` reads back in turn, so nothing is
+      lost as long as the disk keeps up.
+
+    A frame larger than the whole budget is still queued when the queue is
+    empty. Frames travel with an `info` value of the caller's choice.
+    """
+    def __init__(self, max_bytes, policy='drop_oldest', spill_dir=None):
+        if policy not in POLICIES:
+            raise ValueError(f'Unknown queue policy {policy!r}, expected one of {POLICIES}')
+
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self._spill_dir = spill_dir
+        self._created_spill_dir = False
+
+        # (info, frame) in memory, or (info, (path, shape, dtype)) when spilled
+        self._items = deque()
+        self._condition = Condition()
+        self._closed = False
+        self._num_spilled = 0
+
+        self.nbytes = 0
+        self.max_depth = 0
+        self.puts = 0
+        self.dropped = 0
+        self.spilled = 0
+
+    def __len__(self):
+        with self._condition:
+            return len(self._items)
+
+    def put(self, frame, info=None):
+        """Queues a frame, returns False if the queue was closed before it could."""
+        size = frame.nbytes
+        with self._condition:
+            if self._closed:
+                return False
+
+            self.puts += 1
+            full = self.nbytes + size > self.max_bytes and self.nbytes > 0
+            if full and self.policy == 'block':
+                while self.nbytes + size > self.max_bytes and self.nbytes > 0 and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return False
+            elif full and self.policy == 'drop_oldest':
+                self._drop(size)
+
+            if not full or self.policy != 'spill':
+                self._append(info, frame)
+                self.nbytes += size
+                return True
+
+        # Written without the lock, so that the consumer is not held up meanwhile
+        spilled = self._spill(frame)
+        with self._condition:
+            self._append(info, spilled)
+            self._num_spilled += 1
+            self.spilled += 1
+        return True
+
+    def _append(self, info, frame):
+        self._items.append((info, frame))
+        self.max_depth = max(self.max_depth, len(self._items))
+        self._condition.notify_all()
+
+    def get(self, timeout=None):
+        """Returns the next (frame, info), or None once the queue is closed and empty (or on timeout)."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            if not self._items:
+                return None
+
+            info, frame = self._items.popleft()
+            if isinstance(frame, np.ndarray):
+                self.nbytes -= frame.nbytes
+                self._condition.notify_all()
+                return frame, info
+
+            self._num_spilled -= 1
+
+        return self._load(frame), info
+
+    def close(self):
+        """Lets `get` return the frames left and then None, and makes `put` return False."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def clear(self):
+        """Drops the frames left and removes the spill directory if the queue created it."""
+        with self._condition:
+            self._items.clear()
+            self.nbytes = 0
+            self._num_spilled = 0
+            self._condition.notify_all()
+
+        if self._created_spill_dir:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+            self._created_spill_dir = False
+
+    def stats(self):
+        with self._condition:
+            return {
+                'policy': self.policy,
+                'depth': len(self._items),
+                'max_depth': self.max_depth,
+                'nbytes': self.nbytes,
+                'max_bytes': self.max_bytes,
+                'on_disk': self._num_spilled,
+                'frames': self.puts,
+                'dropped': self.dropped,
+                'spilled': self.spilled,
+            }
+
+    def _drop(self, size):
+        # Nothing is spilled with this policy, all queued frames are in memory
+        while self._items and self.nbytes + size > self.max_bytes:
+            info, frame = self._items.popleft()
+            self.nbytes -= frame.nbytes
+            self.dropped += 1
+
+    def _spill(self, frame):
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='screen4k-frames-')
+            self._created_spill_dir = True
+
+        path = os.path.join(self._spill_dir, f'{uuid.uuid4().hex}.raw')
+        np.ascontiguousarray(frame).tofile(path)
+        return path, frame.shape, frame.dtype
+
+    @staticmethod
+    def _load(spilled):
+        path, shape, dtype = spilled
+        frame = np.fromfile(path, dtype=dtype).reshape(shape)
+        os.remove(path)
+        return frame
@@ -30,6 +30,15 @@ def hex_to_rgb(hex_color):
     return r, g, b
 
 
+def freeze(value):
+    """Turns nested dicts and lists into hashable tuples, e.g. to use a setting as a cache key."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
 def find_largest_leq_sorted(arr, x):
     if len(arr) == 0:
         return -1
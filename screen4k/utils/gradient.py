@@ -0,0 +1,104 @@
+import math
+
+import cv2
+import numpy as np
+
+from utils.general import hex_to_rgb
+
+
+# Ordered dither over 16 levels. Pixel (x, y) gets threshold 7 * k mod 16 with
+# k = (x + 4 * y) mod 16, so that horizontal, vertical and diagonal neighbours
+# never get close thresholds. Since k is affine in (x, y), the warp that
+# samples the color table can select the dithered row on its own.
+DITHER_LEVELS = 16
+DITHER_THRESHOLDS = (np.arange(DITHER_LEVELS) * 7 % DITHER_LEVELS + 0.5) / DITHER_LEVELS
+
+# Color table columns per pixel along the gradient, which keeps the error of
+# nearest sampling well under a color step even on small images
+OVERSAMPLING = 4
+
+
+def _color_table(stops, size, dither):
+    """Returns the gradient sampled at `size` positions as 8-bit BGR rows.
+
+    Row k holds the colors dithered with threshold k, or a single rounded row
+    if `dither` is off. One extra column is replicated at both ends so that
+    rounding at the extremities never samples outside of the gradient.
+    """
+    stops = sorted((float(position), color) for position, color in stops)
+    positions = np.array([position for position, _ in stops], dtype=np.float64)
+    colors = np.array([hex_to_rgb(color)[::-1] for _, color in stops], dtype=np.float64)
+
+    t = np.linspace(0.0, 1.0, size)
+    lut = np.stack([np.interp(t, positions, colors[:, c]) for c in range(3)], axis=1)
+    lut = np.pad(lut, ((1, 1), (0, 0)), mode='edge')
+
+    thresholds = DITHER_THRESHOLDS if dither else np.array([0.5])
+    table = np.floor(lut[None] + thresholds[:, None, None])
+    return np.clip(table, 0, 255).astype(np.uint8)
+
+
+def _linear_gradient(width, height, stops, angle, dither):
+    theta = math.radians(angle)
+    dx, dy = math.cos(theta), math.sin(theta)
+    length = max(abs(dx) * (width - 1) + abs(dy) * (height - 1), 1)
+
+    size = OVERSAMPLING * math.ceil(length) + 1
+    table = _color_table(stops, size, dither)
+
+    # Column of pixel (x, y) in the table, measured from the image center
+    scale = (size - 1) / length
+    cx, cy = (width - 1) / 2, (height - 1) / 2
+    column = [dx * scale, dy * scale, 1 + (size - 1) / 2 - (cx * dx + cy * dy) * scale]
+    row = [1, 4, 0] if dither else [0, 0, 0]
+
+    return cv2.warpAffine(table, np.array([column, row], dtype=np.float64), (width, height),
+                          flags=cv2.INTER_NEAREST | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_WRAP)
+
+
+def _radial_gradient(width, height, stops, dither):
+    radius = max(math.hypot(width - 1, height - 1) / 2, 1)
+    size = OVERSAMPLING * math.ceil(radius) + 1
+    table = _color_table(stops, size, dither)
+
+    # The gradient is symmetric about the center, so only the bottom right
+    # quadrant (including the center row and column) is sampled
+    x0, y0 = width // 2, height // 2
+    xs = np.arange(x0, width, dtype=np.float32)
+    ys = np.arange(y0, height, dtype=np.float32)[:, None]
+
+    map_x = np.hypot(xs - np.float32((width - 1) / 2), ys - np.float32((height - 1) / 2))
+    map_x *= np.float32((size - 1) / radius)
+    map_x += np.float32(1)
+
+    if dither:
+        map_y = np.add.outer(np.arange(y0, height) * 4, np.arange(x0, width)) % DITHER_LEVELS
+        map_y = map_y.astype(np.float32)
+    else:
+        map_y = np.zeros_like(map_x)
+
+    quadrant = cv2.remap(table, map_x, map_y, cv2.INTER_NEAREST, borderMode=cv2.BORDER_WRAP)
+
+    # Mirror the quadrant into the other three
+    output = np.empty(shape=(height, width, 3), dtype=np.uint8)
+    output[y0:, x0:] = quadrant
+    output[y0:, :x0] = quadrant[:, ::-1][:, :x0]
+    output[:y0] = output[height - 1:height - 1 - y0:-1] if y0 > 0 else output[:0]
+    return output
+
+
+def create_gradient_image(width, height, stops, angle=0, kind='linear', dither=True):
+    """Renders a multi-stop gradient as a (height, width, 3) BGR image.
+
+    `stops` is a list of (position, hex color) with positions in [0, 1].
+    Linear gradients run along `angle` degrees (0 is left to right, 90 is top
+    to bottom); radial gradients go from the center to the corners. The
+    colors are computed once per position along the gradient and spread over
+    the image with a single OpenCV warp, ordered-dithered so that 8-bit output
+    does not band.
+    """
+    if kind == 'linear':
+        return _linear_gradient(width, height, stops, angle, dither)
+    if kind == 'radial':
+        return _radial_gradient(width, height, stops, dither)
+    raise ValueError(f'Unknown gradient kind: {kind}')
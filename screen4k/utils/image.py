@@ -1,8 +1,44 @@
 import os
 from pathlib import Path
 
+import cv2
+
 class ImageAssets:
     @staticmethod
     def file(filename):
         root_dir = (Path(__file__).parent / '../..').resolve()
-        return str(root_dir / filename)
\ No newline at end of file
+        return str(root_dir / filename)
+
+
+def downscale(image, size):
+    """Resizes an image down to size = (width, height) without aliasing.
+
+    INTER_AREA is only fast for integer factors, so the image is halved with
+    it while the remaining factor is at least 2 and the rest is interpolated
+    linearly, which is several times faster than an arbitrary INTER_AREA
+    resize of a 4K frame and looks the same.
+    """
+    width, height = size
+    while image.shape[1] >= 2 * width and image.shape[0] >= 2 * height:
+        image = cv2.resize(image, (image.shape[1] // 2, image.shape[0] // 2), interpolation=cv2.INTER_AREA)
+
+    if (image.shape[1], image.shape[0]) != (width, height):
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_LINEAR)
+
+    return image
+
+
+def same_image(a, b):
+    """Whether two images have the same pixels.
+
+    Every 16th row is compared first, which rejects most changed frames
+    quickly, and only then the whole images, with cv2.norm since it does
+    not allocate a comparison array like np.array_equal.
+    """
+    if a is b:
+        return True
+    if a.shape != b.shape or a.dtype != b.dtype:
+        return False
+    if cv2.norm(a[::16], b[::16], cv2.NORM_INF) != 0:
+        return False
+    return cv2.norm(a, b, cv2.NORM_INF) == 0
@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import threading
+import tracemalloc
+from collections import OrderedDict, deque
+
+import numpy as np
+
+
+PERCENTILES = (50, 95, 99)
+
+
+class StageProfiler:
+    """Rolling per-stage statistics of a transform pipeline.
+
+    Every call of a stage records its wall time, the peak number of bytes it
+    allocated (when `trace_memory` is on, through tracemalloc, which NumPy
+    reports its buffers to) and the shape of its output. Only the last
+    `window` calls of each stage are kept, so the profiler can stay enabled
+    during a whole export. The same samples are kept as events for a Chrome
+    trace, which can be opened in chrome://tracing or Perfetto.
+
+    tracemalloc counts the allocations of all threads together, so the
+    allocations are only meaningful while a single thread runs stages.
+    Profilers of other threads or processes are made with `fork`, which only
+    measures time, or without `trace_memory`, and merged back with `merge`.
+    """
+    def __init__(self, window=1000, trace_memory=True):
+        self.window = window
+        self.trace_memory = trace_memory
+
+        self._samples = OrderedDict()
+        self._events = deque(maxlen=window * 16)
+        self._lock = threading.Lock()
+        self._started_tracemalloc = False
+        self._origin = time.perf_counter()
+
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def close(self):
+        """Stops tracemalloc if the profiler started it."""
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def fork(self):
+        """Returns a profiler with the same window for another thread, which does not trace memory."""
+        return StageProfiler(window=self.window, trace_memory=False)
+
+    def snapshot(self):
+        """Returns the samples and trace events (picklable), to merge into another profiler."""
+        with self._lock:
+            return {
+                'origin': self._origin,
+                'samples': {name: list(values) for name, values in self._samples.items()},
+                'events': list(self._events),
+            }
+
+    def merge(self, snapshot):
+        """Adds the samples and trace events of a `snapshot` of another profiler."""
+        # perf_counter is the same clock in every thread and process, only the origins differ
+        shift = (snapshot['origin'] - self._origin) * 1e6
+        with self._lock:
+            for name, values in snapshot['samples'].items():
+                if name not in self._samples:
+                    self._samples[name] = deque(maxlen=self.window)
+                self._samples[name].extend(values)
+            for event in snapshot['events']:
+                self._events.append(dict(event, ts=event['ts'] + shift))
+
+    def begin(self, memory=True):
+        """Returns the state `end` needs to measure a stage starting now.
+
+        Allocations are measured from the tracemalloc peak, so spans that
+        contain other measured stages must pass `memory=False`.
+        """
+        if memory and self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+        else:
+            current = None
+
+        return time.perf_counter(), current
+
+    def end(self, name, state, shape=None, frame_index=None):
+        """Records a stage begun with `begin`, along with the shape of its output."""
+        t1 = time.perf_counter()
+        t0, memory = state
+
+        allocated = 0
+        if memory is not None and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            allocated = max(peak - memory, 0)
+
+        if shape is not None:
+            shape = tuple(shape)
+
+        event = {
+            'name': name,
+            'ph': 'X',
+            'ts': (t0 - self._origin) * 1e6,
+            'dur': (t1 - t0) * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': {'frame_index': frame_index, 'bytes': allocated, 'shape': shape},
+        }
+
+        with self._lock:
+            if name not in self._samples:
+                self._samples[name] = deque(maxlen=self.window)
+            self._samples[name].append((t1 - t0, allocated, shape))
+            self._events.append(event)
+
+    def stats(self):
+        """Returns, for each stage, the p50/p95/p99 time (ms) and allocation (bytes) and the last output shape."""
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+
+        stats = OrderedDict()
+        for name, values in samples.items():
+            if len(values) == 0:
+                continue
+
+            times = np.array([v[0] for v in values]) * 1000
+            allocated = np.array([v[1] for v in values])
+            time_percentiles = np.percentile(times, PERCENTILES)
+            bytes_percentiles = np.percentile(allocated, PERCENTILES)
+
+            stats[name] = {
+                'count': len(values),
+                'time_ms': {f'p{p}': float(v) for p, v in zip(PERCENTILES, time_percentiles)},
+                'bytes': {f'p{p}': int(v) for p, v in zip(PERCENTILES, bytes_percentiles)},
+                'shape': values[-1][2],
+            }
+
+        return stats
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._events.clear()
+
+    def dump_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.stats(), f, indent=2)
+
+    def dump_chrome_trace(self, path):
+        with self._lock:
+            events = list(self._events)
+
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
@@ -220,8 +220,7 @@ class PaddingSetting(BaseShapeSetting):
         AppContext.get('model').set_padding(value)
 
         # Display frame
-        frame = AppContext.get('model').current_frame
-        AppContext.get('video_toolbar').display_frame(frame)
+        AppContext.get('video_toolbar').request_frame()
 
 
 class InsetSetting(BaseShapeSetting):
@@ -235,8 +234,7 @@ class InsetSetting(BaseShapeSetting):
         AppContext.get('model').set_inset(value)
 
         # Display frame
-        frame = AppContext.get('model').current_frame
-        AppContext.get('video_toolbar').display_frame(frame)
+        AppContext.get('video_toolbar').request_frame()
 
 
 class RoundnessSetting(BaseShapeSetting):
@@ -250,5 +248,4 @@ class RoundnessSetting(BaseShapeSetting):
         AppContext.get('model').set_roundness(value)
 
         # Display frame
-        frame = AppContext.get('model').current_frame
-        AppContext.get('video_toolbar').display_frame(frame)
\ No newline at end of file
+        AppContext.get('video_toolbar').request_frame()
\ No newline at end of file
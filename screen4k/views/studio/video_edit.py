@@ -38,7 +38,8 @@ class VideoEdit(QWidget):
         fps = AppContext.get('model').fps
         self.zoom_tracks = []
 
-        for i, (rel_x, rel_y, clicked_frame_index, duration) in enumerate(click_data):
+        for i, click in enumerate(click_data):
+            rel_x, rel_y, clicked_frame_index, duration = click[:4]
             if i == 0:
                 drag_minimum_x = 0
             else:
@@ -83,6 +84,7 @@ class VideoEdit(QWidget):
 
         # Connect TimelineSlider's custom signal to TimelineSlider's slot
         self.timeline_slider.timeline_slider_released.connect(self.move_timeline_slider_and_update_frame)
+        self.timeline_slider.timeline_slider_moved.connect(self.update_frame)
 
         # Connect ClipTrack's custom signal to TimelineSlider's slot
         self.clip_track.clip_clicked.connect(self.move_timeline_slider_and_update_frame)
@@ -96,9 +98,13 @@ class VideoEdit(QWidget):
         self.timeline_slider.move(cx, self.timeline_slider.y())
 
         # Update frame
+        self.update_frame(x_pos)
+
+    def update_frame(self, x_pos):
+        # Rendered on the render worker, which only keeps up with the latest position while dragging
+        cx = x_pos - self.timeline_slider.width() // 2
         frame_index = int(cx / AppContext.get('pix_per_sec') * AppContext.get('model').fps)
-        frame = AppContext.get('model').get_frame(frame_index)
-        AppContext.get('video_toolbar').display_frame(frame)
+        AppContext.get('video_toolbar').request_frame(frame_index)
 
     def update_zoom_track_drag_range_x(self, index):
         # Update the internal data of the zoom tracks
@@ -195,7 +201,8 @@ class Timeline(QWidget):
 
 
 class TimelineSlider(QWidget):
-    # Custom signal to emit mouse release event
+    # Custom signals to emit mouse move and release events
+    timeline_slider_moved = Signal(int)
     timeline_slider_released = Signal(int)
 
     def __init__(self, parent=None):
@@ -240,6 +247,7 @@ class TimelineSlider(QWidget):
             elif new_x > self.parent().width() - self.width():
                 new_x = self.parent().width() - self.width()
             self.move(new_x, self.y())
+            self.timeline_slider_moved.emit(int(new_x + self.width() // 2))
 
     def mouseReleaseEvent(self, event: QMouseEvent):
         if event.button() == Qt.LeftButton:
@@ -552,6 +560,7 @@ class ZoomTrack(QWidget):
                 update_clicked_frame_index = int(x_pos / pix_per_sec * fps)
                 click_item = click_data[self.index - 1]
                 click_item[2] = update_clicked_frame_index
+                AppContext.get('model').update_click_event(self.index - 1, click_item)
 
             # Update the left and the right zoom track's drag range of the current track
             self.mouse_released.emit(self.index)
\ No newline at end of file
@@ -1,5 +1,6 @@
 import time
 import cv2
+from loguru import logger
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QSizePolicy
 )
@@ -26,6 +27,7 @@ class VideoPreview(QWidget):
 
         self.frame_label = AspectRatioLabel(parent=self)
         self.frame_label.setAlignment(Qt.AlignCenter)
+        self.frame_label.size_changed.connect(self.on_frame_label_resized)
 
         self.toolbar = VideoToolBar(parent=self)
         self.toolbar.setFixedHeight(40)
@@ -43,6 +45,10 @@ class VideoPreview(QWidget):
     def on_frame_changed(self, pixmap):
         self.frame_label.setPixmapWithAspectRatio(pixmap)
 
+    def on_frame_label_resized(self, width, height):
+        # Render the preview at the size it is shown at instead of the source size
+        AppContext.get('model').set_preview_size(width, height)
+
 
 class VideoTopToolBar(QWidget):
     def __init__(self, parent=None):
@@ -74,21 +80,27 @@ class VideoTopToolBar(QWidget):
     def change_aspect_ratio(self, aspect_ratio):
         model = AppContext.get('model')
         model.set_aspect_ratio(aspect_ratio)
-        frame = model.current_frame
 
-        AppContext.get('video_toolbar').display_frame(frame)
+        AppContext.get('video_toolbar').request_frame()
 
 
 class VideoToolBar(QWidget):
     frame_changed = Signal(QPixmap)
 
+    # RGB frames rendered on the render worker of the model
+    frame_rendered = Signal(int, object)
+
     def __init__(self, parent=None):
         super().__init__(parent=parent)
 
         self.timer = QTimer()
-        self.timer.timeout.connect(self.next_frame)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.play_next_frame)
         self.is_paused = True
 
+        # Emitted from the worker thread, delivered on the GUI thread
+        self.frame_rendered.connect(self.on_frame_rendered)
+
         self.init_ui()
 
     def init_ui(self):
@@ -162,13 +174,28 @@ class VideoToolBar(QWidget):
     def play(self):
         self.is_paused = False
         self.play_button.setIcon(QIcon(ImageAssets.file('images/ui_controls/pause.svg')))
-        self.timer.start(30)
+
+        # Frames are decoded and rendered ahead on a worker thread and the
+        # model picks the one due on its clock, so the timer only needs to
+        # poll more often than the frame rate for frames to show on time
+        model = AppContext.get('model')
+        model.start_playback()
+        self.timer.start(max(1, int(500 / model.fps)) if model.fps > 0 else 15)
 
     def pause(self):
+        was_playing = not self.is_paused
         self.is_paused = True
         self.play_button.setIcon(QIcon(ImageAssets.file('images/ui_controls/play.svg')))
         self.timer.stop()
 
+        model = AppContext.get('model')
+        model.stop_playback()
+        if was_playing:
+            stats = model.playback_stats
+            logger.info(f"Playback: {stats['presented']} frames presented, {stats['dropped']} dropped, {stats['late']} late")
+            stats = model.render_stats
+            logger.info(f"Preview: {stats['rendered']} frames rendered, {stats['reused']} reused")
+
     def skip_backward(self):
         self.pause()
         frame_index = AppContext.get('model').current_frame_index
@@ -180,6 +207,18 @@ class VideoToolBar(QWidget):
         self.pause()
         self.next_frame()
 
+    def play_next_frame(self):
+        model = AppContext.get('model')
+        frame = model.poll_playback_frame()
+
+        if frame is None:
+            # Not due or not rendered yet, keep the current frame until the next tick
+            if model.playback_finished:
+                self.pause()
+            return
+
+        self.show_frame(frame)
+
     def next_frame(self):
         frame = AppContext.get('model').next_frame()
 
@@ -188,6 +227,9 @@ class VideoToolBar(QWidget):
             self.is_paused = True
             return
 
+        self.show_frame(frame)
+
+    def show_frame(self, frame):
         self.display_frame(frame)
 
         # Update slider
@@ -200,9 +242,33 @@ class VideoToolBar(QWidget):
         if timeline_slider is not None:
             timeline_slider.move(x_pos, timeline_slider.y())
 
+    def request_frame(self, frame_index=None):
+        """Displays frame_index, or the current frame after a setting changed, once it is rendered.
+
+        Rendering happens on the render worker of the model, which skips the
+        requests superseded before it gets to them, so this can be called
+        for every value of a slider drag.
+        """
+        model = AppContext.get('model')
+        if frame_index is None:
+            model.request_current_frame(self._frame_rendered_callback)
+        else:
+            model.request_frame(frame_index, self._frame_rendered_callback)
+
+    def _frame_rendered_callback(self, frame_index, frame):
+        # On the worker thread, which also does the color conversion
+        self.frame_rendered.emit(frame_index, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+    def on_frame_rendered(self, frame_index, frame_rgb):
+        # Playback shows its own frames
+        if self.is_paused:
+            self.display_rgb_frame(frame_rgb)
+
     def display_frame(self, frame):
+        self.display_rgb_frame(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+    def display_rgb_frame(self, frame_rgb):
         # Convert frame to QImage
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         height, width, channel = frame_rgb.shape
         bytes_per_line = 3 * width
         q_img = QImage(frame_rgb.data, width, height, bytes_per_line, QImage.Format.Format_RGB888)
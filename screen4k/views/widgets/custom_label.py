@@ -1,10 +1,13 @@
 import time
 from PySide6.QtWidgets import QLabel, QSizePolicy
 from PySide6.QtGui import QPainter
-from PySide6.QtCore import QRect
+from PySide6.QtCore import QRect, Signal
 
 
 class AspectRatioLabel(QLabel):
+    # Size of the label in device pixels, to render frames at
+    size_changed = Signal(int, int)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.aspect_ratio = 1.0  # Default aspect ratio
@@ -20,6 +23,9 @@ class AspectRatioLabel(QLabel):
         self.updatePixmapRect()  # Update the pixmap rectangle on resize
         super().resizeEvent(event)
 
+        ratio = self.devicePixelRatioF()
+        self.size_changed.emit(int(self.width() * ratio), int(self.height() * ratio))
+
     def updatePixmapRect(self):
         # Calculate the dimensions of the scaled pixmap rectangle
         label_width = self.width()
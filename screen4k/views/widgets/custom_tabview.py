@@ -1,3 +1,5 @@
+import math
+
 from PySide6.QtWidgets import (
     QWidget, QTabWidget, QVBoxLayout, QLabel, QStackedLayout,
     QPushButton, QHBoxLayout, QGridLayout, QFrame,
@@ -30,7 +32,7 @@ class CustomTabView(QFrame):
         # Create pages
         self.pages = [
             WallpaperPage(),
-            QLabel('Gradient page'),
+            GradientPage(),
             ColorPage(),
             QLabel('Image page')
         ]
@@ -156,15 +158,19 @@ class WallpaperPage(QWidget):
 
 
 class WallpaperThumbnail(QPushButton):
+    background_ready = Signal()
+
     def __init__(self, index, parent=None):
         super().__init__(parent=parent)
 
         self.index = index
+        self.background = {'type': 'wallpaper', 'value': self.index}
         self.wallpaper_path = ImageAssets.file(f'images/wallpapers/preview/gradient-wallpaper-{self.index:04d}.png')
 
         self.init_ui()
 
         self.clicked.connect(self.on_click)
+        self.background_ready.connect(self.apply_background)
 
     def init_ui(self):
         layout = QVBoxLayout(self)
@@ -179,23 +185,101 @@ class WallpaperThumbnail(QPushButton):
         self.setFixedSize(35, 35)  # Ensure each thumbnail has a fixed size
         self.setStyleSheet('border: 1px solid darkgray; background-color: white;')
 
+    def enterEvent(self, event):
+        # Start decoding the wallpaper before it is clicked
+        AppContext.get('model').prefetch_background(self.background)
+        super().enterEvent(event)
+
     def on_click(self):
+        # Decode off the GUI thread, the background is applied once it is ready
+        future = AppContext.get('model').prefetch_background(self.background)
+        if future is None:
+            self.apply_background()
+        else:
+            future.add_done_callback(lambda _: self.background_ready.emit())
+
+    def apply_background(self):
         # Update model
-        AppContext.get('model').set_background({'type': 'wallpaper', 'value': self.index})
+        AppContext.get('model').set_background(self.background)
 
         # Display
-        frame = AppContext.get('model').current_frame
-        AppContext.get('video_toolbar').display_frame(frame)
+        AppContext.get('video_toolbar').request_frame()
 
 
 class GradientPage(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent=parent)
 
+        self.gradients = [
+            {'kind': 'linear', 'angle': 45, 'stops': [(0, '#FF3131'), (1, '#FF914D')]},
+            {'kind': 'linear', 'angle': 45, 'stops': [(0, '#FF66C4'), (1, '#FFDE59')]},
+            {'kind': 'linear', 'angle': 45, 'stops': [(0, '#8C52FF'), (1, '#FF914D')]},
+            {'kind': 'linear', 'angle': 45, 'stops': [(0, '#5E17EB'), (1, '#CB6CE6')]},
+            {'kind': 'linear', 'angle': 45, 'stops': [(0, '#004AAD'), (1, '#CB6CE6')]},
+            {'kind': 'linear', 'angle': 45, 'stops': [(0, '#0097B2'), (1, '#7ED957')]},
+            {'kind': 'linear', 'angle': 45, 'stops': [(0, '#5CE1E6'), (1, '#FFDE59')]},
+            {'kind': 'linear', 'angle': 90, 'stops': [(0, '#38B6FF'), (1, '#5271FF')]},
+            {'kind': 'linear', 'angle': 90, 'stops': [(0, '#00BF63'), (1, '#C1FF72')]},
+            {'kind': 'linear', 'angle': 90, 'stops': [(0, '#FFDE59'), (1, '#FF3131')]},
+            {'kind': 'linear', 'angle': 0, 'stops': [(0, '#FF3131'), (0.5, '#8C52FF'), (1, '#38B6FF')]},
+            {'kind': 'linear', 'angle': 0, 'stops': [(0, '#00BF63'), (0.5, '#0CC0DF'), (1, '#5E17EB')]},
+            {'kind': 'linear', 'angle': 135, 'stops': [(0, '#FFBD59'), (0.5, '#FF66C4'), (1, '#5E17EB')]},
+            {'kind': 'linear', 'angle': 135, 'stops': [(0, '#7ED957'), (0.5, '#0097B2'), (1, '#004AAD')]},
+            {'kind': 'radial', 'stops': [(0, '#5271FF'), (1, '#004AAD')]},
+            {'kind': 'radial', 'stops': [(0, '#CB6CE6'), (1, '#5E17EB')]},
+            {'kind': 'radial', 'stops': [(0, '#FFDE59'), (1, '#FA7420')]},
+            {'kind': 'radial', 'stops': [(0, '#5CE1E6'), (1, '#0097B2')]},
+            {'kind': 'radial', 'stops': [(0, '#FF66C4'), (1, '#FF3131')]},
+            {'kind': 'radial', 'stops': [(0, '#C1FF72'), (1, '#00BF63')]},
+        ]
+        self.num_columns = 7
+
         self.init_ui()
 
     def init_ui(self):
-        pass
+        grid_layout = QGridLayout()
+        grid_layout.setContentsMargins(0, 0, 0, 0)
+        grid_layout.setSpacing(0)
+        self.setLayout(grid_layout)
+
+        for i, gradient in enumerate(self.gradients):
+            gradient_button = GradientButton(i, gradient)
+            row = i // self.num_columns
+            col = i % self.num_columns
+            grid_layout.addWidget(gradient_button, row, col)
+
+
+class GradientButton(QPushButton):
+    def __init__(self, index, gradient, size=50, parent=None):
+        super().__init__(parent=parent)
+
+        self.index = index
+        self.gradient = gradient
+        self.size = size
+
+        self.init_ui()
+
+        self.clicked.connect(self.on_click)
+
+    def init_ui(self):
+        self.setStyleSheet(f'background: {self.stylesheet_gradient()}; border: 1px solid darkgray;')
+        self.setFixedSize(self.size, self.size)
+
+    def stylesheet_gradient(self):
+        stops = ', '.join(f'stop: {position} {color}' for position, color in self.gradient['stops'])
+        if self.gradient['kind'] == 'radial':
+            return f'qradialgradient(cx: 0.5, cy: 0.5, radius: 0.71, fx: 0.5, fy: 0.5, {stops})'
+
+        theta = math.radians(self.gradient.get('angle', 0))
+        dx, dy = math.cos(theta) / 2, math.sin(theta) / 2
+        return f'qlineargradient(x1: {0.5 - dx:.3f}, y1: {0.5 - dy:.3f}, x2: {0.5 + dx:.3f}, y2: {0.5 + dy:.3f}, {stops})'
+
+    def on_click(self):
+        # Update model
+        AppContext.get('model').set_background({'type': 'gradient', 'value': self.gradient})
+
+        # Display
+        AppContext.get('video_toolbar').request_frame()
 
 
 class ColorPage(QWidget):
@@ -245,8 +329,7 @@ class ColorButton(QPushButton):
         AppContext.get('model').set_background({'type': 'color', 'value': self.color})
 
         # Display
-        frame = AppContext.get('model').current_frame
-        AppContext.get('video_toolbar').display_frame(frame)
+        AppContext.get('video_toolbar').request_frame()
 
 
 class ImagePage(QWidget):
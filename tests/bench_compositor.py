@@ -0,0 +1,57 @@
+"""Times the fused compositor against the chain of transforms it replaces.
+
+Run it from the repository root with `python tests/bench_compositor.py`. It
+shares the setup of the tests through conftest (the import path of screen4k
+and the dummy mouse backend when there is no display), so it runs headless.
+"""
+import time
+
+import numpy as np
+
+import conftest
+
+
+def build_transform(fuse, fps=30):
+    return conftest.build_transform(num_frames=None, padding=100, click=(0.2, 0.2, 30, 4.0), radius=20, shadow=True,
+                                    fps=fps, fuse=fuse)
+
+
+def benchmark(transform, frame, frame_indices, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for frame_index in frame_indices:
+            transform.render(frame, frame_index)
+        timings.append((time.perf_counter() - t0) / len(frame_indices))
+
+    return min(timings)
+
+
+def main():
+    resolutions = {'1080p': (1920, 1080), '4K': (3840, 2160)}
+    cases = {
+        'no zoom': [0, 1, 2, 3],
+        'zooming': [45, 50, 55, 60],
+        'zoomed': [90, 95, 100, 105],
+    }
+
+    rng = np.random.default_rng(0)
+    for name, (width, height) in resolutions.items():
+        frame = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        chain = build_transform(fuse=False)
+        fused = build_transform(fuse=True)
+
+        for case, frame_indices in cases.items():
+            for frame_index in frame_indices:
+                expected = chain.render(frame, frame_index).input
+                output = fused.render(frame, frame_index).input
+                assert np.array_equal(expected, output), f'{name} {case}: frame {frame_index} differs'
+
+            chain_time = benchmark(chain, frame, frame_indices)
+            fused_time = benchmark(fused, frame, frame_indices)
+            print(f'{name:>5} {case:>8}: chain {chain_time * 1000:7.2f} ms, '
+                  f'fused {fused_time * 1000:7.2f} ms, speedup {chain_time / fused_time:.2f}x')
+
+
+if __name__ == "__main__":
+    main()
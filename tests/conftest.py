@@ -0,0 +1,102 @@
+import os
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'screen4k'))
+
+# The model package imports pynput, whose default backend needs a display on
+# Linux. The tests never listen to the mouse, so they run on its dummy backend.
+if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+    os.environ.setdefault('PYNPUT_BACKEND', 'dummy')
+
+
+# Frames carry their index as blocks of NUMBER_BITS bits, which survive lossy encoding
+NUMBER_BITS = 10
+BLOCK_SIZE = 8
+
+
+def numbered_frame(frame_index, width=96, height=64):
+    frame = np.full((height, width, 3), 128, dtype=np.uint8)
+    for bit in range(NUMBER_BITS):
+        frame[:2 * BLOCK_SIZE, bit * BLOCK_SIZE:(bit + 1) * BLOCK_SIZE] = 255 if frame_index >> bit & 1 else 0
+    return frame
+
+
+def frame_number(frame):
+    """Returns the index of a frame drawn by numbered_frame."""
+    number = 0
+    for bit in range(NUMBER_BITS):
+        x = bit * BLOCK_SIZE
+        if frame[BLOCK_SIZE // 2:3 * BLOCK_SIZE // 2, x + 2:x + BLOCK_SIZE - 2].mean() > 128:
+            number |= 1 << bit
+    return number
+
+
+@pytest.fixture
+def make_video(tmp_path):
+    """Returns a function writing an mp4 of numbered frames and returning its path."""
+    def make(num_frames=40, fps=30, name='video.mp4'):
+        path = str(tmp_path / name)
+        height, width = numbered_frame(0).shape[:2]
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+        for i in range(num_frames):
+            writer.write(numbered_frame(i))
+        writer.release()
+        return path
+
+    return make
+
+
+@pytest.fixture
+def cursor_images(monkeypatch):
+    """Gives Cursor a small arrow instead of the images of the platform."""
+    from model.transforms import Cursor
+
+    arrow = np.zeros((8, 6, 4), dtype=np.uint8)
+    arrow[..., :3] = 255
+    arrow[2:6, 1:5, 3] = 255
+    monkeypatch.setattr(Cursor, '_load', lambda self: {'arrow': arrow, 'pointing_hand': arrow})
+    return arrow
+
+
+class CaptureEncoder:
+    """Keeps copies of the written frames, in place of a video encoder."""
+    def __init__(self):
+        self.frames = []
+        self.size = None
+        self.released = False
+
+    def open(self, output_path, fps, width, height):
+        self.size = (width, height)
+        return self
+
+    def write(self, frame):
+        self.frames.append(frame.copy())
+
+    def release(self):
+        self.released = True
+
+
+def build_transform(num_frames=40, padding=10, click=(0.3, 0.3, 5, 0.5), radius=8, shadow=False, moves=None,
+                    fps=30, **options):
+    """Returns the chain of transforms of the editor, over a color background.
+
+    The zoom follows one click, [x, y, frame_index, duration]. A cursor is
+    added when `moves` are given. `options` go to Compose, e.g. fuse or reuse.
+    """
+    from model.transforms import Compose, AspectRatio, Cursor, Padding, Zoom, Roundness, Shadow, Background
+
+    transforms = {'aspect_ratio': AspectRatio('16:9')}
+    if moves is not None:
+        transforms['cursor'] = Cursor(move_data=moves)
+    transforms['padding'] = Padding(padding=padding)
+    transforms['zoom'] = Zoom(click_data=[list(click)], fps=fps)
+    transforms['roundness'] = Roundness(radius=radius)
+    if shadow:
+        transforms['shadow'] = Shadow()
+    transforms['background'] = Background(background={'type': 'color', 'value': '#5271FF'})
+    return Compose(transforms, num_frames=num_frames, **options)
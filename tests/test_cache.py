@@ -0,0 +1,97 @@
+import threading
+
+import numpy as np
+
+from utils.cache import LRUCache
+
+
+def block(kilobytes):
+    return np.zeros(kilobytes * 1024, dtype=np.uint8)
+
+
+def test_least_recently_used_values_are_evicted_at_max_bytes():
+    cache = LRUCache(max_bytes=3 * 1024)
+    for key in 'abc':
+        cache.put(key, block(1))
+
+    # 'a' is used again, so 'b' is the least recently used
+    assert cache.get('a') is not None
+    cache.put('d', block(1))
+
+    assert 'b' not in cache and all(key in cache for key in 'acd')
+    assert cache.nbytes == 3 * 1024 and cache.evictions == 1
+
+    cache.put('e', block(2))
+    assert [key for key in 'acde' if key in cache] == ['d', 'e']
+    assert cache.nbytes <= cache.max_bytes
+
+
+def test_values_larger_than_the_budget_are_not_kept():
+    cache = LRUCache(max_bytes=1024)
+    cache.put('small', block(1))
+
+    value = block(2)
+    assert cache.put('large', value) is value
+    assert 'large' not in cache and 'small' in cache
+
+
+def test_replacing_a_value_updates_the_size():
+    cache = LRUCache(max_bytes=4 * 1024)
+    cache.put('a', block(3))
+    cache.put('a', block(1))
+    cache.put('b', block(3))
+
+    assert cache.nbytes == 4 * 1024 and len(cache) == 2
+
+
+def test_tuples_are_measured_by_their_arrays():
+    cache = LRUCache(max_bytes=10 * 1024)
+    cache.put('corners', ((0, 0, block(1)), (10, 0, block(2))))
+
+    assert cache.nbytes == 3 * 1024
+
+
+def test_resize_evicts_down_to_the_new_budget():
+    cache = LRUCache(max_bytes=4 * 1024)
+    for key in 'abcd':
+        cache.put(key, block(1))
+
+    cache.resize(2 * 1024)
+    assert [key for key in 'abcd' if key in cache] == ['c', 'd']
+
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
+
+
+def test_get_or_create_creates_each_value_once_and_counts_hits():
+    cache = LRUCache(max_bytes=1024)
+    created = []
+
+    def create():
+        created.append(1)
+        return block(1)
+
+    value = cache.get_or_create('a', create)
+    assert cache.get_or_create('a', create) is value
+    assert len(created) == 1
+    assert cache.stats() == {
+        'entries': 1, 'nbytes': 1024, 'max_bytes': 1024, 'hits': 1, 'misses': 1, 'evictions': 0, 'hit_rate': 0.5,
+    }
+
+
+def test_budget_holds_with_concurrent_writers():
+    cache = LRUCache(max_bytes=8 * 1024)
+
+    def write(offset):
+        for i in range(200):
+            cache.put(offset + i, block(1))
+            cache.get(offset + i // 2)
+
+    threads = [threading.Thread(target=write, args=(1000 * t,)) for t in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(cache) == 8 and cache.nbytes == 8 * 1024
+    assert cache.evictions == 4 * 200 - 8
@@ -0,0 +1,80 @@
+import os
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import CaptureEncoder, frame_number
+from model.chunked_exporter import ChunkedExporter, MIN_CHUNK_FRAMES
+from model.encoder import OpenCVEncoder
+from model.frame_index import FrameIndex
+from model.transforms import Compose, AspectRatio
+
+
+def keyframe_index(num_frames, interval):
+    return FrameIndex(np.arange(0, num_frames, interval), np.arange(num_frames) / 30)
+
+
+def test_chunks_start_on_keyframes_and_cover_the_video():
+    index = keyframe_index(1000, 30)
+    exporter = ChunkedExporter('unused.mp4', Compose({}), 'out.mp4', 30, num_processes=2, index=index)
+
+    chunks = exporter.chunks()
+    assert len(chunks) == min(2 * 4, 1000 // MIN_CHUNK_FRAMES)
+    assert chunks[0][0] == 0 and chunks[-1][1] == 1000
+    for (_, end), (start, _) in zip(chunks, chunks[1:]):
+        assert end == start
+        assert start % 30 == 0
+
+
+def test_short_videos_are_not_split():
+    index = keyframe_index(MIN_CHUNK_FRAMES, 30)
+    exporter = ChunkedExporter('unused.mp4', Compose({}), 'out.mp4', 30, num_processes=4, index=index)
+
+    assert exporter.chunks() == [(0, MIN_CHUNK_FRAMES)]
+    assert not exporter.chunked
+
+
+def test_single_process_exports_on_threads(make_video):
+    path = make_video(num_frames=30)
+    encoder = CaptureEncoder()
+    exporter = ChunkedExporter(path, Compose({'aspect_ratio': AspectRatio('Auto')}), 'out.mp4', 30,
+                               num_processes=1, encoder=encoder)
+
+    assert exporter.run() == 30
+    assert [frame_number(frame) for frame in encoder.frames] == list(range(30))
+    assert exporter.reuse_stats()['rendered'] + exporter.reuse_stats()['reused'] == 30
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='chunks are joined with ffmpeg')
+def test_chunks_are_joined_in_order(make_video, tmp_path):
+    num_frames = 3 * MIN_CHUNK_FRAMES
+    path = make_video(num_frames=num_frames)
+    output_path = str(tmp_path / 'out.mp4')
+    transform = Compose({'aspect_ratio': AspectRatio('Auto')}, num_frames=num_frames)
+    profiler = transform.enable_profiling(trace_memory=False)
+
+    exporter = ChunkedExporter(path, transform, output_path, 30, num_processes=2, encoder=OpenCVEncoder())
+    assert exporter.chunked
+
+    progress = []
+    assert exporter.run(lambda frames_done, total: progress.append((frames_done, total))) == num_frames
+    assert progress[-1] == (num_frames, num_frames)
+    assert profiler.stats()['frame']['count'] == num_frames
+    # The segment directory is removed
+    assert sorted(os.listdir(tmp_path)) == sorted([
+        os.path.basename(path), os.path.basename(FrameIndex.sidecar_path(path)), 'out.mp4'
+    ])
+
+    capture = cv2.VideoCapture(output_path)
+    numbers = []
+    while True:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        numbers.append(frame_number(frame))
+    capture.release()
+
+    assert numbers == list(range(num_frames))
+    transform.disable_profiling()
@@ -0,0 +1,139 @@
+import threading
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import conftest
+from model.transforms import Compose, AspectRatio, Cursor, Padding, Zoom, Background
+
+
+NUM_FRAMES = 60
+
+
+def build_transform(reuse=True, moves=None):
+    # The cursor stays still for 5 frames at a time
+    moves = moves if moves is not None else [[0.2 + 0.1 * (i // 5), 0.4, i] for i in range(NUM_FRAMES)]
+    return conftest.build_transform(num_frames=NUM_FRAMES, click=(0.3, 0.3, 20, 0.5), moves=moves, reuse=reuse)
+
+
+@pytest.fixture
+def frame():
+    return np.random.default_rng(0).integers(0, 256, (90, 160, 3), dtype=np.uint8)
+
+
+def test_reused_frames_match_rendered_ones(cursor_images, frame):
+    reused, rendered = build_transform(), build_transform(reuse=False)
+
+    for frame_index in range(NUM_FRAMES):
+        expected = rendered.render(frame.copy(), frame_index).input
+        output = reused.render(frame.copy(), frame_index).input
+        assert np.array_equal(output, expected), frame_index
+
+    assert reused.reused_frames > 0
+    assert reused.reuse_stats()['rendered'] + reused.reuse_stats()['reused'] == NUM_FRAMES
+    assert rendered.reused_frames == 0
+
+
+def test_changed_pixels_or_settings_are_rendered(cursor_images, frame):
+    transform = build_transform()
+    transform.render(frame.copy(), 0)
+
+    changed = frame.copy()
+    changed[-1, -1] ^= 1
+    transform.render(changed, 1)
+    assert transform.reused_frames == 0
+
+    transform['padding'] = Padding(padding=20)
+    transform.render(changed.copy(), 2)
+    assert transform.reused_frames == 0
+
+    transform.render(changed.copy(), 3)
+    assert transform.reused_frames == 1
+
+
+def test_source_is_kept_unchanged_without_copying_it(cursor_images):
+    frame = np.random.default_rng(0).integers(0, 256, (1080, 1920, 3), dtype=np.uint8)
+    transform = build_transform()
+    transform.render(frame.copy(), 0)
+
+    source = frame.copy()
+    source[0, 0] ^= 1
+    expected_source = source.copy()
+    expected = build_transform(reuse=False).render(source.copy(), 5).input
+
+    tracemalloc.start()
+    output = transform.render(source, 5).input
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # Drawn over the source, which is then put back as it was
+    assert np.array_equal(output, expected)
+    assert np.array_equal(source, expected_source)
+    assert not source.flags.writeable
+    assert peak < source.nbytes // 4
+
+
+def test_read_only_sources_are_drawn_on_a_copy(cursor_images, frame):
+    source = frame.copy()
+    source.setflags(write=False)
+
+    output = build_transform(reuse=False).render(source, 0).input
+    expected = build_transform(reuse=False).render(frame.copy(), 0).input
+
+    assert np.array_equal(source, frame)
+    assert np.array_equal(output, expected)
+
+
+def test_no_reuse_of_an_output_recycled_by_another_thread(cursor_images, frame):
+    # The cursor never moves, so the frames only differ by their zoom
+    transform = build_transform(moves=[[0.5, 0.5, i] for i in range(NUM_FRAMES)])
+    expected = build_transform(moves=[[0.5, 0.5, i] for i in range(NUM_FRAMES)]).render(frame.copy(), 5).input.copy()
+
+    outputs = []
+    first_done, other_done = threading.Event(), threading.Event()
+
+    def render_twice():
+        outputs.append(transform.render(frame.copy(), 5).input)
+        first_done.set()
+        other_done.wait(5)
+        outputs.append(transform.render(frame.copy(), 5).input)
+
+    def render_others():
+        # More frames than the pool holds, zoomed differently from frame 5
+        for frame_index in range(20, 34):
+            transform.render(frame.copy(), frame_index)
+
+    thread = threading.Thread(target=render_twice)
+    thread.start()
+    assert first_done.wait(5)
+    other = threading.Thread(target=render_others)
+    other.start()
+    other.join()
+    other_done.set()
+    thread.join()
+
+    assert np.array_equal(outputs[1], expected)
+    assert transform.reused_frames == 0
+
+
+@pytest.mark.parametrize('size', [(120, 90), (160, 90)])
+def test_cursor_after_the_zoom_leaves_the_source_unchanged(cursor_images, size):
+    def build(reuse):
+        return Compose({
+            'aspect_ratio': AspectRatio('16:9'),
+            'padding': Padding(padding=10),
+            'zoom': Zoom(click_data=[[0.3, 0.3, 20, 1.0]], fps=30, zoom_factor=2.0),
+            'cursor': Cursor(move_data=[[0.5, 0.5, i] for i in range(NUM_FRAMES)]),
+            'background': Background(background={'type': 'color', 'value': '#5271FF'}),
+        }, num_frames=NUM_FRAMES, reuse=reuse)
+
+    width, height = size
+    frame = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    source = frame.copy()
+
+    # Zoomed in, so the cursor is drawn on the zoomed frame
+    output = build(reuse=True).render(source, 40).input
+
+    assert np.array_equal(source, frame)
+    assert np.array_equal(output, build(reuse=False).render(frame.copy(), 40).input)
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+import conftest
+from model.transforms import Compositor
+
+
+def build_transform(fuse, radius=20):
+    return conftest.build_transform(num_frames=80, padding=20, click=(0.3, 0.6, 5, 1.0), radius=radius, shadow=True,
+                                    fuse=fuse, reuse=False)
+
+
+def test_chain_is_fused_into_a_compositor():
+    transform = build_transform(fuse=True)
+    transform.render(np.zeros((90, 160, 3), dtype=np.uint8), 0)
+
+    assert [name for name, _ in transform.stages] == ['aspect_ratio', 'padding', 'compositor']
+    assert isinstance(transform.stages[-1][1], Compositor)
+
+
+@pytest.mark.parametrize('radius', [0, 5, 20])
+def test_compositor_matches_the_chain(radius):
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (120, 200, 3), dtype=np.uint8)
+    fused, chain = build_transform(fuse=True, radius=radius), build_transform(fuse=False, radius=radius)
+
+    # Zooming in, zoomed and back out
+    for frame_index in range(0, 80, 3):
+        expected = chain.render(frame.copy(), frame_index).input
+        output = fused.render(frame.copy(), frame_index).input
+        assert np.array_equal(output, expected), frame_index
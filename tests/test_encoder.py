@@ -0,0 +1,105 @@
+import os
+import shutil
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import numbered_frame, frame_number
+from model.encoder import FFmpegEncoder, OpenCVEncoder, default_encoder
+
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='ffmpeg is not installed')
+
+
+def read_frames(path):
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+def test_command_passes_the_options():
+    command = FFmpegEncoder(codec='libx265', preset=None, crf=20, threads=2).command('out.mp4', 30, 640, 360)
+
+    assert command[command.index('-s') + 1] == '640x360'
+    assert command[command.index('-c:v') + 1] == 'libx265'
+    assert command[command.index('-crf') + 1] == '20'
+    assert '-preset' not in command
+    assert command[-3:] == ['-threads', '2', 'out.mp4']
+
+
+def test_odd_sizes_are_padded_for_chroma_subsampling():
+    encoder = FFmpegEncoder()
+
+    assert '-vf' not in encoder.command('out.mp4', 30, 640, 360)
+    assert '-vf' in encoder.command('out.mp4', 30, 641, 360)
+    assert '-vf' not in FFmpegEncoder(pixel_format='yuv444p').command('out.mp4', 30, 641, 360)
+
+
+def test_default_encoder_falls_back_to_opencv():
+    assert isinstance(default_encoder(ffmpeg='no-such-ffmpeg'), OpenCVEncoder)
+
+
+def test_opencv_encoder_round_trip(tmp_path):
+    path = str(tmp_path / 'out.mp4')
+    writer = OpenCVEncoder().open(path, 30, 96, 64)
+    for i in range(10):
+        writer.write(numbered_frame(i))
+    writer.release()
+
+    assert [frame_number(frame) for frame in read_frames(path)] == list(range(10))
+
+
+@requires_ffmpeg
+def test_ffmpeg_encoder_round_trip(tmp_path):
+    path = str(tmp_path / 'out.mp4')
+    writer = FFmpegEncoder(nice=5).open(path, 30, 96, 64)
+    for i in range(10):
+        # Views are written too
+        writer.write(np.pad(numbered_frame(i), ((1, 1), (1, 1), (0, 0)))[1:-1, 1:-1])
+    writer.release()
+
+    assert [frame_number(frame) for frame in read_frames(path)] == list(range(10))
+
+
+@requires_ffmpeg
+@pytest.mark.skipif(shutil.which('nice') is None, reason='nice is not installed')
+def test_ffmpeg_runs_at_a_lower_priority(tmp_path):
+    expected = min(os.getpriority(os.PRIO_PROCESS, 0) + 5, 19)
+    writer = FFmpegEncoder(nice=5).open(str(tmp_path / 'out.mp4'), 30, 96, 64)
+    try:
+        # nice(1) lowers the priority of the process before running ffmpeg in it
+        deadline = time.monotonic() + 5
+        priority = os.getpriority(os.PRIO_PROCESS, writer._process.pid)
+        while priority != expected and time.monotonic() < deadline:
+            time.sleep(0.001)
+            priority = os.getpriority(os.PRIO_PROCESS, writer._process.pid)
+    finally:
+        writer.write(numbered_frame(0))
+        writer.release()
+
+    assert priority == expected
+
+
+@requires_ffmpeg
+def test_ffmpeg_writer_rejects_frames_of_another_size(tmp_path):
+    writer = FFmpegEncoder().open(str(tmp_path / 'out.mp4'), 30, 96, 64)
+    with pytest.raises(ValueError):
+        writer.write(np.zeros((64, 64, 3), dtype=np.uint8))
+    writer.release()
+
+
+@requires_ffmpeg
+def test_ffmpeg_errors_are_raised(tmp_path):
+    writer = FFmpegEncoder(codec='no-such-codec').open(str(tmp_path / 'out.mp4'), 30, 96, 64)
+    with pytest.raises(RuntimeError, match='ffmpeg'):
+        for _ in range(100):
+            writer.write(numbered_frame(0))
+        writer.release()
@@ -0,0 +1,105 @@
+import os
+import time
+import threading
+
+import pytest
+
+from model.export_job import ExportJob
+from model.transforms import Compose, AspectRatio
+
+
+class FileEncoder:
+    """Writes the frame numbers to a file, optionally slowly or failing at a frame."""
+    def __init__(self, delay=0, fail_at=None):
+        self.delay = delay
+        self.fail_at = fail_at
+        self.opened = threading.Event()
+
+    def open(self, output_path, fps, width, height):
+        return FileWriter(self, output_path)
+
+
+class FileWriter:
+    def __init__(self, encoder, output_path):
+        self._encoder = encoder
+        self._file = open(output_path, 'w')
+        self._num_frames = 0
+        encoder.opened.set()
+
+    def write(self, frame):
+        if self._num_frames == self._encoder.fail_at:
+            raise RuntimeError('encoder failed')
+        time.sleep(self._encoder.delay)
+        self._file.write(f'{self._num_frames}\n')
+        self._num_frames += 1
+
+    def release(self):
+        self._file.close()
+
+
+def transform():
+    return Compose({'aspect_ratio': AspectRatio('Auto')})
+
+
+def hidden_files(directory):
+    return [name for name in os.listdir(directory) if name.startswith('.')]
+
+
+def test_done_job_moves_the_video_in_place(make_video, tmp_path):
+    path = make_video(num_frames=30)
+    output_path = str(tmp_path / 'out.txt')
+    reports, finished = [], []
+
+    job = ExportJob(path, transform(), output_path, 30, encoder=FileEncoder(), num_workers=2,
+                    on_progress=reports.append, on_finished=finished.append)
+    assert job.state == 'pending'
+    job.start()
+
+    assert job.wait(10)
+    assert job.state == 'done' and job.error is None
+    assert finished == [job]
+    with open(output_path) as f:
+        assert len(f.read().split()) == 30
+    assert hidden_files(tmp_path) == []
+
+    stats = job.stats()
+    assert stats['frames_done'] == stats['num_frames'] == 30
+    assert stats['eta'] == 0
+    assert reports[-1]['frames_done'] == 30
+
+    with pytest.raises(RuntimeError):
+        job.start()
+
+
+def test_cancelled_job_leaves_no_file(make_video, tmp_path):
+    path = make_video(num_frames=40)
+    output_path = str(tmp_path / 'out.txt')
+    with open(output_path, 'w') as f:
+        f.write('previous export')
+
+    encoder = FileEncoder(delay=0.05)
+    finished = threading.Event()
+    job = ExportJob(path, transform(), output_path, 30, encoder=encoder, num_workers=1,
+                    on_finished=lambda job: finished.set()).start()
+    assert encoder.opened.wait(10)
+    job.cancel()
+
+    assert job.wait(10) and finished.is_set()
+    assert job.state == 'cancelled'
+    assert job.stats()['frames_done'] < 40
+    with open(output_path) as f:
+        assert f.read() == 'previous export'
+    assert hidden_files(tmp_path) == []
+
+
+def test_failed_job_reports_the_error(make_video, tmp_path):
+    path = make_video(num_frames=20)
+    output_path = str(tmp_path / 'out.txt')
+
+    job = ExportJob(path, transform(), output_path, 30, encoder=FileEncoder(fail_at=5), num_workers=1).start()
+
+    assert job.wait(10)
+    assert job.state == 'failed'
+    assert isinstance(job.error, RuntimeError)
+    assert not os.path.exists(output_path)
+    assert hidden_files(tmp_path) == []
@@ -0,0 +1,97 @@
+import time
+
+import numpy as np
+import pytest
+
+from conftest import CaptureEncoder, build_transform, frame_number
+from model.exporter import Exporter
+from model.frame_index import FrameIndex
+from model.video_reader import VideoReader
+from model.transforms import BaseTransform, Compose
+
+
+class Jitter(BaseTransform):
+    """Leaves the frame as it is, after a delay that makes threads finish out of order."""
+    def apply(self, context):
+        time.sleep(0.004 * (context.frame_index % 3 == 0))
+        return context
+
+
+class Fail(BaseTransform):
+    def __init__(self, frame_index):
+        super().__init__()
+        self.frame_index = frame_index
+
+    def apply(self, context):
+        if context.frame_index == self.frame_index:
+            raise ValueError('render failed')
+        return context
+
+
+def test_frames_are_written_in_order(make_video):
+    path = make_video(num_frames=40)
+    encoder = CaptureEncoder()
+    exporter = Exporter(path, Compose({'jitter': Jitter()}), None, 30, num_workers=3, encoder=encoder)
+
+    assert exporter.run() == 40
+    assert [frame_number(frame) for frame in encoder.frames] == list(range(40))
+    assert encoder.released
+
+
+def test_output_matches_rendering_on_one_thread(make_video):
+    path = make_video(num_frames=40)
+    index = FrameIndex.load(path)
+
+    expected = []
+    transform = build_transform()
+    reader = VideoReader(path, index=index)
+    for frame_index in range(40):
+        expected.append(transform.render(reader.read(frame_index), frame_index).input.copy())
+    reader.release()
+
+    encoder = CaptureEncoder()
+    exporter = Exporter(path, build_transform(), None, 30, num_workers=3, window=4, index=index, encoder=encoder)
+
+    assert exporter.run() == 40
+    assert len(encoder.frames) == 40
+    for frame_index, (frame, expected_frame) in enumerate(zip(encoder.frames, expected)):
+        assert np.array_equal(frame, expected_frame), frame_index
+
+
+def test_render_errors_stop_the_export(make_video):
+    path = make_video(num_frames=40)
+    encoder = CaptureEncoder()
+    exporter = Exporter(path, Compose({'fail': Fail(10)}), None, 30, num_workers=2, encoder=encoder)
+
+    with pytest.raises(ValueError, match='render failed'):
+        exporter.run()
+    assert len(encoder.frames) <= 10
+
+
+def test_cancel_returns_none(make_video):
+    path = make_video(num_frames=40)
+
+    class CancellingEncoder(CaptureEncoder):
+        def write(self, frame):
+            super().write(frame)
+            if len(self.frames) == 5:
+                exporter.cancel()
+
+    encoder = CancellingEncoder()
+    exporter = Exporter(path, Compose({'jitter': Jitter()}), None, 30, num_workers=2, encoder=encoder)
+
+    assert exporter.run() is None
+    assert len(encoder.frames) < 40
+    assert encoder.released
+
+
+def test_profiles_of_the_render_threads_are_merged(make_video):
+    path = make_video(num_frames=20)
+    transform = build_transform()
+    profiler = transform.enable_profiling(trace_memory=False)
+
+    exporter = Exporter(path, transform, None, 30, num_workers=2, encoder=CaptureEncoder())
+    assert exporter.run() == 20
+
+    assert profiler.stats()['frame']['count'] == 20
+    transform.disable_profiling()
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from model.frame_context import (
+    ALL_CORNERS, TOP_LEFT, BOTTOM_RIGHT, FrameContext, corners_to_flags, flags_to_corners,
+)
+from model.transforms import AspectRatio, Padding
+
+
+def test_fields_are_slots():
+    context = FrameContext()
+    with pytest.raises(AttributeError):
+        context.unknown = 1
+    assert not hasattr(context, '__dict__')
+
+
+def test_reads_like_a_dict_of_its_set_fields():
+    frame = np.zeros((4, 6, 3), dtype=np.uint8)
+    context = FrameContext.from_kwargs({'input': frame, 'frame_index': 3, 'mask_rounded_corners': {
+        'top_left': True, 'top_right': False, 'bottom_right': True, 'bottom_left': False,
+    }})
+
+    assert context['input'] is frame and context.frame_index == 3
+    assert context.rounded_corners == TOP_LEFT | BOTTOM_RIGHT
+    assert set(context.keys()) == {'input', 'frame_index', 'scale', 'mask_rounded_corners'}
+    assert dict(**context)['mask_rounded_corners'] == context.to_dict()['mask_rounded_corners']
+    assert 'mask' not in context and context.get('mask', 'none') == 'none'
+    with pytest.raises(KeyError):
+        context['mask']
+    with pytest.raises(KeyError):
+        context['unknown'] = 1
+
+
+def test_corner_flags_round_trip():
+    for flags in range(ALL_CORNERS + 1):
+        assert corners_to_flags(flags_to_corners(flags)) == flags
+    assert all(flags_to_corners(ALL_CORNERS).values())
+
+
+def test_reset_clears_the_previous_frame():
+    context = FrameContext(np.zeros((4, 6, 3), dtype=np.uint8), frame_index=1, scale=0.5)
+    context.mask = np.zeros((4, 6), dtype=np.uint8)
+    context.rounded_corners = ALL_CORNERS
+
+    context.reset(None, frame_index=2)
+    assert context.keys() == ['frame_index', 'scale']
+    assert context.scale == 1
+
+
+def test_transforms_can_still_be_called_with_kwargs():
+    frame = np.zeros((90, 120, 3), dtype=np.uint8)
+
+    result = Padding(padding=10)(**AspectRatio('16:9')(input=frame))
+
+    assert result['input'] is frame
+    assert (result['video_width'], result['video_height']) == (160, 90)
+    assert result['frame_width'] < 160 and result['frame_height'] < 90
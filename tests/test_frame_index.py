@@ -0,0 +1,83 @@
+import os
+import random
+
+import numpy as np
+import pytest
+
+from conftest import frame_number
+from model.frame_index import FrameIndex
+from model.video_reader import VideoReader
+
+
+def test_keyframe_before():
+    index = FrameIndex([0, 12, 24], np.arange(30) / 30)
+
+    assert [index.keyframe_before(i) for i in (0, 11, 12, 13, 29)] == [0, 0, 12, 12, 24]
+    assert index.num_frames == 30
+
+
+def test_load_saves_a_sidecar_and_reads_it_back(make_video, monkeypatch):
+    path = make_video(num_frames=20)
+
+    index = FrameIndex.load(path)
+    assert index.num_frames == 20
+    assert os.path.exists(FrameIndex.sidecar_path(path))
+
+    def build(video_path):
+        raise AssertionError('the sidecar should have been used')
+
+    monkeypatch.setattr(FrameIndex, 'build', build)
+    reloaded = FrameIndex.load(path)
+    assert np.array_equal(reloaded.timestamps, index.timestamps)
+    assert np.array_equal(reloaded.keyframes, index.keyframes)
+
+
+def test_load_rebuilds_the_sidecar_of_a_changed_video(make_video):
+    path = make_video(num_frames=20)
+    FrameIndex.load(path)
+
+    make_video(num_frames=25)
+    assert FrameIndex.load(path).num_frames == 25
+
+
+def test_missing_video_has_an_empty_index(tmp_path):
+    path = str(tmp_path / 'missing.mp4')
+
+    index = FrameIndex.load(path)
+    assert index.num_frames == 0
+    assert not os.path.exists(FrameIndex.sidecar_path(path))
+
+    reader = VideoReader(path)
+    assert reader.num_frames == 0
+    assert reader.read() is None
+    assert reader.read(3) is None
+    reader.release()
+
+
+@pytest.mark.parametrize('keyframes', [None, [0, 12, 24, 36]])
+def test_reads_any_frame_in_any_order(make_video, keyframes):
+    path = make_video(num_frames=40)
+    index = FrameIndex(keyframes, FrameIndex.load(path).timestamps) if keyframes is not None else None
+    reader = VideoReader(path, index=index)
+
+    order = list(range(40)) * 2
+    random.Random(0).shuffle(order)
+    # Sequential reads, steps within a keyframe interval and backward seeks
+    order += [5, 6, 7, 10, 9, 39, 0]
+    for frame_index in order:
+        frame = reader.read(frame_index)
+        assert frame is not None and frame_number(frame) == frame_index
+
+    reader.release()
+
+
+def test_read_continues_after_a_seek_and_stops_past_the_end(make_video):
+    reader = VideoReader(make_video(num_frames=40))
+
+    assert frame_number(reader.read(37)) == 37
+    assert [frame_number(reader.read()) for _ in range(2)] == [38, 39]
+    assert reader.read() is None
+    assert reader.read(40) is None
+    assert frame_number(reader.read(2)) == 2
+
+    reader.release()
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from utils.frame_pool import FramePool, rect_difference
+
+
+@pytest.fixture
+def background():
+    background = np.random.default_rng(0).integers(0, 256, (90, 160, 3), dtype=np.uint8)
+    background.setflags(write=False)
+    return background
+
+
+def draw(frame, rect, value):
+    x1, y1, x2, y2 = rect
+    frame[y1:y2, x1:x2] = value
+
+
+def outside(frame, rect):
+    """Returns a copy of frame with the inside of rect zeroed, which borrow leaves undefined."""
+    frame = frame.copy()
+    draw(frame, rect, 0)
+    return frame
+
+
+def test_frames_are_not_handed_out_again_while_held(background):
+    pool = FramePool(size=3)
+    rect = (10, 10, 50, 50)
+
+    held = pool.borrow(background, rect)
+    draw(held, rect, 7)
+    others = [pool.borrow(background, rect) for _ in range(2)]
+    for frame in others:
+        draw(frame, rect, 9)
+
+    assert all(frame is not held for frame in others) and others[0] is not others[1]
+    assert (held[10:50, 10:50] == 7).all()
+    assert pool.holds(held) and pool.borrows == 3
+
+    # The ring comes back to the first frame
+    assert pool.borrow(background, rect) is held
+    assert not pool.holds(background.copy())
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_only_the_previous_content_is_repainted(background, seed):
+    rng = np.random.default_rng(seed)
+    pool = FramePool(size=2)
+
+    for _ in range(30):
+        x1, x2 = sorted(rng.integers(0, 161, 2))
+        y1, y2 = sorted(rng.integers(0, 91, 2))
+        rect = (x1, y1, x2, y2)
+
+        frame = pool.borrow(background, rect)
+        assert np.array_equal(outside(frame, rect), outside(background, rect))
+        draw(frame, rect, rng.integers(0, 256))
+
+
+def test_invalidate_repaints_the_whole_frame(background):
+    pool = FramePool(size=1)
+    frame = pool.borrow(background, (0, 0, 10, 10))
+    # Drawn outside of the borrowed rectangle
+    frame[50:60, 50:60] = 0
+
+    pool.invalidate()
+    assert np.array_equal(outside(pool.borrow(background, (0, 0, 10, 10)), (0, 0, 10, 10)),
+                          outside(background, (0, 0, 10, 10)))
+
+
+def test_a_new_background_gets_new_frames(background):
+    pool = FramePool(size=2)
+    frame = pool.borrow(background, (0, 0, 160, 90))
+
+    other = np.zeros((45, 80, 3), dtype=np.uint8)
+    assert pool.borrow(other, (0, 0, 10, 10)).shape == other.shape
+    assert not pool.holds(frame)
+    assert pool.nbytes == 2 * other.nbytes
+
+
+@pytest.mark.parametrize('b', [
+    (20, 20, 40, 40), (0, 0, 100, 100), (50, 0, 60, 100), (-10, 30, 200, 35), (70, 70, 90, 90),
+])
+def test_rect_difference_covers_the_rest_once(b):
+    a = (10, 10, 60, 60)
+    covered = np.zeros((100, 100), dtype=int)
+    for rect in rect_difference(a, b):
+        draw(covered, rect, covered[rect[1]:rect[3], rect[0]:rect[2]] + 1)
+
+    expected = np.zeros((100, 100), dtype=int)
+    draw(expected, a, 1)
+    bx1, by1, bx2, by2 = b
+    expected[max(by1, 0):by2, max(bx1, 0):bx2] = 0
+    assert np.array_equal(covered, expected)
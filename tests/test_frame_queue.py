@@ -0,0 +1,121 @@
+import os
+import time
+import threading
+
+import numpy as np
+import pytest
+
+from utils.frame_queue import FrameQueue
+
+
+def frame(value, size=100):
+    return np.full(size, value, dtype=np.uint8)
+
+
+def drain(queue):
+    items = []
+    while len(queue) > 0:
+        item_frame, info = queue.get()
+        items.append((int(item_frame[0]), info))
+    return items
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        FrameQueue(1000, policy='newest')
+
+
+def test_frames_come_out_in_order_with_their_info():
+    queue = FrameQueue(1000)
+    for i in range(3):
+        assert queue.put(frame(i), info=f'frame {i}')
+
+    assert drain(queue) == [(0, 'frame 0'), (1, 'frame 1'), (2, 'frame 2')]
+    assert queue.nbytes == 0
+
+
+def test_drop_oldest_keeps_the_latest_frames():
+    queue = FrameQueue(300, policy='drop_oldest')
+    for i in range(5):
+        queue.put(frame(i), info=i)
+
+    assert drain(queue) == [(2, 2), (3, 3), (4, 4)]
+    stats = queue.stats()
+    assert stats['dropped'] == 2 and stats['frames'] == 5 and stats['max_depth'] == 3
+
+
+def test_frame_over_the_budget_is_queued_when_empty():
+    queue = FrameQueue(50, policy='drop_oldest')
+    assert queue.put(frame(1))
+    assert queue.put(frame(2))
+
+    assert drain(queue) == [(2, None)]
+
+
+def test_block_waits_for_the_consumer():
+    queue = FrameQueue(200, policy='block')
+    queue.put(frame(0))
+    queue.put(frame(1))
+
+    put_done = threading.Event()
+    thread = threading.Thread(target=lambda: queue.put(frame(2)) and put_done.set())
+    thread.start()
+    assert not put_done.wait(0.1)
+
+    assert int(queue.get()[0][0]) == 0
+    assert put_done.wait(5)
+    thread.join()
+
+    assert drain(queue) == [(1, None), (2, None)]
+    assert queue.stats()['dropped'] == 0
+
+
+def test_close_releases_a_blocked_put():
+    queue = FrameQueue(100, policy='block')
+    queue.put(frame(0))
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(queue.put(frame(1))))
+    thread.start()
+    time.sleep(0.05)
+    queue.close()
+    thread.join(5)
+
+    assert results == [False]
+    assert not queue.put(frame(2))
+    # What was queued before closing is still handed out, then None
+    assert int(queue.get()[0][0]) == 0
+    assert queue.get() is None
+
+
+def test_spill_writes_frames_over_the_budget_to_disk(tmp_path):
+    queue = FrameQueue(200, policy='spill', spill_dir=str(tmp_path))
+    for i in range(5):
+        queue.put(frame(i, size=(10, 10)), info=i)
+
+    stats = queue.stats()
+    assert stats['spilled'] == 3 and stats['on_disk'] == 3 and stats['nbytes'] == 200
+    assert len(os.listdir(tmp_path)) == 3
+
+    items = []
+    while len(queue) > 0:
+        item_frame, info = queue.get()
+        assert item_frame.shape == (10, 10)
+        items.append((int(item_frame[0, 0]), info))
+
+    assert items == [(i, i) for i in range(5)]
+    assert os.listdir(tmp_path) == []
+    assert queue.stats()['on_disk'] == 0
+
+
+def test_clear_removes_the_spill_directory_it_created():
+    queue = FrameQueue(100, policy='spill')
+    queue.put(frame(0))
+    queue.put(frame(1))
+    spill_dir = queue._spill_dir
+    assert os.path.isdir(spill_dir)
+
+    queue.clear()
+
+    assert not os.path.exists(spill_dir)
+    assert len(queue) == 0 and queue.nbytes == 0
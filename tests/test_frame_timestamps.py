@@ -0,0 +1,55 @@
+import numpy as np
+
+from model.frame_timestamps import FrameTimestamps
+from model.render_plan import RenderPlan
+from model.transforms import Cursor, Zoom
+
+
+def test_save_and_load(tmp_path):
+    video_path = str(tmp_path / 'recording.mp4')
+    assert FrameTimestamps.load(video_path, 25) is None
+
+    FrameTimestamps([0.0, 0.04, 0.09], 25).save(video_path)
+    timestamps = FrameTimestamps.load(video_path, 25)
+
+    assert FrameTimestamps.path_for(video_path) == str(tmp_path / 'recording.timestamps.npy')
+    assert np.array_equal(timestamps.times, [0.0, 0.04, 0.09])
+    assert timestamps.fps == 25 and len(timestamps) == 3
+
+
+def test_frame_at_is_the_first_frame_captured_at_or_after():
+    timestamps = FrameTimestamps([0.0, 0.1, 0.2, 0.3], 10)
+
+    assert [timestamps.frame_at(t) for t in (-1, 0.0, 0.05, 0.1, 0.25, 5)] == [0, 0, 1, 1, 3, 3]
+
+
+def test_jitter_leaves_repeats_out():
+    # The third frame repeats the second, the fourth is 10 ms late
+    timestamps = FrameTimestamps([0.0, 0.1, 0.1, 0.31], 10)
+
+    jitter = timestamps.jitter()
+    assert jitter['frames'] == 4 and jitter['repeated'] == 1
+    assert np.isclose(jitter['jitter_max'], 0.01)
+    assert np.isclose(jitter['jitter_mean'], 0.01 / 3)
+
+
+def test_clicks_with_times_start_on_the_frame_captured_after_them():
+    timestamps = FrameTimestamps([0.0, 0.1, 0.15, 0.4, 0.5], 10)
+    zoom = Zoom(click_data=[[0.5, 0.5, 1, 1.0, 0.3], [0.5, 0.5, 2, 1.0]], fps=10, timestamps=timestamps)
+
+    # The frame index recorded with the click is kept without a time
+    assert zoom.clicked_indices == [3, 2]
+
+
+def test_cursor_shows_the_last_move_before_the_capture(cursor_images):
+    timestamps = FrameTimestamps([0.0, 0.1, 0.2, 0.2, 0.4], 10)
+    # [x, y, frame_index, time]
+    moves = [[0.1, 0.1, 0, 0.05], [0.2, 0.2, 1, 0.15], [0.3, 0.3, 1, 0.18], [0.4, 0.4, 3, 0.35]]
+    cursor = Cursor(move_data=moves, timestamps=timestamps)
+
+    plan = RenderPlan.build([cursor], 64, 48, 5)
+    positions = [plan.row(i).cursor for i in range(5)]
+
+    # No move before the first frame, then the move before each capture
+    assert positions[0] is None
+    assert positions[1:] == [(0.1, 0.1), (0.3, 0.3), (0.3, 0.3), (0.4, 0.4)]
@@ -0,0 +1,73 @@
+import math
+
+import numpy as np
+import pytest
+
+from utils.general import hex_to_rgb
+from utils.gradient import create_gradient_image
+
+# Colors are sampled from a table with a few columns per pixel, so the error
+# bounds below hold for gradients of less than one level per pixel
+STOPS = [(0.0, '#102030'), (0.4, '#405060'), (1.0, '#607090')]
+
+
+def reference_gradient(width, height, stops, angle=0, kind='linear'):
+    """Evaluates the gradient at every pixel in floating point."""
+    ys, xs = np.mgrid[:height, :width].astype(np.float64)
+    xs -= (width - 1) / 2
+    ys -= (height - 1) / 2
+
+    if kind == 'linear':
+        dx, dy = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+        length = max(abs(dx) * (width - 1) + abs(dy) * (height - 1), 1)
+        t = (xs * dx + ys * dy) / length + 0.5
+    else:
+        t = np.hypot(xs, ys) / max(math.hypot(width - 1, height - 1) / 2, 1)
+
+    positions = [position for position, _ in stops]
+    colors = np.array([hex_to_rgb(color)[::-1] for _, color in stops], dtype=np.float64)
+    return np.stack([np.interp(t, positions, colors[:, c]) for c in range(3)], axis=2)
+
+
+CASES = [
+    (320, 180, 0, 'linear'),
+    (320, 180, 90, 'linear'),
+    (321, 181, 37, 'linear'),
+    (64, 400, 225, 'linear'),
+    (320, 180, 0, 'radial'),
+    (321, 181, 0, 'radial'),
+]
+
+
+@pytest.mark.parametrize('width, height, angle, kind', CASES)
+def test_gradient_follows_the_exact_colors(width, height, angle, kind):
+    expected = reference_gradient(width, height, STOPS, angle, kind)
+    plain = create_gradient_image(width, height, STOPS, angle, kind, dither=False)
+    dithered = create_gradient_image(width, height, STOPS, angle, kind)
+
+    assert plain.shape == dithered.shape == (height, width, 3)
+    assert plain.dtype == dithered.dtype == np.uint8
+    # Rounding, or dithering, plus the table sampling
+    assert np.abs(plain - expected).max() <= 0.75
+    assert np.abs(dithered - expected).max() <= 1.25
+
+
+@pytest.mark.parametrize('kind', ['linear', 'radial'])
+def test_dithering_does_not_band(kind):
+    # 16 levels over about 1000 pixels, which rounding turns into wide bands
+    stops = [(0.0, '#000000'), (1.0, '#101010')]
+    width, height = 1024, 64 if kind == 'linear' else 1024
+    expected = reference_gradient(width, height, stops, kind=kind)[..., 0]
+
+    def block_error(image):
+        # Every 4x4 block holds the 16 dither thresholds once
+        blocks = (image[..., 0] - expected).reshape(height // 4, 4, width // 4, 4)
+        return np.abs(blocks.mean(axis=(1, 3))).max()
+
+    assert block_error(create_gradient_image(width, height, stops, kind=kind, dither=False)) > 0.4
+    assert block_error(create_gradient_image(width, height, stops, kind=kind)) < 0.15
+
+
+def test_unknown_kinds_are_rejected():
+    with pytest.raises(ValueError):
+        create_gradient_image(16, 16, STOPS, kind='conic')
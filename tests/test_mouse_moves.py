@@ -0,0 +1,66 @@
+import numpy as np
+
+from model.frame_timestamps import FrameTimestamps
+from model.mouse_moves import MouseMoves, MOVE_DTYPE
+from model.render_plan import RenderPlan
+from model.transforms import Cursor
+
+
+def test_append_and_arrays():
+    moves = MouseMoves()
+    moves.append(0.5, 10, 20)
+    moves.append(0.75, 30, 40)
+
+    times, positions = moves.arrays()
+    assert len(moves) == 2
+    assert np.array_equal(times, [0.5, 0.75])
+    assert np.array_equal(positions, [[10, 20], [30, 40]])
+
+    # Copies, the listener keeps appending meanwhile
+    moves.append(1.0, 50, 60)
+    assert len(times) == 2
+
+
+def test_normalized_to_the_recorded_area():
+    moves = MouseMoves([0.0, 1.0], [100, 300], [50, 150])
+
+    times, positions = moves.normalized(100, 50, 400, 200).arrays()
+    assert np.array_equal(times, [0.0, 1.0])
+    assert np.allclose(positions, [[0, 0], [0.5, 0.5]])
+
+
+def test_save_and_load(tmp_path):
+    video_path = str(tmp_path / 'recording.mp4')
+    assert MouseMoves.load(video_path) is None
+
+    MouseMoves([0.0, 0.5], [0.25, 0.5], [0.75, 1.0]).save(video_path)
+    assert MouseMoves.path_for(video_path) == str(tmp_path / 'recording.mouse.npy')
+
+    saved = np.load(MouseMoves.path_for(video_path))
+    assert saved.dtype == MOVE_DTYPE and saved.nbytes == 2 * 16
+
+    times, positions = MouseMoves.load(video_path).arrays()
+    assert np.array_equal(times, [0.0, 0.5])
+    assert np.array_equal(positions, [[0.25, 0.75], [0.5, 1.0]])
+
+
+def test_cursor_follows_the_moves_by_capture_time(cursor_images):
+    timestamps = FrameTimestamps([0.0, 0.1, 0.2, 0.3], 10)
+    moves = MouseMoves([0.05, 0.12, 0.15, 0.3], [0.1, 0.2, 0.3, 0.4], [0.5, 0.5, 0.5, 0.5])
+    cursor = Cursor(move_data=moves, timestamps=timestamps)
+
+    plan = RenderPlan.build([cursor], 64, 48, 4)
+    positions = [plan.row(i).cursor for i in range(4)]
+
+    assert positions[0] is None
+    assert np.allclose(positions[1:], [(0.1, 0.5), (0.3, 0.5), (0.4, 0.5)])
+
+
+def test_cursor_sees_moves_appended_after_it_was_created(cursor_images):
+    timestamps = FrameTimestamps([0.0, 0.1], 10)
+    moves = MouseMoves([0.0], [0.25], [0.25])
+    cursor = Cursor(move_data=moves, timestamps=timestamps)
+    assert np.allclose(RenderPlan.build([cursor], 64, 48, 2).row(1).cursor, (0.25, 0.25))
+
+    moves.append(0.05, 0.75, 0.75)
+    assert np.allclose(RenderPlan.build([cursor], 64, 48, 2).row(1).cursor, (0.75, 0.75))
@@ -0,0 +1,82 @@
+import time
+
+from model.playback_clock import PlaybackClock
+from model.read_ahead import ReadAhead
+
+
+def test_frame_at_follows_the_fps_from_the_start_frame():
+    clock = PlaybackClock()
+    clock.start(100, 30)
+    now = time.monotonic()
+
+    assert clock.running
+    assert 100 <= clock.frame_at(now) <= 101
+    assert 130 <= clock.frame_at(now + 1) <= 131
+    assert clock.due_frame() >= 100
+
+
+def test_zero_fps_does_not_run():
+    clock = PlaybackClock()
+    clock.start(0, 0)
+    assert not clock.running
+
+
+def test_stats_count_drops():
+    clock = PlaybackClock()
+    clock.skipped, clock.discarded, clock.late = 3, 2, 1
+
+    assert clock.dropped == 5
+    assert clock.stats() == {'presented': 0, 'dropped': 5, 'skipped': 3, 'discarded': 2, 'late': 1}
+
+    clock.reset_stats()
+    assert clock.dropped == 0
+
+
+def test_read_ahead_keeps_frames_that_are_not_due_yet():
+    clock = PlaybackClock()
+    read_ahead = ReadAhead(lambda frame_index: frame_index, depth=4, clock=clock)
+    # Frame 0 is due for about 10 seconds
+    clock.start(0, 0.1)
+    read_ahead.start(0)
+    try:
+        deadline = time.monotonic() + 5
+        item = None
+        while item is None and time.monotonic() < deadline:
+            item = read_ahead.get()
+            time.sleep(0.001)
+
+        assert item == (0, 0)
+        time.sleep(0.05)
+        # Frame 1 is rendered but not due
+        assert read_ahead.get() is None
+    finally:
+        read_ahead.stop()
+
+
+def test_read_ahead_drops_frames_playback_is_past():
+    clock = PlaybackClock()
+
+    def render(frame_index):
+        time.sleep(0.002)
+        return frame_index
+
+    read_ahead = ReadAhead(render, depth=4, clock=clock)
+    # Far more frames per second than can be rendered
+    clock.start(0, 2000)
+    read_ahead.start(0)
+    try:
+        time.sleep(0.1)
+        items = []
+        deadline = time.monotonic() + 5
+        while len(items) < 3 and time.monotonic() < deadline:
+            item = read_ahead.get()
+            if item is not None:
+                items.append(item)
+            time.sleep(0.005)
+    finally:
+        read_ahead.stop()
+
+    frame_indices = [frame_index for frame_index, _ in items]
+    assert frame_indices == sorted(frame_indices)
+    assert frame_indices[-1] > 100
+    assert clock.dropped > 0
@@ -0,0 +1,90 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import build_transform, numbered_frame
+from model.model import Model
+from model.read_ahead import ReadAhead
+from model.transforms import AspectRatio, Compose
+from model.video_reader import open_video
+from utils.cache import LRUCache
+from utils.image import downscale
+
+
+@pytest.fixture
+def smooth_frame():
+    rng = np.random.default_rng(0)
+    return cv2.resize(rng.integers(0, 256, (27, 48, 3), dtype=np.uint8), (1920, 1080))
+
+
+@pytest.mark.parametrize('size', [(960, 540), (480, 270), (711, 400), (1919, 1079)])
+def test_downscale_looks_like_an_area_resize(smooth_frame, size):
+    output = downscale(smooth_frame, size)
+    expected = cv2.resize(smooth_frame, size, interpolation=cv2.INTER_AREA)
+
+    assert output.shape == expected.shape
+    assert np.abs(output.astype(int) - expected).mean() < 1
+
+
+def test_downscale_keeps_frames_of_the_same_size(smooth_frame):
+    assert downscale(smooth_frame, (1920, 1080)) is smooth_frame
+
+
+def test_scaled_render_matches_a_downscaled_full_render(cursor_images, smooth_frame):
+    moves = [[0.4, 0.6, 0]]
+    full = build_transform(num_frames=60, padding=40, radius=20, shadow=True, moves=moves)
+    scaled = build_transform(num_frames=60, padding=40, radius=20, shadow=True, moves=moves)
+
+    # Without and with zoom, the cursor over the frame
+    for frame_index in (0, 12):
+        expected = downscale(full.render(smooth_frame.copy(), frame_index).input, (640, 360))
+        output = scaled.render(downscale(smooth_frame, (640, 360)), frame_index, scale=1 / 3).input
+
+        assert output.shape == expected.shape
+        assert np.abs(output.astype(int) - expected).mean() < 3, frame_index
+
+
+def studio_with(path):
+    """Returns a Model previewing the video at path, without the rest of its setup."""
+    model = Model.__new__(Model)
+    model._render_lock = threading.RLock()
+    model._read_ahead = ReadAhead(model._render)
+    model._video_reader = open_video(path)
+    model._frame_width, model._frame_height = model._video_reader.frame_width, model._video_reader.frame_height
+    model._transform = Compose({'aspect_ratio': AspectRatio('Auto')})
+    model._frame_cache = LRUCache(max_bytes=1024 ** 2)
+    model._position = 0
+    model._preview_size = None
+    model._preview_scale = 1
+    model._settings_version = 0
+    return model
+
+
+@pytest.mark.parametrize('preview_size, scale', [
+    ((48, 32), 0.5), ((40, 40), 0.5), ((30, 20), 0.375), ((2000, 2000), 1), ((None, None), 1),
+])
+def test_preview_scale_fits_the_preview_area_in_steps(make_video, preview_size, scale):
+    model = studio_with(make_video(num_frames=5))
+    model.set_preview_size(*preview_size)
+    model._video_reader.release()
+
+    assert model.preview_scale == scale
+    assert model._settings_version == (scale != 1)
+
+
+def test_frames_are_decoded_and_cached_at_the_preview_scale(make_video):
+    model = studio_with(make_video(num_frames=5))
+    model.set_preview_size(48, 32)
+
+    preview = model._render(2)
+    assert preview.shape == (32, 48, 3)
+    assert model._read(2) is model._read(2)
+    assert not model._read(2).flags.writeable
+
+    # Exports render at full resolution without filling the cache
+    exported = model._render(3, cache=False, scale=1)
+    assert exported.shape == numbered_frame(0).shape
+    assert 3 not in model._frame_cache
+    model._video_reader.release()
@@ -0,0 +1,79 @@
+import json
+import time
+
+import numpy as np
+import pytest
+
+from model.transforms import BaseTransform, Compose
+from utils.profiler import StageProfiler
+
+
+class Upscale(BaseTransform):
+    """Doubles the frame size into a new frame."""
+    def apply(self, context):
+        context.input = np.repeat(np.repeat(context.input, 2, axis=0), 2, axis=1)
+        return context
+
+
+class Sleep(BaseTransform):
+    def apply(self, context):
+        time.sleep(0.002)
+        return context
+
+
+@pytest.fixture
+def frame():
+    return np.zeros((90, 160, 3), dtype=np.uint8)
+
+
+def test_stages_are_profiled_in_order(frame):
+    transform = Compose({'upscale': Upscale(), 'sleep': Sleep()}, reuse=False)
+    profiler = transform.enable_profiling()
+    try:
+        for frame_index in range(5):
+            transform.render(frame, frame_index)
+        stats = profiler.stats()
+    finally:
+        transform.disable_profiling()
+
+    assert list(stats) == ['upscale', 'sleep', 'frame']
+    assert all(stage['count'] == 5 for stage in stats.values())
+    assert stats['upscale']['shape'] == stats['frame']['shape'] == (180, 320, 3)
+
+    # The upscaled frame is allocated by its stage, nothing by the sleep
+    assert stats['upscale']['bytes']['p50'] >= 180 * 320 * 3
+    assert stats['sleep']['bytes']['p99'] < 180 * 320 * 3
+    assert stats['sleep']['time_ms']['p50'] >= 2
+    assert stats['frame']['time_ms']['p50'] >= stats['sleep']['time_ms']['p50']
+    for stage in stats.values():
+        assert stage['time_ms']['p50'] <= stage['time_ms']['p95'] <= stage['time_ms']['p99']
+
+
+def test_only_the_last_calls_are_kept(frame):
+    profiler = StageProfiler(window=3, trace_memory=False)
+    for frame_index in range(10):
+        profiler.end('stage', profiler.begin(), frame.shape, frame_index)
+
+    assert profiler.stats()['stage']['count'] == 3
+    assert profiler.stats()['stage']['bytes']['p99'] == 0
+
+
+def test_forks_are_merged_into_one_trace(frame, tmp_path):
+    profiler = StageProfiler(trace_memory=False)
+    profiler.end('stage', profiler.begin(), frame.shape, 0)
+    fork = profiler.fork()
+    fork.end('stage', fork.begin(), frame.shape, 1)
+    fork.end('other', fork.begin(), frame.shape, 1)
+
+    profiler.merge(fork.snapshot())
+    profiler.dump_json(str(tmp_path / 'stats.json'))
+    profiler.dump_chrome_trace(str(tmp_path / 'trace.json'))
+
+    stats = json.loads((tmp_path / 'stats.json').read_text())
+    assert {name: stage['count'] for name, stage in stats.items()} == {'stage': 2, 'other': 1}
+
+    events = json.loads((tmp_path / 'trace.json').read_text())['traceEvents']
+    events_frames = [(event['name'], event['args']['frame_index']) for event in events]
+    assert events_frames == [('stage', 0), ('stage', 1), ('other', 1)]
+    # On the clock of the merged profiler
+    assert events[0]['ts'] <= events[1]['ts'] <= events[2]['ts']
@@ -0,0 +1,146 @@
+import gc
+import os
+import threading
+import warnings
+
+import pytest
+
+from conftest import numbered_frame, frame_number
+from model.export_job import ExportJob
+from model.encoder import OpenCVEncoder
+from model.model import Model
+from model.raw_video import RawVideoEncoder, RawVideoReader, is_raw_video
+from model.video_reader import VideoReader, open_video, load_index
+from utils.cache import LRUCache
+
+
+@pytest.fixture
+def make_raw_video(tmp_path):
+    def make(num_frames=20, fps=25, name='recording.s4kraw'):
+        path = str(tmp_path / name)
+        height, width = numbered_frame(0).shape[:2]
+        writer = RawVideoEncoder().open(path, fps, width, height)
+        for i in range(num_frames):
+            writer.write(numbered_frame(i))
+        writer.release()
+        return path
+
+    return make
+
+
+def test_frames_are_read_back_exactly(make_raw_video):
+    reader = RawVideoReader(make_raw_video(num_frames=20))
+
+    assert (reader.frame_width, reader.frame_height, reader.fps, reader.num_frames) == (96, 64, 25, 20)
+    assert (reader.read(13) == numbered_frame(13)).all()
+    assert [frame_number(reader.read()) for _ in range(6)] == [14, 15, 16, 17, 18, 19]
+    assert reader.read() is None
+    assert frame_number(reader.read(0)) == 0
+    assert reader.read(20) is None
+
+    reader.release()
+
+
+def test_every_frame_is_a_keyframe(make_raw_video):
+    reader = RawVideoReader(make_raw_video(num_frames=10, fps=25))
+
+    assert list(reader.index.keyframes) == list(range(10))
+    assert reader.index.timestamps[5] == pytest.approx(0.2)
+    reader.release()
+
+
+def test_an_incomplete_last_frame_is_left_out(make_raw_video):
+    path = make_raw_video(num_frames=5)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 10)
+
+    reader = RawVideoReader(path)
+    assert reader.num_frames == 4
+    assert frame_number(reader.read(3)) == 3
+    reader.release()
+
+
+def test_writer_rejects_frames_of_another_size(tmp_path):
+    writer = RawVideoEncoder().open(str(tmp_path / 'recording.s4kraw'), 25, 32, 32)
+    with pytest.raises(ValueError):
+        writer.write(numbered_frame(0))
+    writer.release()
+
+
+def test_other_files_are_not_read_as_raw_videos(tmp_path):
+    path = tmp_path / 'video.s4kraw'
+    path.write_bytes(b'\0' * 100)
+
+    with pytest.raises(ValueError):
+        RawVideoReader(str(path))
+
+
+def test_open_video_picks_the_reader(make_raw_video, make_video):
+    raw_path, video_path = make_raw_video(), make_video()
+    assert is_raw_video(raw_path) and not is_raw_video(video_path)
+
+    for path, reader_type in ((raw_path, RawVideoReader), (video_path, VideoReader)):
+        reader = open_video(path)
+        assert isinstance(reader, reader_type)
+        reader.release()
+
+
+def test_load_index_closes_the_video(make_raw_video):
+    path = make_raw_video(num_frames=7)
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        index = load_index(path)
+        gc.collect()
+
+    assert index.num_frames == 7
+    assert not [w for w in caught if issubclass(w.category, ResourceWarning)]
+
+
+def test_transcode_job_keeps_every_frame(make_raw_video, tmp_path):
+    raw_path = make_raw_video(num_frames=30)
+    output_path = str(tmp_path / 'recording.mp4')
+
+    job = ExportJob(raw_path, None, output_path, 25, encoder=OpenCVEncoder()).start()
+    assert job.wait(10)
+    assert job.state == 'done'
+
+    reader = VideoReader(output_path)
+    assert [frame_number(reader.read()) for _ in range(30)] == list(range(30))
+    assert reader.read() is None
+    reader.release()
+
+
+def studio_with(path):
+    """Returns a Model showing the video at path, without the rest of its setup."""
+    model = Model.__new__(Model)
+    model._render_lock = threading.RLock()
+    model._input_video_path = path
+    model._video_reader = open_video(path)
+    model._frame_cache = LRUCache(max_bytes=1024 ** 2)
+    model._settings_version = 0
+    return model
+
+
+def test_transcoded_video_replaces_the_raw_one(make_raw_video, make_video):
+    raw_path, output_path = make_raw_video(), make_video(name='recording.mp4')
+    model = studio_with(raw_path)
+
+    model._open_transcoded(raw_path, output_path)
+
+    assert model._input_video_path == output_path
+    assert isinstance(model._video_reader, VideoReader)
+    assert model._settings_version == 1
+    assert not os.path.exists(raw_path)
+    model._video_reader.release()
+
+
+def test_transcode_of_a_replaced_video_is_not_opened(make_raw_video, make_video):
+    raw_path, output_path = make_raw_video(), make_video(name='recording.mp4')
+    model = studio_with(make_raw_video(name='newer.s4kraw'))
+
+    model._open_transcoded(raw_path, output_path)
+
+    assert is_raw_video(model._input_video_path)
+    assert os.path.exists(raw_path)
+    model._video_reader.release()
@@ -0,0 +1,128 @@
+import time
+import threading
+
+from model.read_ahead import ReadAhead
+
+
+def render_frames(num_frames):
+    """Returns a render function that renders frame i as ('frame', i), None past num_frames."""
+    def render(frame_index):
+        return ('frame', frame_index) if frame_index < num_frames else None
+    return render
+
+
+def take(read_ahead, count, timeout=5):
+    items = []
+    deadline = time.monotonic() + timeout
+    while len(items) < count and time.monotonic() < deadline:
+        item = read_ahead.get()
+        if item is None:
+            time.sleep(0.001)
+        else:
+            items.append(item)
+    return items
+
+
+def test_renders_consecutive_frames_from_the_start():
+    read_ahead = ReadAhead(render_frames(100), depth=3)
+    read_ahead.start(10)
+    try:
+        items = take(read_ahead, 5)
+    finally:
+        read_ahead.stop()
+
+    assert items == [(i, ('frame', i)) for i in range(10, 15)]
+
+
+def test_queue_is_bounded_by_depth():
+    rendered = []
+
+    def render(frame_index):
+        rendered.append(frame_index)
+        return frame_index
+
+    read_ahead = ReadAhead(render, depth=2)
+    read_ahead.start(0)
+    time.sleep(0.2)
+    read_ahead.stop()
+
+    # The queued frames and the one waiting for room
+    assert len(rendered) == 3
+
+
+def test_seek_drops_the_frames_of_the_previous_position():
+    read_ahead = ReadAhead(render_frames(100), depth=4)
+    read_ahead.start(0)
+    try:
+        assert take(read_ahead, 1) == [(0, ('frame', 0))]
+        read_ahead.seek(50)
+        items = take(read_ahead, 3)
+    finally:
+        read_ahead.stop()
+
+    assert [frame_index for frame_index, _ in items] == [50, 51, 52]
+
+
+def test_render_in_flight_during_a_seek_is_thrown_away():
+    started, release = threading.Event(), threading.Event()
+
+    def render(frame_index):
+        if frame_index == 0:
+            started.set()
+            release.wait()
+        return frame_index
+
+    read_ahead = ReadAhead(render, depth=4)
+    read_ahead.start(0)
+    try:
+        assert started.wait(5)
+        read_ahead.seek(20)
+        release.set()
+        items = take(read_ahead, 2)
+    finally:
+        read_ahead.stop()
+
+    assert items == [(20, 20), (21, 21)]
+
+
+def test_exhausted_once_every_frame_is_taken():
+    read_ahead = ReadAhead(render_frames(3), depth=4)
+    read_ahead.start(0)
+    try:
+        items = take(read_ahead, 3)
+        deadline = time.monotonic() + 5
+        while not read_ahead.exhausted and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert read_ahead.exhausted
+        assert read_ahead.get() is None
+    finally:
+        read_ahead.stop()
+
+    assert [frame_index for frame_index, _ in items] == [0, 1, 2]
+    assert not read_ahead.running
+
+
+def test_render_error_exhausts_the_reader_until_a_seek():
+    def render(frame_index):
+        if frame_index == 2:
+            raise ValueError('render failed')
+        return frame_index
+
+    read_ahead = ReadAhead(render, depth=4)
+    read_ahead.start(0)
+    try:
+        items = take(read_ahead, 2)
+        deadline = time.monotonic() + 5
+        while not read_ahead.exhausted and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert read_ahead.exhausted
+        assert isinstance(read_ahead.error, ValueError)
+
+        # Rendering goes on from another position
+        read_ahead.seek(5)
+        assert read_ahead.error is None
+        assert take(read_ahead, 2) == [(5, 5), (6, 6)]
+    finally:
+        read_ahead.stop()
+
+    assert items == [(0, 0), (1, 1)]
@@ -0,0 +1,125 @@
+import time
+import threading
+
+import numpy as np
+import pytest
+
+import model.recorder
+from conftest import CaptureEncoder, numbered_frame
+from model.frame_timestamps import FrameTimestamps
+from model.model import Model
+from model.playback_clock import PlaybackClock
+from model.read_ahead import ReadAhead
+from model.recorder import ScreenRecorder
+from model.transforms import Background, Cursor
+from utils.cache import LRUCache
+
+
+class FakeScreen:
+    """Stands in for ScreenGear, returning frames of the size of the captured area."""
+    def __init__(self, **options):
+        self.options = options
+        self.width = options.get('width', 320)
+        self.height = options.get('height', 240)
+        self.stopped = False
+
+    def start(self):
+        return self
+
+    def read(self):
+        return None if self.stopped else np.zeros((self.height, self.width, 3), dtype=np.uint8)
+
+    def stop(self):
+        self.stopped = True
+
+
+@pytest.fixture
+def screen(monkeypatch):
+    monkeypatch.setattr(model.recorder, 'ScreenGear', FakeScreen)
+
+
+def test_only_the_region_is_captured(screen):
+    recorder = ScreenRecorder(region=(100, 50, 200, 120))
+
+    assert recorder.region == (100, 50, 200, 120)
+    assert recorder._stream.options == {'left': 100, 'top': 50, 'width': 200, 'height': 120}
+    assert ScreenRecorder()._stream.options == {}
+
+
+def test_mouse_positions_are_relative_to_the_region(screen):
+    recorder = ScreenRecorder(region=(100, 50, 200, 100))
+
+    assert recorder._relative(100, 50) == (0, 0)
+    assert recorder._relative(200, 100) == (0.5, 0.5)
+    assert recorder._relative(50, 50)[0] < 0
+
+
+def test_mouse_positions_are_relative_to_the_frame_without_region(screen):
+    recorder = ScreenRecorder()
+    recorder._frame_width, recorder._frame_height = 320, 240
+
+    assert recorder._capture_area() == (0, 0, 320, 240)
+    assert recorder._relative(160, 60) == (0.5, 0.25)
+
+
+def test_recording_writes_frames_of_the_region(screen, tmp_path):
+    encoder = CaptureEncoder()
+    output_path = str(tmp_path / 'recording.mp4')
+    recorder = ScreenRecorder(output_path, start_delay=0, encoder=encoder, region=(10, 10, 64, 48))
+
+    # The capture and encode threads, without the mouse listener
+    recorder._start_ns = time.monotonic_ns()
+    recorder._is_stopped.clear()
+    thread = threading.Thread(target=recorder._recording)
+    thread.start()
+    time.sleep(0.3)
+    recorder._is_stopped.set()
+    thread.join(5)
+
+    assert encoder.size == (64, 48)
+    assert len(encoder.frames) > 0
+    assert all(frame.shape == (48, 64, 3) for frame in encoder.frames)
+    assert len(FrameTimestamps.load(output_path, 25)) == len(encoder.frames)
+    assert recorder._stream.stopped
+
+
+def test_cursor_outside_of_the_frame_is_not_drawn(cursor_images):
+    cursor = Cursor(move_data=[])
+    image = np.zeros((48, 64, 3), dtype=np.uint8)
+
+    for x, y in ((-0.1, 0.5), (0.5, 1.2), (1.0, 0.5)):
+        assert cursor._blend(image, x, y) is image
+    assert not image.any()
+
+
+class StoppedRecorder:
+    mouse_events = {'click': [[0.5, 0.5, 2, 1.0]], 'move': [[0.25, 0.5, 0], [0.75, 0.5, 3]]}
+
+    def stop_recording(self):
+        pass
+
+
+def test_stopped_recording_renders_in_the_studio(cursor_images, make_video, monkeypatch):
+    # The wallpapers are not part of the sources
+    wallpaper = np.full((90, 160, 3), 80, dtype=np.uint8)
+    monkeypatch.setattr(Background, '_read_wallpaper', classmethod(lambda cls, index: wallpaper))
+
+    model = Model.__new__(Model)
+    model._render_lock = threading.RLock()
+    model._playback_clock = PlaybackClock()
+    model._read_ahead = ReadAhead(model._render, clock=model._playback_clock)
+    model._screen_recorder = StoppedRecorder()
+    model._recording_path = make_video(num_frames=10)
+    model._video_reader = None
+    model._transform = None
+    model._frame_cache = LRUCache(max_bytes=1024 ** 2)
+    model._preview_size = None
+    model._preview_scale = 1
+    model._profiler = None
+
+    model.stop_recording()
+    frame = model._render(3)
+    model._video_reader.release()
+
+    assert list(model._transform.transforms) == ['aspect_ratio', 'padding', 'zoom', 'cursor', 'background']
+    assert frame.shape == numbered_frame(0).shape
@@ -0,0 +1,35 @@
+import pytest
+
+from model.render_plan import RenderPlan
+from model.transforms import AspectRatio, Padding, Zoom
+
+NUM_FRAMES = 150
+
+CLICKS = {
+    'none': [],
+    # One click in each of the nine zoom positions
+    'positions': [[x, y, 10 + 15 * i, 0.4] for i, (y, x) in enumerate(
+        (y, x) for y in (0.1, 0.5, 0.9) for x in (0.1, 0.5, 0.9)
+    )],
+    # Shorter than zooming in and out, and clicks during a zoom
+    'overlapping': [[0.2, 0.8, 5, 0.5], [0.7, 0.3, 20, 3.0], [0.5, 0.5, 40, 1.0], [0.95, 0.05, 140, 2.0]],
+    'on the first and last frames': [[0.0, 0.0, 0, 1.5], [1.0, 1.0, NUM_FRAMES - 1, 1.5]],
+}
+
+
+@pytest.mark.parametrize('clicks', CLICKS.values(), ids=CLICKS.keys())
+@pytest.mark.parametrize('frame_size', [(160, 90), (161, 97), (1920, 1080)])
+@pytest.mark.parametrize('zoom_factor', [1.5, 2.0, 3.3])
+def test_plan_matches_the_geometry_of_each_frame(clicks, frame_size, zoom_factor):
+    zoom = Zoom(click_data=clicks, fps=30, zoom_factor=zoom_factor, zoom_in_duration=0.5, zoom_out_duration=0.7)
+    width, height = frame_size
+    plan = RenderPlan.build([AspectRatio('16:9'), Padding(padding=13), zoom], width, height, NUM_FRAMES)
+    assert plan.usable
+
+    for frame_index in range(NUM_FRAMES):
+        zoom_factor, geometry, corners = zoom._geometry(frame_index, *plan.static)
+        frame_plan = plan.row(frame_index)
+
+        assert frame_plan.zoom_factor == pytest.approx(zoom_factor), frame_index
+        assert frame_plan.geometry == geometry, frame_index
+        assert frame_plan.corners == corners, frame_index
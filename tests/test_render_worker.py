@@ -0,0 +1,121 @@
+import time
+import threading
+
+from model.render_worker import RenderWorker
+
+
+class BlockingRender:
+    """Renders frame i as i, holding the first render until released."""
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.rendered = []
+
+    def __call__(self, frame_index):
+        if not self.started.is_set():
+            self.started.set()
+            self.release.wait(5)
+        self.rendered.append(frame_index)
+        return frame_index
+
+
+def collect():
+    results = []
+    done = threading.Event()
+
+    def callback(frame_index, frame):
+        results.append((frame_index, frame))
+        done.set()
+
+    return results, done, callback
+
+
+def wait_idle(worker):
+    for _ in range(500):
+        if not worker.busy:
+            return
+        time.sleep(0.01)
+    raise AssertionError('render worker still busy')
+
+
+def test_renders_a_request_and_calls_back():
+    worker = RenderWorker(lambda frame_index: frame_index * 2)
+    results, done, callback = collect()
+
+    worker.request(3, 0, callback)
+
+    assert done.wait(5)
+    assert results == [(3, 6)]
+
+
+def test_latest_request_wins_while_busy():
+    render = BlockingRender()
+    worker = RenderWorker(render)
+    results, _, callback = collect()
+
+    worker.request(0, 0, callback)
+    assert render.started.wait(5)
+    for frame_index in (1, 2, 3):
+        worker.request(frame_index, 0, callback)
+    render.release.set()
+    wait_idle(worker)
+
+    assert render.rendered == [0, 3]
+    assert results == [(0, 0), (3, 3)]
+
+
+def test_request_being_rendered_drops_the_pending_one():
+    render = BlockingRender()
+    worker = RenderWorker(render)
+    results, _, callback = collect()
+
+    worker.request(0, 0, callback)
+    assert render.started.wait(5)
+    worker.request(5, 0, callback)
+    worker.request(0, 0, callback)
+    render.release.set()
+    wait_idle(worker)
+
+    assert render.rendered == [0]
+
+
+def test_new_settings_render_the_same_frame_again():
+    render = BlockingRender()
+    worker = RenderWorker(render)
+    results, _, callback = collect()
+
+    worker.request(0, 0, callback)
+    assert render.started.wait(5)
+    worker.request(0, 1, callback)
+    render.release.set()
+    wait_idle(worker)
+
+    assert render.rendered == [0, 0]
+
+
+def test_frames_rendered_as_none_are_not_called_back():
+    worker = RenderWorker(lambda frame_index: None)
+    results, _, callback = collect()
+
+    worker.request(0, 0, callback)
+    wait_idle(worker)
+
+    assert results == []
+
+
+def test_failed_request_does_not_stop_the_worker():
+    def render(frame_index):
+        if frame_index == 0:
+            raise ValueError('render failed')
+        return frame_index
+
+    worker = RenderWorker(render)
+    results, done, callback = collect()
+
+    worker.request(0, 0, callback)
+    wait_idle(worker)
+    worker.request(1, 0, callback)
+
+    assert done.wait(5)
+    assert results == [(1, 1)]
+    wait_idle(worker)
@@ -0,0 +1,65 @@
+import cv2
+import numpy as np
+import pytest
+
+from model.transforms import resize_crop, _resize_window
+
+# resize_crop resamples at the positions of the full resize, but rounds the
+# interpolation differently from it
+TOLERANCE = 1
+
+
+def patterned_frame(width=160, height=90):
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    # Hard edges are where rounding differences are largest
+    frame[::7] = 255
+    frame[:, ::5] = 0
+    return frame
+
+
+def full_resize_crop(frame, scaled_size, crop):
+    x, y, width, height = crop
+    return cv2.resize(frame, scaled_size)[y:y+height, x:x+width]
+
+
+@pytest.mark.parametrize('scaled_size', [(160, 90), (320, 180), (213, 120)])
+def test_uncropped_frames_are_exact(scaled_size):
+    frame = patterned_frame()
+    crop = (0, 0) + scaled_size
+
+    assert np.array_equal(resize_crop(frame, scaled_size, crop), cv2.resize(frame, scaled_size))
+
+
+@pytest.mark.parametrize('scaled_size, crop, window', [
+    # Scales that repeat on the source grid are resized from a source window
+    ((320, 180), (40, 30, 160, 90), True),
+    ((240, 135), (81, 17, 160, 90), True),
+    ((200, 112), (0, 22, 160, 90), True),
+    # Others are warped
+    ((257, 163), (50, 40, 160, 90), False),
+    ((479, 269), (318, 178, 160, 90), False),
+])
+def test_cropped_frames_are_within_one_level_of_the_full_resize(scaled_size, crop, window):
+    frame = patterned_frame()
+    height, width = frame.shape[:2]
+    x, y, crop_width, crop_height = crop
+    windows = (_resize_window(width, scaled_size[0], x, crop_width),
+               _resize_window(height, scaled_size[1], y, crop_height))
+    assert all(w is not None for w in windows) == window
+
+    output = resize_crop(frame, scaled_size, crop)
+    expected = full_resize_crop(frame, scaled_size, crop)
+
+    assert output.shape == expected.shape
+    assert np.abs(output.astype(int) - expected).max() <= TOLERANCE
+
+
+def test_crop_is_written_into_dst():
+    frame = patterned_frame()
+    dst = np.zeros((90, 160, 3), dtype=np.uint8)
+
+    output = resize_crop(frame, (257, 163), (50, 40, 160, 90), dst=dst)
+
+    assert output is dst
+    assert np.abs(dst.astype(int) - full_resize_crop(frame, (257, 163), (50, 40, 160, 90))).max() <= TOLERANCE
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from model.frame_context import ALL_CORNERS, TOP_LEFT, BOTTOM_RIGHT
+from model.transforms import Roundness
+from utils.cache import LRUCache
+
+
+@pytest.fixture
+def mask_cache(monkeypatch):
+    cache = LRUCache(max_bytes=1024 ** 2)
+    monkeypatch.setattr(Roundness, 'mask_cache', cache)
+    return cache
+
+
+def test_masks_are_drawn_once_for_every_roundness(mask_cache):
+    mask = Roundness(radius=20).mask(160, 90, 20, ALL_CORNERS)
+
+    assert Roundness(radius=5).mask(160, 90, 20, ALL_CORNERS) is mask
+    assert not mask.flags.writeable
+    assert (mask_cache.misses, mask_cache.hits) == (1, 1)
+
+    # The corners outside of the rounding are not drawn
+    assert mask[0, 0] == 0 and mask[45, 80] == 255
+    assert Roundness().mask(160, 90, 20, ALL_CORNERS & ~TOP_LEFT)[0, 0] == 255
+    assert len(mask_cache) == 2
+
+
+@pytest.mark.parametrize('size, r', [((160, 90), 20), ((60, 40), 25), ((161, 97), 0)])
+@pytest.mark.parametrize('rounded_corners', [ALL_CORNERS, TOP_LEFT | BOTTOM_RIGHT, 0])
+def test_corner_masks_match_the_frame_mask(mask_cache, size, r, rounded_corners):
+    width, height = size
+    roundness = Roundness()
+    mask = roundness.mask(width, height, r, rounded_corners)
+    corner_masks = roundness.corner_masks(width, height, r, rounded_corners)
+
+    outside = np.zeros((height, width), dtype=bool)
+    for x, y, window in corner_masks:
+        outside[y:y+window.shape[0], x:x+window.shape[1]] |= window[..., 0]
+
+    assert np.array_equal(outside, mask == 0)
+    assert roundness.corner_masks(width, height, r, rounded_corners) is corner_masks